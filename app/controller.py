@@ -12,6 +12,7 @@ from telebot.asyncio_filters import SimpleCustomFilter
 from setting.telegrambot import BotSetting
 from utils.yaml import BotConfig
 from utils.postgres import BotDatabase
+from utils.telegram_transport import telegram_transport
 from app import event
 from app.plugin_system.manager import plugin_manager
 from app.plugin_system.plugin_settings import (
@@ -56,6 +57,7 @@ class BotRunner:
                 )
         else:
             logger.info("🌐 使用官方 Bot API 服务器")
+        telegram_transport.install(botapi_config)
 
         self.bot = AsyncTeleBot(BotSetting.token, state_storage=StepCache)
 
@@ -201,6 +203,56 @@ class BotRunner:
                     t("plugin.reload.done", lang), msg.chat.id, msg.message_id
                 )
 
+            elif action == "jobs":
+                metrics = scheduler.get_job_metrics()
+                if not metrics:
+                    await bot.reply_to(message, t("plugin.jobs.empty", lang))
+                    return
+
+                def _fmt_duration(seconds):
+                    return f"{seconds:.2f}s" if seconds is not None else "-"
+
+                jobs_text = t("plugin.jobs.title", lang)
+                for job_name, m in sorted(metrics.items()):
+                    jobs_text += t(
+                        "plugin.jobs.row",
+                        lang,
+                        job_name=job_name,
+                        running=t("plugin.jobs.running", lang) if m.running else "",
+                        runs=m.runs,
+                        failures=m.failures,
+                        skipped=m.skipped,
+                        catch_ups=m.catch_ups,
+                        avg=_fmt_duration(m.avg_duration),
+                        max=_fmt_duration(m.max_duration if m.runs else None),
+                        last_run=(
+                            m.last_run_at.strftime("%Y-%m-%d %H:%M UTC")
+                            if m.last_run_at
+                            else "-"
+                        ),
+                    )
+                await bot.reply_to(message, jobs_text, parse_mode="Markdown")
+
+            elif action == "api":
+                metrics = telegram_transport.get_metrics()
+                if not metrics:
+                    await bot.reply_to(message, t("plugin.api.empty", lang))
+                    return
+
+                api_text = t("plugin.api.title", lang)
+                ranked = sorted(metrics.items(), key=lambda item: -item[1].calls)
+                for method_name, m in ranked[:20]:
+                    api_text += t(
+                        "plugin.api.row",
+                        lang,
+                        method=method_name,
+                        calls=m.calls,
+                        errors=m.errors,
+                        avg=f"{m.avg_duration * 1000:.0f}ms",
+                        max=f"{m.max_duration * 1000:.0f}ms",
+                    )
+                await bot.reply_to(message, api_text, parse_mode="Markdown")
+
             elif action == "remove" and len(args) == 3:
                 plugin_name = args[2]
                 if plugin_manager.remove_plugin(plugin_name):
@@ -324,6 +376,8 @@ class BotRunner:
                     ok = await BotDatabase.set_scheduled_job_enabled(
                         chat_id, target_key, new_state
                     )
+                    if ok:
+                        await scheduler.refresh_group_entry(target_key, chat_id)
                 else:
                     await bot.answer_callback_query(
                         call.id, t("common.invalid_action", lang)
@@ -354,9 +354,29 @@ class PluginManager:
                             callback = job.get("callback")
                             if not job_id or callback is None:
                                 continue
+                            display_name = job.get("display_name")
+                            job_options = {
+                                key: job[key]
+                                for key in (
+                                    "max_instances",
+                                    "coalesce",
+                                    "misfire_grace_seconds",
+                                )
+                                if key in job
+                            }
+                            if job.get("per_group"):
+                                job_options.pop("max_instances", None)
+                                job_options.pop("coalesce", None)
+                                self.middleware.register_group_cron_job(
+                                    plugin.name,
+                                    job_id,
+                                    callback,
+                                    display_name=display_name,
+                                    **job_options,
+                                )
+                                continue
                             cron_expr = job.get("cron", "0 4 * * *")
                             timezone = job.get("timezone", "Asia/Shanghai")
-                            display_name = job.get("display_name")
                             self.middleware.register_cron_job(
                                 plugin.name,
                                 job_id,
@@ -364,6 +384,7 @@ class PluginManager:
                                 timezone,
                                 callback,
                                 display_name=display_name,
+                                **job_options,
                             )
                         if jobs:
                             logger.info(
@@ -69,15 +69,43 @@ class PluginMiddleware:
         callback: Callable,
         display_name: str = None,
         toggleable: bool = True,
+        **job_options,
     ) -> str:
+        """注册全局定时任务。
+
+        ``job_options`` 透传给调度器：max_instances / coalesce / misfire_grace_seconds。
+        """
         job_name = f"{plugin_name}.{job_id}"
         from app.scheduler import scheduler
 
-        scheduler.register_cron_job(plugin_name, job_id, cron_expr, timezone, callback)
+        scheduler.register_cron_job(
+            plugin_name, job_id, cron_expr, timezone, callback, **job_options
+        )
         if toggleable:
             self.scheduled_jobs[job_name] = display_name or job_name
         return job_name
 
+    def register_group_cron_job(
+        self,
+        plugin_name: str,
+        job_id: str,
+        callback: Callable,
+        display_name: str = None,
+        **job_options,
+    ) -> str:
+        """注册按群组调度的定时任务。
+
+        每个群组的 cron_expr/timezone 取自 scheduled_jobs 表，回调签名为
+        ``callback(bot, group_ids, scheduled_at)``。``job_options`` 透传给调度器
+        （misfire_grace_seconds）。
+        """
+        job_name = f"{plugin_name}.{job_id}"
+        from app.scheduler import scheduler
+
+        scheduler.register_group_job(plugin_name, job_id, callback, **job_options)
+        self.scheduled_jobs[job_name] = display_name or job_name
+        return job_name
+
     def register_schedule_handler(self, *args, **kwargs) -> str:
         return self.register_cron_job(*args, **kwargs)
 
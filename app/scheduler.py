@@ -4,13 +4,27 @@
 # @File    : scheduler.py
 # @Software: PyCharm
 import asyncio
+import bisect
+import calendar
+import dataclasses
 import datetime
+import heapq
+import itertools
+import time
 from dataclasses import dataclass
-from typing import Callable, Dict, Iterable, Optional, Set
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 import pytz
 from loguru import logger
 
+from utils.postgres import BotDatabase
+
+
+# 错过的运行在该时长内仍会补跑（秒）
+DEFAULT_MISFIRE_GRACE_SECONDS = 3600
+# 计划时间之后超过该时长才开始的运行记为补跑（秒）
+_CATCH_UP_THRESHOLD_SECONDS = 60
+
 
 @dataclass
 class CronJob:
@@ -19,74 +33,283 @@ class CronJob:
     schedule: "CronSchedule"
     callback: Callable
     next_run_utc: Optional[datetime.datetime] = None
+    max_instances: int = 1
+    coalesce: bool = True
+    misfire_grace_seconds: float = DEFAULT_MISFIRE_GRACE_SECONDS
+
+    @property
+    def job_name(self) -> str:
+        return f"{self.plugin_name}.{self.job_id}"
+
+
+@dataclass
+class GroupCronJob:
+    """按群组调度的任务，每个群组的 cron/时区来自 scheduled_jobs 表。
+
+    同一群组不会并发执行；错过的多次运行总是合并为一次。
+    """
+
+    plugin_name: str
+    job_id: str
+    callback: Callable
+    misfire_grace_seconds: float = DEFAULT_MISFIRE_GRACE_SECONDS
+
+    @property
+    def job_name(self) -> str:
+        return f"{self.plugin_name}.{self.job_id}"
+
+
+@dataclass
+class JobMetrics:
+    """单个任务自进程启动以来的运行统计。"""
+
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    catch_ups: int = 0
+    running: int = 0
+    total_duration: float = 0.0
+    max_duration: float = 0.0
+    last_duration: Optional[float] = None
+    last_run_at: Optional[datetime.datetime] = None
+    last_error: Optional[str] = None
+
+    @property
+    def avg_duration(self) -> Optional[float]:
+        return self.total_duration / self.runs if self.runs else None
+
+
+@dataclass
+class GroupCronEntry:
+    job_name: str
+    group_id: int
+    schedule: "CronSchedule"
+    next_run_utc: datetime.datetime
+    heap_seq: int = 0
+
+
+_MONTH_NAMES = {
+    name: idx
+    for idx, name in enumerate(
+        (
+            "jan",
+            "feb",
+            "mar",
+            "apr",
+            "may",
+            "jun",
+            "jul",
+            "aug",
+            "sep",
+            "oct",
+            "nov",
+            "dec",
+        ),
+        start=1,
+    )
+}
+_WEEKDAY_NAMES = {
+    name: idx
+    for idx, name in enumerate(("sun", "mon", "tue", "wed", "thu", "fri", "sat"))
+}
+# 各月最大天数（2 月按闰年计），用于在构造时排除永远不会触发的表达式
+_MAX_MONTH_DAYS = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+# 日/月字段约束最稀疏时（如 2 月 29 日）也会在 8 年内出现
+_MAX_SEARCH_YEARS = 9
 
 
 class CronSchedule:
+    """标准五字段 cron 表达式：分 时 日 月 周。
+
+    - 支持 ``*``、``a``、``a-b``、``*/n``、``a-b/n``、``a/n`` 及逗号列表。
+    - 月份与星期支持英文缩写（``jan``-``dec``、``sun``-``sat``），星期 ``7`` 等同 ``0``。
+    - 日与周均被限制时按 Vixie cron 语义取并集，否则取交集。
+    - 时间按 ``tz_name`` 的本地时间匹配：夏令时跳过的本地时间不会触发，
+      回拨导致重复出现的本地时间只在第一次出现时触发。
+    """
+
     def __init__(self, cron_expr: str, tz_name: str):
         fields = (cron_expr or "").split()
         if len(fields) != 5:
             raise ValueError(f"Invalid cron expr '{cron_expr}': expected 5 fields")
 
         minute_field, hour_field, day_field, month_field, weekday_field = fields
-        if day_field != "*" or month_field != "*" or weekday_field != "*":
-            raise ValueError(
-                f"Unsupported cron expr '{cron_expr}': only minute/hour are supported"
-            )
 
         self.minutes = _parse_cron_field(minute_field, 0, 59)
         self.hours = _parse_cron_field(hour_field, 0, 23)
+        self.days = _parse_cron_field(day_field, 1, 31)
+        self.months = _parse_cron_field(month_field, 1, 12, _MONTH_NAMES)
+        self.weekdays = tuple(
+            sorted(
+                {
+                    val % 7
+                    for val in _parse_cron_field(weekday_field, 0, 7, _WEEKDAY_NAMES)
+                }
+            )
+        )
+        self._day_star = day_field.startswith("*")
+        self._weekday_star = weekday_field.startswith("*")
         self.tz = pytz.timezone(tz_name)
 
+        if self._weekday_star and not any(
+            self.days[0] <= _MAX_MONTH_DAYS[month - 1] for month in self.months
+        ):
+            raise ValueError(f"Cron expr '{cron_expr}' never matches any date")
+
     def next_run_utc(self, from_utc: datetime.datetime) -> datetime.datetime:
-        local = from_utc.astimezone(self.tz).replace(second=0, microsecond=0)
-        local += datetime.timedelta(minutes=1)
+        """返回严格晚于 ``from_utc`` 的下一次触发时间（UTC）。
+
+        逐字段跳到下一个合法的月、日、时、分，而不是逐分钟试探。
+        """
+        start = from_utc.astimezone(self.tz).replace(
+            tzinfo=None, second=0, microsecond=0
+        ) + datetime.timedelta(minutes=1)
+        year, month, day = start.year, start.month, start.day
+        hour, minute = start.hour, start.minute
+        last_year = year + _MAX_SEARCH_YEARS
+
+        while year <= last_year:
+            next_month = _next_value(self.months, month)
+            if next_month is None:
+                year, month, day, hour, minute = year + 1, 1, 1, 0, 0
+                continue
+            if next_month != month:
+                month, day, hour, minute = next_month, 1, 0, 0
 
-        for _ in range(60 * 24 * 366):
-            if local.minute in self.minutes and local.hour in self.hours:
-                return local.astimezone(pytz.utc)
-            local += datetime.timedelta(minutes=1)
+            next_day = self._next_day(year, month, day)
+            if next_day is None:
+                month, day, hour, minute = month + 1, 1, 0, 0
+                continue
+            if next_day != day:
+                day, hour, minute = next_day, 0, 0
+
+            next_hour = _next_value(self.hours, hour)
+            if next_hour is None:
+                day, hour, minute = day + 1, 0, 0
+                continue
+            if next_hour != hour:
+                hour, minute = next_hour, 0
+
+            next_minute = _next_value(self.minutes, minute)
+            if next_minute is None:
+                hour, minute = hour + 1, 0
+                continue
+            minute = next_minute
+
+            run_utc = self._localize(datetime.datetime(year, month, day, hour, minute))
+            if run_utc is not None and run_utc > from_utc:
+                return run_utc
+            minute += 1
 
         raise RuntimeError("Failed to compute next run time for cron schedule")
 
+    def _next_day(self, year: int, month: int, day: int) -> Optional[int]:
+        month_days = calendar.monthrange(year, month)[1]
+        # 1 号的星期（cron 中 0 为周日），之后按天推算
+        first_weekday = (calendar.weekday(year, month, 1) + 1) % 7
+        for candidate in range(day, month_days + 1):
+            day_match = candidate in self.days
+            weekday_match = (first_weekday + candidate - 1) % 7 in self.weekdays
+            if self._day_star or self._weekday_star:
+                matched = day_match and weekday_match
+            else:
+                matched = day_match or weekday_match
+            if matched:
+                return candidate
+        return None
+
+    def _localize(self, local: datetime.datetime) -> Optional[datetime.datetime]:
+        try:
+            aware = self.tz.localize(local, is_dst=None)
+        except pytz.NonExistentTimeError:
+            return None
+        except pytz.AmbiguousTimeError:
+            aware = min(
+                self.tz.localize(local, is_dst=True),
+                self.tz.localize(local, is_dst=False),
+            )
+        return aware.astimezone(pytz.utc)
+
+
+def _next_value(values: Tuple[int, ...], current: int) -> Optional[int]:
+    idx = bisect.bisect_left(values, current)
+    return values[idx] if idx < len(values) else None
 
-def _parse_cron_field(field: str, min_value: int, max_value: int) -> Set[int]:
-    if field == "*":
-        return set(range(min_value, max_value + 1))
 
+def _parse_cron_value(value: str, names: Optional[Dict[str, int]]) -> int:
+    if names and value in names:
+        return names[value]
+    return int(value)
+
+
+def _parse_cron_field(
+    field: str,
+    min_value: int,
+    max_value: int,
+    names: Optional[Dict[str, int]] = None,
+) -> Tuple[int, ...]:
     values: Set[int] = set()
-    for part in field.split(","):
+    for part in field.lower().split(","):
         part = part.strip()
         if not part:
             continue
 
-        if part.startswith("*/"):
-            step = int(part[2:])
+        step = 1
+        has_step = "/" in part
+        if has_step:
+            part, step_str = part.split("/", 1)
+            step = int(step_str)
             if step <= 0:
-                raise ValueError(f"Invalid cron step '{part}'")
-            values.update(range(min_value, max_value + 1, step))
-            continue
+                raise ValueError(f"Invalid cron step '{step_str}'")
 
-        if "-" in part:
+        if part == "*":
+            start, end = min_value, max_value
+        elif "-" in part:
             start_str, end_str = part.split("-", 1)
-            start = int(start_str)
-            end = int(end_str)
+            start = _parse_cron_value(start_str, names)
+            end = _parse_cron_value(end_str, names)
             if start > end:
                 start, end = end, start
-            values.update(range(start, end + 1))
-            continue
-
-        values.add(int(part))
+        else:
+            start = _parse_cron_value(part, names)
+            end = max_value if has_step else start
 
-    for val in values:
-        if val < min_value or val > max_value:
-            raise ValueError(f"Cron value {val} out of range {min_value}-{max_value}")
+        for val in (start, end):
+            if val < min_value or val > max_value:
+                raise ValueError(
+                    f"Cron value {val} out of range {min_value}-{max_value}"
+                )
+        values.update(range(start, end + 1, step))
 
-    return values
+    if not values:
+        raise ValueError(f"Empty cron field '{field}'")
+    return tuple(sorted(values))
 
 
 class CronScheduler:
+    """定时任务调度器。
+
+    - 全局任务：每个 (plugin, job_id) 一个 cron 表达式。
+    - 群组任务：每个 (job, group_id) 一个条目，cron/时区取自 scheduled_jobs，
+      按下次运行时间放入最小堆；到期时同一任务、同一时刻的群组合并为一次回调
+      ``callback(bot, group_ids, scheduled_at)``。
+
+    每次运行结束后把计划时间写入 scheduler_runs，启动时据此补跑
+    ``misfire_grace_seconds`` 内错过的运行。全局任务同时运行的实例数受
+    ``max_instances`` 限制，``coalesce`` 为真时多次错过的运行只补跑一次。
+    """
+
     def __init__(self):
         self._jobs: Dict[str, CronJob] = {}
+        self._group_jobs: Dict[str, GroupCronJob] = {}
+        self._group_entries: Dict[Tuple[str, int], GroupCronEntry] = {}
+        # (next_run_utc, heap_seq, job_name, group_id)；条目变更后旧堆项按 heap_seq 惰性失效
+        self._group_heap: List[Tuple[datetime.datetime, int, str, int]] = []
+        self._heap_seq = itertools.count(1)
+        self._pending_loads: Set[str] = set()
+        self._running_groups: Dict[str, Set[int]] = {}
+        self._metrics: Dict[str, JobMetrics] = {}
+        self._run_tasks: Set[asyncio.Task] = set()
         self._task: Optional[asyncio.Task] = None
         self._stop_event = asyncio.Event()
         self._wakeup_event = asyncio.Event()
@@ -102,24 +325,125 @@ class CronScheduler:
         cron_expr: str,
         timezone: str,
         callback: Callable,
+        max_instances: int = 1,
+        coalesce: bool = True,
+        misfire_grace_seconds: float = DEFAULT_MISFIRE_GRACE_SECONDS,
     ):
         schedule = CronSchedule(cron_expr, timezone)
         key = f"{plugin_name}:{job_id}"
         job = CronJob(
-            plugin_name=plugin_name, job_id=job_id, schedule=schedule, callback=callback
+            plugin_name=plugin_name,
+            job_id=job_id,
+            schedule=schedule,
+            callback=callback,
+            max_instances=max(1, int(max_instances)),
+            coalesce=coalesce,
+            misfire_grace_seconds=misfire_grace_seconds,
         )
         job.next_run_utc = schedule.next_run_utc(_utc_now())
         self._jobs[key] = job
+        self._metrics.setdefault(job.job_name, JobMetrics())
+        self._pending_loads.add(job.job_name)
         self._wakeup_event.set()
         logger.info(f"⏱️ 注册定时任务 {key} ({cron_expr} {timezone})")
 
+    def register_group_job(
+        self,
+        plugin_name: str,
+        job_id: str,
+        callback: Callable,
+        misfire_grace_seconds: float = DEFAULT_MISFIRE_GRACE_SECONDS,
+    ):
+        """注册群组任务，启用该任务的群组条目会从 scheduled_jobs 加载。"""
+        job = GroupCronJob(
+            plugin_name=plugin_name,
+            job_id=job_id,
+            callback=callback,
+            misfire_grace_seconds=misfire_grace_seconds,
+        )
+        self._group_jobs[job.job_name] = job
+        self._metrics.setdefault(job.job_name, JobMetrics())
+        self._pending_loads.add(job.job_name)
+        self._wakeup_event.set()
+        logger.info(f"⏱️ 注册群组定时任务 {job.job_name}")
+
+    def set_group_entry(
+        self,
+        job_name: str,
+        group_id: int,
+        cron_expr: str,
+        timezone: str,
+        last_run_utc: Optional[datetime.datetime] = None,
+    ) -> bool:
+        """新增或更新单个群组条目，返回是否成功。
+
+        提供 ``last_run_utc`` 时，若其后有仍在补跑窗口内的错过运行，条目立即到期。
+        """
+        job = self._group_jobs.get(job_name)
+        if job is None:
+            return False
+        try:
+            schedule = CronSchedule(cron_expr, timezone or "Asia/Shanghai")
+        except Exception as e:
+            logger.error(
+                f"⏱️ 群组定时任务 {job_name} group={group_id} 配置无效 "
+                f"({cron_expr} {timezone}): {e}"
+            )
+            self.remove_group_entry(job_name, group_id)
+            return False
+
+        now_utc = _utc_now()
+        next_run = schedule.next_run_utc(now_utc)
+        if last_run_utc is not None:
+            missed = _missed_run_times(
+                schedule, last_run_utc, now_utc, job.misfire_grace_seconds
+            )
+            if missed:
+                next_run = missed[-1]
+
+        entry = GroupCronEntry(
+            job_name=job_name,
+            group_id=int(group_id),
+            schedule=schedule,
+            next_run_utc=next_run,
+        )
+        self._group_entries[(job_name, entry.group_id)] = entry
+        self._push_group_entry(entry)
+        self._wakeup_event.set()
+        return True
+
+    def remove_group_entry(self, job_name: str, group_id: int):
+        self._group_entries.pop((job_name, int(group_id)), None)
+
+    async def refresh_group_entry(self, job_name: str, group_id: int):
+        """scheduled_jobs 中某行变化后调用，按最新行内容增量更新条目。"""
+        if job_name not in self._group_jobs:
+            return
+        row = await BotDatabase.get_scheduled_job(group_id, job_name)
+        if row and row["enabled"]:
+            self.set_group_entry(job_name, group_id, row["cron_expr"], row["timezone"])
+        else:
+            self.remove_group_entry(job_name, group_id)
+
+    def get_job_metrics(self) -> Dict[str, JobMetrics]:
+        """获取各任务的运行统计（job_name -> JobMetrics 副本）"""
+        return {name: dataclasses.replace(m) for name, m in self._metrics.items()}
+
     def clear_jobs(self, plugin_name: str = None):
         if plugin_name:
             keys = [k for k, v in self._jobs.items() if v.plugin_name == plugin_name]
             for key in keys:
                 self._jobs.pop(key, None)
+            names = [
+                k for k, v in self._group_jobs.items() if v.plugin_name == plugin_name
+            ]
         else:
             self._jobs.clear()
+            names = list(self._group_jobs)
+        for job_name in names:
+            self._group_jobs.pop(job_name, None)
+            self._pending_loads.discard(job_name)
+            self._drop_group_entries(job_name)
         self._wakeup_event.set()
 
     def start(self):
@@ -138,19 +462,44 @@ class CronScheduler:
 
     async def _run(self):
         while not self._stop_event.is_set():
-            if not self._jobs:
+            while self._pending_loads:
+                await self._load_job_state(self._pending_loads.pop())
+
+            if not self._jobs and not self._group_entries:
                 await self._wait_for_event(60)
                 continue
 
             now_utc = _utc_now()
             for job in self._get_due_jobs(now_utc):
+                run_times = _missed_run_times(
+                    job.schedule,
+                    job.next_run_utc - datetime.timedelta(minutes=1),
+                    now_utc,
+                    job.misfire_grace_seconds,
+                )
                 job.next_run_utc = job.schedule.next_run_utc(now_utc)
-                asyncio.create_task(self._run_job(job))
+                if not run_times:
+                    self._metrics[job.job_name].skipped += 1
+                    logger.warning(f"⏱️ 定时任务 {job.job_name} 错过补跑窗口，跳过")
+                    continue
+                if job.coalesce:
+                    run_times = run_times[-1:]
+                self._start_job(job, run_times)
+
+            for (job_name, scheduled_at), group_ids in self._pop_due_groups(
+                now_utc
+            ).items():
+                job = self._group_jobs.get(job_name)
+                if job:
+                    self._start_group_job(job, group_ids, scheduled_at)
 
             next_run = min(
                 (job.next_run_utc for job in self._jobs.values() if job.next_run_utc),
                 default=None,
             )
+            next_group_run = self._peek_group_heap()
+            if next_group_run and (not next_run or next_group_run < next_run):
+                next_run = next_group_run
             if not next_run:
                 await self._wait_for_event(60)
                 continue
@@ -158,17 +507,185 @@ class CronScheduler:
             delay = max(1.0, (next_run - _utc_now()).total_seconds())
             await self._wait_for_event(delay)
 
-    async def _run_job(self, job: CronJob):
-        if self._bot is None:
+    def _start_job(self, job: CronJob, run_times: List[datetime.datetime]):
+        metrics = self._metrics[job.job_name]
+        if metrics.running >= job.max_instances:
+            metrics.skipped += len(run_times)
+            logger.warning(
+                f"⏱️ 定时任务 {job.job_name} 仍有 {metrics.running} 个实例在运行，"
+                f"跳过本次 ({run_times[-1].isoformat()})"
+            )
+            return
+        metrics.running += 1
+        self._spawn(self._run_job(job, run_times))
+
+    def _start_group_job(
+        self,
+        job: GroupCronJob,
+        group_ids: List[int],
+        scheduled_at: datetime.datetime,
+    ):
+        metrics = self._metrics[job.job_name]
+        running = self._running_groups.setdefault(job.job_name, set())
+        busy = [gid for gid in group_ids if gid in running]
+        if busy:
+            metrics.skipped += len(busy)
             logger.warning(
-                f"⏱️ 定时任务 {job.plugin_name}:{job.job_id} 无 bot 实例，跳过执行"
+                f"⏱️ 群组定时任务 {job.job_name} 有 {len(busy)} 个群组上次运行未结束，跳过"
             )
+            group_ids = [gid for gid in group_ids if gid not in running]
+        if not group_ids:
             return
+        running.update(group_ids)
+        metrics.running += 1
+        self._spawn(self._run_group_job(job, group_ids, scheduled_at))
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._run_tasks.add(task)
+        task.add_done_callback(self._run_tasks.discard)
+
+    async def _run_job(self, job: CronJob, run_times: List[datetime.datetime]):
+        try:
+            for scheduled_at in run_times:
+                if self._bot is None:
+                    logger.warning(
+                        f"⏱️ 定时任务 {job.plugin_name}:{job.job_id} 无 bot 实例，跳过执行"
+                    )
+                    return
+                await self._execute(
+                    job.job_name, [0], scheduled_at, job.callback(self._bot)
+                )
+        finally:
+            self._metrics[job.job_name].running -= 1
+
+    async def _run_group_job(
+        self,
+        job: GroupCronJob,
+        group_ids: List[int],
+        scheduled_at: datetime.datetime,
+    ):
+        try:
+            if self._bot is None:
+                logger.warning(f"⏱️ 群组定时任务 {job.job_name} 无 bot 实例，跳过执行")
+                return
+            await self._execute(
+                job.job_name,
+                group_ids,
+                scheduled_at,
+                job.callback(self._bot, group_ids, scheduled_at),
+            )
+        finally:
+            self._metrics[job.job_name].running -= 1
+            self._running_groups.get(job.job_name, set()).difference_update(group_ids)
+
+    async def _execute(
+        self,
+        job_name: str,
+        group_ids: List[int],
+        scheduled_at: datetime.datetime,
+        run,
+    ):
+        """执行一次任务并记录耗时、失败与最后运行时间。"""
+        metrics = self._metrics[job_name]
+        started_utc = _utc_now()
+        if (started_utc - scheduled_at).total_seconds() > _CATCH_UP_THRESHOLD_SECONDS:
+            metrics.catch_ups += 1
+            logger.info(
+                f"⏱️ 补跑定时任务 {job_name} (计划于 {scheduled_at.isoformat()})"
+            )
 
+        started = time.monotonic()
+        status = "ok"
         try:
-            await job.callback(self._bot)
+            await run
         except Exception as e:
-            logger.error(f"⏱️ 定时任务 {job.plugin_name}:{job.job_id} 执行失败: {e}")
+            status = "failed"
+            metrics.failures += 1
+            metrics.last_error = str(e)
+            target = f" ({len(group_ids)} 个群组)" if group_ids != [0] else ""
+            logger.error(f"⏱️ 定时任务 {job_name} 执行失败{target}: {e}")
+        finally:
+            duration = time.monotonic() - started
+            metrics.runs += 1
+            metrics.total_duration += duration
+            metrics.max_duration = max(metrics.max_duration, duration)
+            metrics.last_duration = duration
+            metrics.last_run_at = started_utc
+
+        await BotDatabase.record_scheduler_runs(
+            job_name, group_ids, scheduled_at, status
+        )
+
+    async def _load_job_state(self, job_name: str):
+        """加载群组条目与上次运行时间，安排补跑窗口内错过的运行。"""
+        last_runs = await BotDatabase.get_scheduler_last_runs(job_name)
+
+        job = next((j for j in self._jobs.values() if j.job_name == job_name), None)
+        if job is not None and 0 in last_runs:
+            missed = _missed_run_times(
+                job.schedule,
+                last_runs[0],
+                _utc_now(),
+                job.misfire_grace_seconds,
+            )
+            if missed:
+                job.next_run_utc = missed[0]
+
+        if job_name not in self._group_jobs:
+            return
+        rows = await BotDatabase.get_enabled_scheduled_groups(job_name)
+        self._drop_group_entries(job_name)
+        loaded = 0
+        for row in rows:
+            if self.set_group_entry(
+                job_name,
+                row["group_id"],
+                row["cron_expr"],
+                row["timezone"],
+                last_run_utc=last_runs.get(int(row["group_id"])),
+            ):
+                loaded += 1
+        logger.info(f"⏱️ 群组定时任务 {job_name} 已加载 {loaded} 个群组")
+
+    def _drop_group_entries(self, job_name: str):
+        keys = [k for k in self._group_entries if k[0] == job_name]
+        for key in keys:
+            self._group_entries.pop(key, None)
+
+    def _push_group_entry(self, entry: GroupCronEntry):
+        entry.heap_seq = next(self._heap_seq)
+        heapq.heappush(
+            self._group_heap,
+            (entry.next_run_utc, entry.heap_seq, entry.job_name, entry.group_id),
+        )
+
+    def _is_live_heap_item(self, item) -> bool:
+        _, heap_seq, job_name, group_id = item
+        entry = self._group_entries.get((job_name, group_id))
+        return entry is not None and entry.heap_seq == heap_seq
+
+    def _peek_group_heap(self) -> Optional[datetime.datetime]:
+        while self._group_heap and not self._is_live_heap_item(self._group_heap[0]):
+            heapq.heappop(self._group_heap)
+        return self._group_heap[0][0] if self._group_heap else None
+
+    def _pop_due_groups(
+        self, now_utc: datetime.datetime
+    ) -> Dict[Tuple[str, datetime.datetime], List[int]]:
+        """弹出所有到期条目并重新入堆，按 (job_name, 计划时间) 分批。"""
+        batches: Dict[Tuple[str, datetime.datetime], List[int]] = {}
+        while self._group_heap and self._group_heap[0][0] <= now_utc:
+            item = heapq.heappop(self._group_heap)
+            if not self._is_live_heap_item(item):
+                continue
+            scheduled_at, _, job_name, group_id = item
+            batches.setdefault((job_name, scheduled_at), []).append(group_id)
+
+            entry = self._group_entries[(job_name, group_id)]
+            entry.next_run_utc = entry.schedule.next_run_utc(now_utc)
+            self._push_group_entry(entry)
+        return batches
 
     def _get_due_jobs(self, now_utc: datetime.datetime) -> Iterable[CronJob]:
         for job in self._jobs.values():
@@ -176,14 +693,33 @@ class CronScheduler:
                 yield job
 
     async def _wait_for_event(self, timeout: float):
-        self._wakeup_event.clear()
+        """等待超时或唤醒；stop() 也会设置唤醒事件。
+
+        事件在醒来后才清除，等待前（处理到期任务期间）发生的唤醒不会丢失。
+        """
         try:
-            await asyncio.wait_for(
-                asyncio.gather(self._stop_event.wait(), self._wakeup_event.wait()),
-                timeout=timeout,
-            )
+            await asyncio.wait_for(self._wakeup_event.wait(), timeout=timeout)
         except asyncio.TimeoutError:
-            return
+            pass
+        finally:
+            self._wakeup_event.clear()
+
+
+def _missed_run_times(
+    schedule: CronSchedule,
+    last_run_utc: datetime.datetime,
+    now_utc: datetime.datetime,
+    grace_seconds: float,
+) -> List[datetime.datetime]:
+    """``last_run_utc`` 之后、``now_utc`` 之前且仍在补跑窗口内的计划时间。"""
+    floor = now_utc - datetime.timedelta(seconds=grace_seconds)
+    cursor = max(last_run_utc, floor - datetime.timedelta(microseconds=1))
+    run_times = []
+    run_at = schedule.next_run_utc(cursor)
+    while run_at <= now_utc:
+        run_times.append(run_at)
+        run_at = schedule.next_run_utc(run_at)
+    return run_times
 
 
 def _utc_now() -> datetime.datetime:
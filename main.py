@@ -6,6 +6,9 @@ from loguru import logger
 
 from app.controller import BotRunner
 from app_conf import settings
+from utils.http_client import BotHttp
+from utils.kvstore import BotKV
+from utils.telegram_transport import telegram_transport
 from utils.postgres import BotDatabase
 
 load_dotenv()
@@ -28,7 +31,13 @@ logger.info("Log Is Secret, Please Don't Share It To Others")
 
 async def main():
     await BotDatabase.connect()
-    await asyncio.gather(BotRunner().run())
+    await BotKV.load()
+    try:
+        await asyncio.gather(BotRunner().run())
+    finally:
+        await BotHttp.close()
+        await telegram_transport.close()
+        await BotKV.close()
 
 
 if __name__ == "__main__":
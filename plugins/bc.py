@@ -5,13 +5,17 @@
 # @Software: PyCharm
 from datetime import datetime, UTC, timezone, timedelta
 import asyncio
+import json
+import os
+import time
 import aiohttp
-from typing import Any, cast
+import numpy as np
+from typing import Any, Callable, cast
 from telebot import types
 from loguru import logger
 from utils.i18n import _t
-from binance.spot import Spot
-from binance.error import ClientError
+from utils.http_client import BotHttp
+from utils.circuit_breaker import BotBreakers, CircuitOpenError
 import xmltodict
 
 try:
@@ -51,6 +55,56 @@ FALLBACK_CHROME_VERSION = "142"
 FALLBACK_CHROME_FULL_VERSION = "142.0.7444.175"
 
 
+# ==================== 欧洲央行汇率缓存 ====================
+# 欧洲央行每个工作日约 16:00 (CET) 发布一次参考汇率
+ECB_REFRESH_CRON = "5 16,17,18 * * mon-fri"
+ECB_REFRESH_TIMEZONE = "Europe/Berlin"
+# 超过该时长的缓存仍然可用，但会在后台重新拉取
+ECB_MAX_AGE = 6 * 3600
+ECB_SNAPSHOT_PATH = "res/cache/ecb_rates.json"
+
+_ecb_table: dict | None = None
+_ecb_refresh_task: asyncio.Task | None = None
+# 刷新时由汇率表构建：货币 -> 下标，以及交叉汇率矩阵
+_ecb_index: dict[str, int] = {}
+_ecb_cross: np.ndarray | None = None
+
+# 多目标换算：/bc 100 USD CNY,JPY,EUR
+MAX_BC_TARGETS = 10
+# 同时请求 Mastercard / Visa 的最大并发数
+CARD_FETCH_CONCURRENCY = 4
+_card_fetch_semaphore = asyncio.Semaphore(CARD_FETCH_CONCURRENCY)
+# 单个汇率源的截止时间（秒），超时后该源显示为超时，不再拖慢整条回复；
+# 卡组织请求从拿到并发名额后开始计时
+FIAT_SOURCE_TIMEOUT = 8
+# 单次 Mastercard / Visa 请求的超时，短于截止时间，使上游卡死时由请求超时
+# 计入熔断器，而不是被调用方的截止时间取消
+CARD_REQUEST_TIMEOUT = 6
+
+# ==================== Mastercard / Visa 汇率缓存 ====================
+# (来源, UTC 日期, 源货币, 目标货币) -> 1 单位源货币可兑换的目标货币数量，跨日自动失效
+_card_rate_cache: dict[tuple[str, str, str, str], float] = {}
+# 来源 -> (UTC 日期, 当日可用的日期候选下标)
+_card_date_choice: dict[str, tuple[str, int]] = {}
+_card_headers: dict | None = None
+
+# ==================== Binance 价格缓存 ====================
+BINANCE_TICKER_API = "https://api.binance.com/api/v3/ticker/price"
+# 价格快照的有效期（秒），期间所有查询共用同一次请求结果
+BINANCE_PRICE_TTL = 5
+
+# ==================== 银联汇率缓存 ====================
+UNIONPAY_API = "https://m.unionpayintl.com/jfimg/{date}.json"
+# get_exchange_rate_date 在 UTC+8 11:00 切换到当天，切换后预取新一天的文件
+UNIONPAY_PREFETCH_CRON = "5,35 11 * * *"
+UNIONPAY_PREFETCH_TIMEZONE = "Asia/Shanghai"
+UNIONPAY_KEEP_DAYS = 2
+
+# 日期 -> {(transCur, baseCur): rate}
+_unionpay_tables: dict[str, dict[tuple[str, str], float]] = {}
+_unionpay_loading: dict[str, asyncio.Task] = {}
+
+
 # ==================== 核心功能 ====================
 API = "https://www.ecb.europa.eu/stats/eurofxref/eurofxref-daily.xml"
 
@@ -142,66 +196,240 @@ async def generate_headers() -> dict:
     return headers
 
 
+async def _download_ecb_table() -> dict:
+    """下载并解析欧洲央行每日参考汇率"""
+    session = BotHttp.session()
+    async with session.get(API) as response:
+        response.raise_for_status()
+        result = await response.read()
+    rate_data = xmltodict.parse(result)
+    rate_data = rate_data["gesmes:Envelope"]["Cube"]["Cube"]["Cube"]
+    data = {i["@currency"]: float(i["@rate"]) for i in rate_data}
+    data["EUR"] = 1.0
+    return {"currencies": sorted(data), "rates": data, "fetched_at": time.time()}
+
+
+def _load_ecb_snapshot() -> dict | None:
+    try:
+        with open(ECB_SNAPSHOT_PATH, "r", encoding="utf-8") as f:
+            table = json.load(f)
+        if table.get("rates"):
+            logger.info("从磁盘快照加载欧洲央行汇率 ({})", ECB_SNAPSHOT_PATH)
+            return table
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning("读取欧洲央行汇率快照失败: {}", e)
+    return None
+
+
+def _save_ecb_snapshot(table: dict) -> None:
+    try:
+        os.makedirs(os.path.dirname(ECB_SNAPSHOT_PATH), exist_ok=True)
+        tmp_path = f"{ECB_SNAPSHOT_PATH}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(table, f)
+        os.replace(tmp_path, ECB_SNAPSHOT_PATH)
+    except Exception as e:
+        logger.warning("保存欧洲央行汇率快照失败: {}", e)
+
+
+def _build_ecb_matrix(rates: dict[str, float]) -> tuple[dict[str, int], np.ndarray]:
+    """cross[i, j] 为 1 单位第 i 种货币可兑换的第 j 种货币数量"""
+    currencies = sorted(rates)
+    vector = np.array([rates[c] for c in currencies], dtype=np.float64)
+    cross = vector[np.newaxis, :] / vector[:, np.newaxis]
+    return {c: i for i, c in enumerate(currencies)}, cross
+
+
+def _set_ecb_table(table: dict) -> None:
+    global _ecb_table, _ecb_index, _ecb_cross
+    _ecb_index, _ecb_cross = _build_ecb_matrix(table["rates"])
+    _ecb_table = table
+
+
+async def refresh_ecb_rates(bot=None) -> bool:
+    """重新拉取欧洲央行汇率；失败时保留当前缓存（定时任务回调）"""
+    try:
+        table = await _download_ecb_table()
+    except Exception as e:
+        logger.warning("欧洲央行汇率刷新失败，继续使用旧数据: {}", e)
+        return False
+    _set_ecb_table(table)
+    await asyncio.to_thread(_save_ecb_snapshot, table)
+    logger.debug("欧洲央行汇率已刷新，共 {} 种货币", len(table["currencies"]))
+    return True
+
+
+def _refresh_ecb_in_background() -> asyncio.Task:
+    """同一时刻只保留一个刷新任务"""
+    global _ecb_refresh_task
+    if _ecb_refresh_task is None or _ecb_refresh_task.done():
+        _ecb_refresh_task = asyncio.create_task(refresh_ecb_rates())
+    return _ecb_refresh_task
+
+
 async def init() -> list:
-    """初始化货币数据"""
-    async with aiohttp.ClientSession() as session:
-        async with session.get(API) as response:
-            result = await response.read()
-            currencies = []
-            data = {}
-            rate_data = xmltodict.parse(result)
-            rate_data = rate_data["gesmes:Envelope"]["Cube"]["Cube"]["Cube"]
-            for i in rate_data:
-                currencies.append(i["@currency"])
-                data[i["@currency"]] = float(i["@rate"])
-            data["EUR"] = 1.0
-            currencies.append("EUR")
-            currencies.sort()
-    return [currencies, data]
-
-
-async def fetch_eu_rate(
-    amount: float, currency_from: str, currency_to: str, eu_data: dict
-) -> dict:
+    """获取货币数据：优先内存缓存，其次磁盘快照，都没有时才同步下载"""
+    if _ecb_table is None:
+        snapshot = await asyncio.to_thread(_load_ecb_snapshot)
+        if snapshot is not None:
+            _set_ecb_table(snapshot)
+    if _ecb_table is None:
+        await _refresh_ecb_in_background()
+        if _ecb_table is None:
+            raise RuntimeError("欧洲央行汇率暂不可用")
+    elif time.time() - _ecb_table.get("fetched_at", 0) > ECB_MAX_AGE:
+        # 先返回旧数据，后台重新验证
+        _refresh_ecb_in_background()
+    return [_ecb_table["currencies"], _ecb_table["rates"]]
+
+
+class BinanceSymbolNotFound(LookupError):
+    """Binance 不存在的交易对"""
+
+
+class BinancePriceService:
     """
-    获取欧盟汇率
+    Binance 现货价格服务：一次请求拉取全部交易对价格并缓存 ``ttl`` 秒，
+    缓存过期时的并发查询共用同一次请求。
     """
-    try:
-        if currency_from not in eu_data or currency_to not in eu_data:
-            logger.error("欧盟不支持的交易对: {} -> {}", currency_from, currency_to)
-            return {
+
+    def __init__(self, ttl: float = BINANCE_PRICE_TTL):
+        self.ttl = ttl
+        self.fetched_at: datetime | None = None
+        self._prices: dict[str, float] = {}
+        self._expires_at = 0.0
+        self._refresh_task: asyncio.Task | None = None
+
+    async def _refresh(self) -> None:
+        session = BotHttp.session()
+        async with session.get(
+            BINANCE_TICKER_API, timeout=aiohttp.ClientTimeout(total=10)
+        ) as response:
+            response.raise_for_status()
+            tickers = await response.json()
+        self._prices = {item["symbol"]: float(item["price"]) for item in tickers}
+        self.fetched_at = datetime.now(UTC)
+        self._expires_at = time.monotonic() + self.ttl
+
+    async def prices(self) -> dict[str, float]:
+        if time.monotonic() >= self._expires_at:
+            if self._refresh_task is None or self._refresh_task.done():
+                self._refresh_task = asyncio.create_task(self._refresh())
+            await asyncio.shield(self._refresh_task)
+        return self._prices
+
+    async def price(self, symbol: str) -> float:
+        prices = await self.prices()
+        if symbol not in prices:
+            raise BinanceSymbolNotFound(symbol)
+        return prices[symbol]
+
+
+binance_prices = BinancePriceService()
+
+
+def convert_eu_rates(
+    amount: float, currency_from: str, targets: list[str]
+) -> list[dict]:
+    """
+    欧盟汇率：在交叉汇率矩阵上一次性换算到多个目标货币
+    """
+    if _ecb_cross is None:
+        return [
+            {
                 "success": False,
                 "rate": None,
                 "converted_amount": None,
-                "error": f"不支持的交易对: {currency_from} -> {currency_to}",
+                "error": "欧盟汇率获取失败",
             }
+            for _ in targets
+        ]
 
-        rate = eu_data[currency_to] / eu_data[currency_from]
-        converted_amount = amount * rate
-        logger.debug(
-            "欧盟汇率转换: {} {} -> {} {}, 汇率: {}",
-            amount,
-            currency_from,
-            converted_amount,
-            currency_to,
-            rate,
-        )
+    row = _ecb_index.get(currency_from)
+    columns = np.array([_ecb_index.get(t, -1) for t in targets], dtype=np.intp)
+    if row is None:
+        rates = np.full(len(targets), np.nan)
+    else:
+        rates = np.where(columns >= 0, _ecb_cross[row, columns], np.nan)
+    converted = amount * rates
+
+    results = []
+    for target, rate, converted_amount in zip(targets, rates, converted):
+        if np.isnan(rate):
+            logger.error("欧盟不支持的交易对: {} -> {}", currency_from, target)
+            results.append(
+                {
+                    "success": False,
+                    "rate": None,
+                    "converted_amount": None,
+                    "error": f"不支持的交易对: {currency_from} -> {target}",
+                }
+            )
+        else:
+            results.append(
+                {
+                    "success": True,
+                    "rate": float(rate),
+                    "converted_amount": float(converted_amount),
+                    "error": None,
+                }
+            )
+    return results
+
+
+async def _download_unionpay_table(
+    date_str: str,
+) -> dict[tuple[str, str], float] | None:
+    """下载银联某日汇率文件并按 (transCur, baseCur) 建索引，未发布时返回 None"""
+    unionpay_api = UNIONPAY_API.format(date=date_str)
+    logger.debug("请求银联汇率 API: {}", unionpay_api)
+
+    session = BotHttp.session()
+    async with session.get(
+        unionpay_api, timeout=aiohttp.ClientTimeout(total=10)
+    ) as response:
+        if response.status != 200:
+            logger.error("银联API{}响应状态码: {}", unionpay_api, response.status)
+            return None
+        data = await response.json(content_type=None)
+
+    return {
+        (item["transCur"], item["baseCur"]): item["rateData"]
+        for item in data.get("exchangeRateJson", [])
+    }
 
-        return {
-            "success": True,
-            "rate": rate,
-            "converted_amount": converted_amount,
-            "error": None,
-        }
 
+async def get_unionpay_table(date_str: str) -> dict[tuple[str, str], float] | None:
+    """获取某日银联汇率索引，每天的文件只下载一次，并发请求共用同一次下载"""
+    table = _unionpay_tables.get(date_str)
+    if table is not None:
+        return table
+
+    task = _unionpay_loading.get(date_str)
+    if task is None:
+        task = asyncio.create_task(_download_unionpay_table(date_str))
+        _unionpay_loading[date_str] = task
+        task.add_done_callback(lambda _: _unionpay_loading.pop(date_str, None))
+    table = await asyncio.shield(task)
+    if table:
+        _unionpay_tables[date_str] = table
+        for stale_date in sorted(_unionpay_tables)[:-UNIONPAY_KEEP_DAYS]:
+            _unionpay_tables.pop(stale_date, None)
+    return table
+
+
+async def prefetch_unionpay_rates(bot=None) -> None:
+    """预取当前汇率日期的银联文件（定时任务回调）"""
+    date_str = get_exchange_rate_date().strftime("%Y%m%d")
+    try:
+        table = await get_unionpay_table(date_str)
     except Exception as e:
-        logger.error("欧盟汇率获取异常: {}", str(e))
-        return {
-            "success": False,
-            "rate": None,
-            "converted_amount": None,
-            "error": "欧盟汇率获取失败",
-        }
+        logger.warning("银联汇率预取失败 {}: {}", date_str, e)
+        return
+    if table:
+        logger.debug("银联汇率 {} 已缓存，共 {} 个交易对", date_str, len(table))
 
 
 async def fetch_unionpay_rate(
@@ -211,38 +439,16 @@ async def fetch_unionpay_rate(
     获取银联汇率
     """
     try:
-        rate_date = get_exchange_rate_date()
-        unionpay_api = (
-            f"https://m.unionpayintl.com/jfimg/{rate_date.strftime('%Y%m%d')}.json"
-        )
-        logger.debug("请求银联汇率 API: {}", unionpay_api)
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                unionpay_api, timeout=aiohttp.ClientTimeout(total=10)
-            ) as response:
-                if response.status != 200:
-                    logger.error(
-                        "银联API{}响应状态码: {}", unionpay_api, response.status
-                    )
-                    return {
-                        "success": False,
-                        "rate": None,
-                        "converted_amount": None,
-                        "error": "银联汇率获取失败",
-                    }
-                data = await response.json()
-
-        exchange_rates = data.get("exchangeRateJson", [])
-        rate = None
-        for rate_data in exchange_rates:
-            if (
-                rate_data["transCur"] == currency_from
-                and rate_data["baseCur"] == currency_to
-            ):
-                rate = rate_data["rateData"]
-                break
+        table = await get_unionpay_table(get_exchange_rate_date().strftime("%Y%m%d"))
+        if table is None:
+            return {
+                "success": False,
+                "rate": None,
+                "converted_amount": None,
+                "error": "银联汇率获取失败",
+            }
 
+        rate = table.get((currency_from, currency_to))
         if rate is None:
             logger.error("银联不支持的交易对: {} -> {}", currency_from, currency_to)
             return {
@@ -279,11 +485,84 @@ async def fetch_unionpay_rate(
         }
 
 
+async def _get_card_headers() -> dict:
+    global _card_headers
+    if _card_headers is None:
+        _card_headers = await generate_headers()
+    return _card_headers
+
+
+def _ordered_date_candidates(source: str, candidates: list[str]) -> list[str]:
+    """当天已确认前一天日期可用时，直接从前一天开始请求"""
+    today = datetime.now(UTC).strftime("%Y-%m-%d")
+    choice = _card_date_choice.get(source)
+    if choice is not None and choice[0] == today and choice[1] > 0:
+        return candidates[choice[1] :] + candidates[: choice[1]]
+    return candidates
+
+
+def _remember_date_candidate(source: str, candidates: list[str], used: str) -> None:
+    today = datetime.now(UTC).strftime("%Y-%m-%d")
+    _card_date_choice[source] = (today, candidates.index(used))
+
+
+async def _cached_card_rate(
+    source: str, amount: float, currency_from: str, currency_to: str, request
+) -> dict:
+    """
+    按 (来源, UTC 日期, 交易对) 缓存上游返回的汇率，命中时不再请求上游。
+    缓存的是汇率本身而不是上游换算出的金额：上游金额已四舍五入，
+    用小额查询的结果反推单位汇率会放大误差。
+    """
+    today = datetime.now(UTC).strftime("%Y-%m-%d")
+    key = (source, today, currency_from, currency_to)
+    rate = _card_rate_cache.get(key)
+    if rate is not None:
+        return {
+            "success": True,
+            "rate": rate,
+            "converted_amount": amount * rate,
+            "error": None,
+        }
+
+    result = await request(amount, currency_from, currency_to)
+    if result["success"]:
+        for stale_key in [k for k in _card_rate_cache if k[1] != today]:
+            _card_rate_cache.pop(stale_key, None)
+        _card_rate_cache[key] = result["rate"]
+    return result
+
+
 async def fetch_mastercard_rate(
     amount: float, currency_from: str, currency_to: str
 ) -> dict:
     """
-    获取Mastercard汇率
+    获取Mastercard汇率（按交易对每日缓存）
+    """
+    return await _cached_card_rate(
+        "mastercard", amount, currency_from, currency_to, _request_mastercard_rate
+    )
+
+
+async def fetch_visa_rate(amount: float, currency_from: str, currency_to: str) -> dict:
+    """
+    获取Visa汇率（按交易对每日缓存）
+    """
+    return await _cached_card_rate(
+        "visa", amount, currency_from, currency_to, _request_visa_rate
+    )
+
+
+def _card_upstream_failed(response) -> bool:
+    """被 CDN 拦截、限流或服务端错误时计入熔断；400/401 属于日期或参数问题"""
+    return response.status_code in (403, 429) or response.status_code >= 500
+
+
+async def _request_mastercard_rate(
+    amount: float, currency_from: str, currency_to: str
+) -> dict:
+    """
+    请求Mastercard汇率
     使用 curl_cffi 模拟 Chrome 浏览器的 TLS 指纹以绕过 Akamai CDN 检测
     """
     try:
@@ -297,8 +576,9 @@ async def fetch_mastercard_rate(
             }
 
         api_endpoint = "https://www.mastercard.com/marketingservices/public/mccom-services/currency-conversions/conversion-rates"
-        headers = await generate_headers()
-        date_candidates = get_utc_date_candidates("%Y-%m-%d")
+        headers = await _get_card_headers()
+        all_candidates = get_utc_date_candidates("%Y-%m-%d")
+        date_candidates = _ordered_date_candidates("mastercard", all_candidates)
         now_utc = datetime.now(UTC)
         now_utc8 = now_utc.astimezone(timezone(timedelta(hours=8)))
         logger.debug(
@@ -313,59 +593,61 @@ async def fetch_mastercard_rate(
         impersonate_version = get_chrome_impersonate_version(chrome_version)
         logger.debug("使用TLS指纹版本: {}", impersonate_version)
 
-        async with AsyncSession() as session:
-            result = None
-            for idx, exchange_date in enumerate(date_candidates):
-                params = {
-                    "exchange_date": exchange_date,
-                    "transaction_currency": currency_from,
-                    "cardholder_billing_currency": currency_to,
-                    "bank_fee": 0,
-                    "transaction_amount": amount,
-                }
-                logger.debug(
-                    "请求Mastercard汇率 API: {}, params: {}", api_endpoint, params
-                )
-
-                response = await session.get(
-                    api_endpoint,
-                    headers=headers,
-                    params=params,
-                    timeout=10,
-                    impersonate=cast(Any, impersonate_version),
-                )
+        session = BotHttp.curl_session()
+        result = None
+        for idx, exchange_date in enumerate(date_candidates):
+            params = {
+                "exchange_date": exchange_date,
+                "transaction_currency": currency_from,
+                "cardholder_billing_currency": currency_to,
+                "bank_fee": 0,
+                "transaction_amount": amount,
+            }
+            logger.debug("请求Mastercard汇率 API: {}, params: {}", api_endpoint, params)
+
+            response = await BotBreakers.get("mastercard").call(
+                session.get,
+                api_endpoint,
+                headers=headers,
+                params=params,
+                timeout=CARD_REQUEST_TIMEOUT,
+                impersonate=cast(Any, impersonate_version),
+                failure_if=_card_upstream_failed,
+            )
 
-                if response.status_code == 200:
-                    result = response.json()
-                    break
+            if response.status_code == 200:
+                result = response.json()
+                _remember_date_candidate("mastercard", all_candidates, exchange_date)
+                break
 
-                logger.error(
-                    "Mastercard API响应状态码: {}, exchange_date: {}, body: {}",
-                    response.status_code,
+            logger.error(
+                "Mastercard API响应状态码: {}, exchange_date: {}, body: {}",
+                response.status_code,
+                exchange_date,
+                response.text[:300],
+            )
+            if response.status_code in (400, 401) and idx == 0:
+                logger.warning(
+                    "Mastercard 使用日期 {} 失败，改用 {} 重试",
                     exchange_date,
-                    response.text[:300],
+                    date_candidates[1],
                 )
-                if response.status_code in (400, 401) and idx == 0:
-                    logger.warning(
-                        "Mastercard 使用UTC当日日期失败，回退到前一天重试: {}",
-                        date_candidates[1],
-                    )
-                    continue
-
-                return {
-                    "success": False,
-                    "rate": None,
-                    "converted_amount": None,
-                    "error": f"Mastercard汇率获取失败 (HTTP {response.status_code})",
-                }
+                continue
 
-            if result is None:
-                return {
-                    "success": False,
-                    "rate": None,
-                    "converted_amount": None,
-                    "error": "Mastercard汇率获取失败",
-                }
+            return {
+                "success": False,
+                "rate": None,
+                "converted_amount": None,
+                "error": f"Mastercard汇率获取失败 (HTTP {response.status_code})",
+            }
+
+        if result is None:
+            return {
+                "success": False,
+                "rate": None,
+                "converted_amount": None,
+                "error": "Mastercard汇率获取失败",
+            }
 
         # 从响应中提取数据
         data = result.get("data", {})
@@ -397,6 +679,14 @@ async def fetch_mastercard_rate(
             "error": None,
         }
 
+    except CircuitOpenError as e:
+        logger.debug("Mastercard 熔断中，跳过请求: {}", e)
+        return {
+            "success": False,
+            "rate": None,
+            "converted_amount": None,
+            "error": _t("error.source_unavailable"),
+        }
     except Exception as e:
         logger.error("Mastercard汇率获取异常: {}", str(e))
         return {
@@ -407,9 +697,23 @@ async def fetch_mastercard_rate(
         }
 
 
-async def fetch_visa_rate(amount: float, currency_from: str, currency_to: str) -> dict:
+def _orient_visa_rate(fx_rate: float, amount: float, converted_amount: float) -> float:
+    """
+    fxRateVisa 按 Visa 自己的 fromCurr / toCurr 报价，而请求里两者是反向的。
+    取与换算金额一致的方向，返回 1 单位源货币可兑换的目标货币数量。
+    """
+    if fx_rate and abs(amount / fx_rate - converted_amount) < abs(
+        amount * fx_rate - converted_amount
+    ):
+        return 1 / fx_rate
+    return fx_rate
+
+
+async def _request_visa_rate(
+    amount: float, currency_from: str, currency_to: str
+) -> dict:
     """
-    获取Visa汇率
+    请求Visa汇率
     使用 curl_cffi 模拟 Chrome 浏览器的 TLS 指纹以绕过 CDN 检测
     注意: Visa API 的货币参数是反向的（fromCurr=目标货币, toCurr=来源货币）
     """
@@ -424,8 +728,9 @@ async def fetch_visa_rate(amount: float, currency_from: str, currency_to: str) -
             }
 
         api_endpoint = "https://usa.visa.com/cmsapi/fx/rates"
-        headers = await generate_headers()
-        date_candidates = get_utc_date_candidates("%m/%d/%Y")
+        headers = await _get_card_headers()
+        all_candidates = get_utc_date_candidates("%m/%d/%Y")
+        date_candidates = _ordered_date_candidates("visa", all_candidates)
         now_utc = datetime.now(UTC)
         now_utc8 = now_utc.astimezone(timezone(timedelta(hours=8)))
         logger.debug(
@@ -440,58 +745,62 @@ async def fetch_visa_rate(amount: float, currency_from: str, currency_to: str) -
         impersonate_version = get_chrome_impersonate_version(chrome_version)
         logger.debug("使用TLS指纹版本: {}", impersonate_version)
 
-        async with AsyncSession() as session:
-            result = None
-            for idx, date_str in enumerate(date_candidates):
-                params = {
-                    "amount": amount,
-                    "fee": 0,
-                    "utcConvertedDate": date_str,
-                    "exchangedate": date_str,
-                    "fromCurr": currency_to,
-                    "toCurr": currency_from,
-                }
-                logger.debug("请求Visa汇率 API: {}, params: {}", api_endpoint, params)
-
-                response = await session.get(
-                    api_endpoint,
-                    headers=headers,
-                    params=params,
-                    timeout=10,
-                    impersonate=cast(Any, impersonate_version),
-                )
+        session = BotHttp.curl_session()
+        result = None
+        for idx, date_str in enumerate(date_candidates):
+            params = {
+                "amount": amount,
+                "fee": 0,
+                "utcConvertedDate": date_str,
+                "exchangedate": date_str,
+                "fromCurr": currency_to,
+                "toCurr": currency_from,
+            }
+            logger.debug("请求Visa汇率 API: {}, params: {}", api_endpoint, params)
+
+            response = await BotBreakers.get("visa").call(
+                session.get,
+                api_endpoint,
+                headers=headers,
+                params=params,
+                timeout=CARD_REQUEST_TIMEOUT,
+                impersonate=cast(Any, impersonate_version),
+                failure_if=_card_upstream_failed,
+            )
 
-                if response.status_code == 200:
-                    result = response.json().get("originalValues")
-                    break
+            if response.status_code == 200:
+                result = response.json().get("originalValues")
+                _remember_date_candidate("visa", all_candidates, date_str)
+                break
 
-                logger.error(
-                    "Visa API响应状态码: {}, exchange_date: {}, body: {}",
-                    response.status_code,
+            logger.error(
+                "Visa API响应状态码: {}, exchange_date: {}, body: {}",
+                response.status_code,
+                date_str,
+                response.text[:300],
+            )
+            if response.status_code in (400, 401) and idx == 0:
+                logger.warning(
+                    "Visa 使用日期 {} 失败，改用 {} 重试",
                     date_str,
-                    response.text[:300],
+                    date_candidates[1],
                 )
-                if response.status_code in (400, 401) and idx == 0:
-                    logger.warning(
-                        "Visa 使用UTC当日日期失败，回退到前一天重试: {}",
-                        date_candidates[1],
-                    )
-                    continue
-
-                return {
-                    "success": False,
-                    "rate": None,
-                    "converted_amount": None,
-                    "error": f"Visa汇率获取失败 (HTTP {response.status_code})",
-                }
+                continue
 
-            if result is None:
-                return {
-                    "success": False,
-                    "rate": None,
-                    "converted_amount": None,
-                    "error": "Visa汇率获取失败",
-                }
+            return {
+                "success": False,
+                "rate": None,
+                "converted_amount": None,
+                "error": f"Visa汇率获取失败 (HTTP {response.status_code})",
+            }
+
+        if result is None:
+            return {
+                "success": False,
+                "rate": None,
+                "converted_amount": None,
+                "error": "Visa汇率获取失败",
+            }
 
         # 从响应中提取数据
         converted_amount = result.get("toAmountWithVisaRate")
@@ -506,22 +815,33 @@ async def fetch_visa_rate(amount: float, currency_from: str, currency_to: str) -
                 "error": "Visa汇率获取失败",
             }
 
+        rate = _orient_visa_rate(
+            float(conversion_rate), amount, float(converted_amount)
+        )
         logger.debug(
             "Visa汇率转换: {} {} -> {} {}, 汇率: {}",
             amount,
             currency_from,
             converted_amount,
             currency_to,
-            conversion_rate,
+            rate,
         )
 
         return {
             "success": True,
-            "rate": float(conversion_rate),
+            "rate": rate,
             "converted_amount": float(converted_amount),
             "error": None,
         }
 
+    except CircuitOpenError as e:
+        logger.debug("Visa 熔断中，跳过请求: {}", e)
+        return {
+            "success": False,
+            "rate": None,
+            "converted_amount": None,
+            "error": _t("error.source_unavailable"),
+        }
     except Exception as e:
         logger.error("Visa汇率获取异常: {}", str(e))
         return {
@@ -560,48 +880,170 @@ def _binance_usd_price_symbols(crypto_currency: str) -> list[str]:
     ]
 
 
-def _fetch_binance_price_by_symbols(
-    binanceclient: Any, symbols: list[str]
-) -> tuple[dict[str, Any], str]:
-    """按顺序尝试多个 Binance 交易对，返回第一个成功的价格数据。"""
-    last_client_error: ClientError | None = None
+async def _fetch_binance_price_by_symbols(symbols: list[str]) -> tuple[float, str]:
+    """按顺序尝试多个 Binance 交易对，返回第一个存在的交易对价格。"""
+    if not symbols:
+        raise ValueError("no Binance symbols provided")
 
+    prices = await binance_prices.prices()
     for symbol in symbols:
-        try:
-            return binanceclient.ticker_price(symbol), symbol
-        except ClientError as e:
-            last_client_error = e
+        if symbol in prices:
+            return prices[symbol], symbol
 
-    if last_client_error is not None:
-        raise last_client_error
+    raise BinanceSymbolNotFound(", ".join(symbols))
 
-    raise ValueError("no Binance symbols provided")
 
+FIAT_SOURCES = ("eu", "unionpay", "mastercard", "visa")
+
+
+def _parse_bc_targets(raw: str) -> list[str]:
+    """解析目标货币，支持逗号分隔的多个目标，去重并限制数量"""
+    targets = []
+    for target in raw.upper().split(","):
+        target = target.strip()
+        if target and target not in targets:
+            targets.append(target)
+    return targets[:MAX_BC_TARGETS]
+
+
+async def _fetch_with_deadline(fetch, amount: float, currency_from: str, target: str):
+    try:
+        return await asyncio.wait_for(
+            fetch(amount, currency_from, target), FIAT_SOURCE_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        return {
+            "success": False,
+            "rate": None,
+            "converted_amount": None,
+            "error": _t("error.source_timeout"),
+        }
+
+
+async def _bounded_card_fetch(fetch, amount: float, currency_from: str, target: str):
+    """排队等待并发名额的时间不计入截止时间"""
+    async with _card_fetch_semaphore:
+        return await _fetch_with_deadline(fetch, amount, currency_from, target)
+
+
+async def fetch_fiat_rates(
+    amount: float,
+    currency_from: str,
+    targets: list[str],
+    on_progress: Callable[[list[list[dict | None]]], None] | None = None,
+) -> list[list[dict]]:
+    """
+    获取每个目标货币在四个法币汇率源下的结果，按 FIAT_SOURCES 顺序排列。
+    欧盟汇率在矩阵上一次换算完成，卡组织汇率仅对请求的交易对并发请求（有并发上限）。
+    每个来源有独立的截止时间；传入 on_progress 时，每有一个来源返回就以当前结果
+    （未返回的来源为 None）回调一次。
+    """
+    eu_results = convert_eu_rates(amount, currency_from, targets)
+    results: list[list[dict | None]] = [[eu, None, None, None] for eu in eu_results]
+    tasks: dict[asyncio.Task, tuple[int, int]] = {}
+    for i, target in enumerate(targets):
+        fetches = (
+            _fetch_with_deadline(fetch_unionpay_rate, amount, currency_from, target),
+            _bounded_card_fetch(fetch_mastercard_rate, amount, currency_from, target),
+            _bounded_card_fetch(fetch_visa_rate, amount, currency_from, target),
+        )
+        for j, fetch in enumerate(fetches, start=1):
+            tasks[asyncio.create_task(fetch)] = (i, j)
+
+    if on_progress is not None:
+        on_progress(results)
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                i, j = tasks[task]
+                results[i][j] = task.result()
+            if on_progress is not None:
+                on_progress(results)
+    finally:
+        for task in pending:
+            task.cancel()
+    return cast(list[list[dict]], results)
+
+
+def _format_fiat_results(
+    amount: float, currency_from: str, target: str, results: list[dict | None]
+) -> str:
+    lines = []
+    for source, result in zip(FIAT_SOURCES, results):
+        if result is None:
+            lines.append(
+                _t("result.fiat_source_pending", source=_t(f"source.{source}"))
+            )
+        elif result["success"]:
+            lines.append(
+                _t(
+                    "result.fiat_source_success",
+                    source=_t(f"source.{source}"),
+                    amount=f"{amount:.2f}",
+                    source_currency=currency_from,
+                    converted_amount=f"{result['converted_amount']:.2f}",
+                    target_currency=target,
+                    rate=f"{result['rate']:.4f}",
+                )
+            )
+        else:
+            lines.append(
+                _t(
+                    "result.fiat_source_error",
+                    source=_t(f"source.{source}"),
+                    error=result["error"],
+                )
+            )
+    return "\n".join(lines)
+
+
+def _is_fiat_answer(targets: list[str], results: list[list[dict | None]]) -> bool:
+    """多目标，或单目标时任一法币汇率源成功，则以法币结果作答"""
+    return len(targets) > 1 or any(r and r["success"] for r in results[0])
+
+
+def _format_fiat_answer(
+    amount: float,
+    currency_from: str,
+    targets: list[str],
+    results: list[list[dict | None]],
+) -> str:
+    return "\n\n".join(
+        _format_fiat_results(amount, currency_from, target, target_results)
+        for target, target_results in zip(targets, results)
+    )
 
-async def query_bc_text(raw_tokens: list[str]) -> str:
-    """生成与 `/bc` 命令一致的输出文本，用于命令与 Inline 复用。"""
+
+async def query_bc_text(
+    raw_tokens: list[str], on_progress: Callable[[str], None] | None = None
+) -> str:
+    """
+    生成与 `/bc` 命令一致的输出文本，用于命令与 Inline 复用。
+    传入 on_progress 时，法币汇率源每返回一个就回调一次当前的部分结果文本。
+    """
     args = _normalize_bc_tokens(raw_tokens)
 
     # 初始化数据
     try:
         currencies, data = await init()
-        binanceclient = Spot()
-        nowtimestamp = binanceclient.time()
-        nowtime = datetime.fromtimestamp(float(nowtimestamp["serverTime"]) / 1000, UTC)
     except Exception as e:
         return _t("error.init_failed", reason=str(e))
 
     # 无参数时显示BTC和ETH的价格
     if len(args) == 0:
         try:
-            btc_price_data = binanceclient.ticker_price("BTCUSDT")
-            eth_price_data = binanceclient.ticker_price("ETHUSDT")
+            btc_price = await binance_prices.price("BTCUSDT")
+            eth_price = await binance_prices.price("ETHUSDT")
 
             response_text = _t(
                 "result.spot_prices",
-                timestamp=nowtime.strftime("%Y-%m-%d %H:%M:%S"),
-                btc_price=f"{float(btc_price_data['price']):.2f}",
-                eth_price=f"{float(eth_price_data['price']):.2f}",
+                timestamp=binance_prices.fetched_at.strftime("%Y-%m-%d %H:%M:%S"),
+                btc_price=f"{btc_price:.2f}",
+                eth_price=f"{eth_price:.2f}",
             )
             return response_text
         except Exception as e:
@@ -619,107 +1061,19 @@ async def query_bc_text(raw_tokens: list[str]) -> str:
 
     _from = args[1].upper().strip()
     _to = args[2].upper().strip()
+    targets = _parse_bc_targets(_to)
+    if not targets:
+        return _t("prompt.bc_usage")
 
     # 优先尝试四种法币汇率源（欧盟/银联/Mastercard/Visa）
-    # 只有当四种方式全部失败时，才尝试加密货币交易对。
-    eu_result, unionpay_result, mastercard_result, visa_result = await asyncio.gather(
-        fetch_eu_rate(number, _from, _to, data),
-        fetch_unionpay_rate(number, _from, _to),
-        fetch_mastercard_rate(number, _from, _to),
-        fetch_visa_rate(number, _from, _to),
-    )
-
-    if any(
-        r.get("success")
-        for r in (eu_result, unionpay_result, mastercard_result, visa_result)
-    ):
-        response_lines = []
-
-        if eu_result["success"]:
-            response_lines.append(
-                _t(
-                    "result.fiat_source_success",
-                    source=_t("source.eu"),
-                    amount=f"{number:.2f}",
-                    source_currency=_from,
-                    converted_amount=f"{eu_result['converted_amount']:.2f}",
-                    target_currency=_to,
-                    rate=f"{eu_result['rate']:.4f}",
-                )
-            )
-        else:
-            response_lines.append(
-                _t(
-                    "result.fiat_source_error",
-                    source=_t("source.eu"),
-                    error=eu_result["error"],
-                )
-            )
-
-        if unionpay_result["success"]:
-            response_lines.append(
-                _t(
-                    "result.fiat_source_success",
-                    source=_t("source.unionpay"),
-                    amount=f"{number:.2f}",
-                    source_currency=_from,
-                    converted_amount=f"{unionpay_result['converted_amount']:.2f}",
-                    target_currency=_to,
-                    rate=f"{unionpay_result['rate']:.4f}",
-                )
-            )
-        else:
-            response_lines.append(
-                _t(
-                    "result.fiat_source_error",
-                    source=_t("source.unionpay"),
-                    error=unionpay_result["error"],
-                )
-            )
-
-        if mastercard_result["success"]:
-            response_lines.append(
-                _t(
-                    "result.fiat_source_success",
-                    source=_t("source.mastercard"),
-                    amount=f"{number:.2f}",
-                    source_currency=_from,
-                    converted_amount=f"{mastercard_result['converted_amount']:.2f}",
-                    target_currency=_to,
-                    rate=f"{mastercard_result['rate']:.4f}",
-                )
-            )
-        else:
-            response_lines.append(
-                _t(
-                    "result.fiat_source_error",
-                    source=_t("source.mastercard"),
-                    error=mastercard_result["error"],
-                )
-            )
-
-        if visa_result["success"]:
-            response_lines.append(
-                _t(
-                    "result.fiat_source_success",
-                    source=_t("source.visa"),
-                    amount=f"{number:.2f}",
-                    source_currency=_from,
-                    converted_amount=f"{visa_result['converted_amount']:.2f}",
-                    target_currency=_to,
-                    rate=f"{visa_result['rate']:.4f}",
-                )
-            )
-        else:
-            response_lines.append(
-                _t(
-                    "result.fiat_source_error",
-                    source=_t("source.visa"),
-                    error=visa_result["error"],
-                )
-            )
+    # 只有当四种方式全部失败时，才尝试加密货币交易对（仅单一目标货币）。
+    def report_progress(partial: list[list[dict | None]]) -> None:
+        if on_progress is not None and _is_fiat_answer(targets, partial):
+            on_progress(_format_fiat_answer(number, _from, targets, partial))
 
-        return "\n".join(response_lines)
+    results = await fetch_fiat_rates(number, _from, targets, report_progress)
+    if _is_fiat_answer(targets, results):
+        return _format_fiat_answer(number, _from, targets, results)
 
     # 从法定货币到加密货币
     if currencies.count(_from) != 0:
@@ -727,10 +1081,8 @@ async def query_bc_text(raw_tokens: list[str]) -> str:
             usd_number = number * data["USD"] / data[_from]
             symbols = _binance_usd_price_symbols(_to)
             try:
-                price_data, _ = _fetch_binance_price_by_symbols(
-                    binanceclient, symbols
-                )
-                crypto_amount = 1 / float(price_data["price"]) * usd_number
+                price, _ = await _fetch_binance_price_by_symbols(symbols)
+                crypto_amount = 1 / price * usd_number
 
                 return _t(
                     "result.fiat_to_crypto",
@@ -740,7 +1092,7 @@ async def query_bc_text(raw_tokens: list[str]) -> str:
                     target_currency=_to,
                     usd_amount=f"{usd_number:.2f}",
                 )
-            except ClientError:
+            except BinanceSymbolNotFound:
                 return _t("error.pair_not_found", pair=", ".join(symbols))
         except Exception as e:
             return _t("error.convert_failed", reason=str(e))
@@ -749,8 +1101,7 @@ async def query_bc_text(raw_tokens: list[str]) -> str:
     if currencies.count(_to) != 0:
         symbols = _binance_usd_price_symbols(_from)
         try:
-            price_data, _ = _fetch_binance_price_by_symbols(binanceclient, symbols)
-            usd_price = float(price_data["price"])
+            usd_price, _ = await _fetch_binance_price_by_symbols(symbols)
             fiat_amount = usd_price * number * data[_to] / data["USD"]
 
             return _t(
@@ -761,7 +1112,7 @@ async def query_bc_text(raw_tokens: list[str]) -> str:
                 target_currency=_to,
                 unit_usd_price=f"{usd_price:.2f}",
             )
-        except ClientError:
+        except BinanceSymbolNotFound:
             return _t("error.pair_not_found", pair=", ".join(symbols))
         except Exception as e:
             return _t("error.convert_failed", reason=str(e))
@@ -769,8 +1120,7 @@ async def query_bc_text(raw_tokens: list[str]) -> str:
     # 两种都是加密货币
     try:
         try:
-            price_data = binanceclient.ticker_price(f"{_from}{_to}")
-            result = float(price_data["price"]) * number
+            result = await binance_prices.price(f"{_from}{_to}") * number
             return _t(
                 "result.crypto_pair",
                 amount=number,
@@ -778,11 +1128,10 @@ async def query_bc_text(raw_tokens: list[str]) -> str:
                 converted_amount=result,
                 target_currency=_to,
             )
-        except ClientError:
+        except BinanceSymbolNotFound:
             # 尝试反向交易对
             try:
-                price_data = binanceclient.ticker_price(f"{_to}{_from}")
-                result = number / float(price_data["price"])
+                result = number / await binance_prices.price(f"{_to}{_from}")
                 return _t(
                     "result.crypto_pair",
                     amount=number,
@@ -790,7 +1139,7 @@ async def query_bc_text(raw_tokens: list[str]) -> str:
                     converted_amount=result,
                     target_currency=_to,
                 )
-            except ClientError:
+            except BinanceSymbolNotFound:
                 return _t(
                     "error.pair_not_found_both",
                     pair_a=f"{_from}{_to}",
@@ -838,7 +1187,8 @@ async def handle_bc_inline_query(bot, inline_query: types.InlineQuery):
     result_id = "bc_prices"
     if len(args) == 3:
         title = f"{args[0]} {args[1].upper()} -> {args[2].upper()}"
-        result_id = f"bc_{args[0]}_{args[1].upper()}_{args[2].upper()}"
+        # Inline 结果 id 最长 64 字节
+        result_id = f"bc_{args[0]}_{args[1].upper()}_{args[2].upper()}"[:64]
 
     result = types.InlineQueryResultArticle(
         id=result_id,
@@ -851,6 +1201,61 @@ async def handle_bc_inline_query(bot, inline_query: types.InlineQuery):
     )
 
 
+class _ProgressiveReply:
+    """
+    先回复首个部分结果，之后的更新编辑同一条消息。
+    编辑经由发送队列按消息合并与限速，连续更新只会发出最新的文本。
+    """
+
+    def __init__(self, bot, message: types.Message):
+        self.bot = bot
+        self.message = message
+        self.sent: types.Message | None = None
+        self.sent_text: str | None = None
+        self.latest_text: str | None = None
+        self._reply_task: asyncio.Task | None = None
+        self._edit_tasks: set[asyncio.Task] = set()
+
+    def update(self, text: str) -> None:
+        self.latest_text = text
+        if self._reply_task is None:
+            self._reply_task = asyncio.create_task(self._reply(text))
+        elif self.sent is not None:
+            self._schedule_edit(text)
+
+    async def finish(self, text: str) -> None:
+        self.latest_text = text
+        if self._reply_task is None:
+            await self.bot.reply_to(self.message, text)
+            return
+        await self._reply_task
+        if self.sent is not None and self.sent_text != text:
+            self._schedule_edit(text)
+        if self._edit_tasks:
+            for result in await asyncio.gather(
+                *self._edit_tasks, return_exceptions=True
+            ):
+                if isinstance(result, Exception):
+                    logger.warning("bc 结果消息编辑失败: {}", result)
+
+    async def _reply(self, text: str) -> None:
+        self.sent = await self.bot.reply_to(self.message, text)
+        self.sent_text = text
+        # 等待回复期间到达的更新
+        if self.latest_text != text:
+            self._schedule_edit(self.latest_text)
+
+    def _schedule_edit(self, text: str) -> None:
+        if text == self.sent_text:
+            return
+        self.sent_text = text
+        task = asyncio.create_task(
+            self.bot.edit_message_text(text, self.message.chat.id, self.sent.message_id)
+        )
+        self._edit_tasks.add(task)
+        task.add_done_callback(self._edit_tasks.discard)
+
+
 async def handle_bc_command(bot, message: types.Message) -> None:
     """
     处理币种转换命令
@@ -873,28 +1278,16 @@ async def handle_bc_command(bot, message: types.Message) -> None:
         await bot.reply_to(message, usage_text)
         return
 
-    # 解析参数（仅用于提示“正在转换”）
     try:
-        number = float(args[0])
+        float(args[0])
     except ValueError:
         await bot.reply_to(message, _t("error.amount_invalid"))
         return
 
-    _from = args[1].upper().strip()
-    _to = args[2].upper().strip()
-
-    msg = await bot.reply_to(
-        message,
-        _t(
-            "status.bc_converting",
-            amount=number,
-            source_currency=_from,
-            target_currency=_to,
-        ),
-    )
-
-    result_text = await query_bc_text(command_args)
-    await bot.edit_message_text(result_text, message.chat.id, msg.message_id)
+    # 最快的汇率源返回后立即回复，其余来源返回后再编辑同一条消息
+    reply = _ProgressiveReply(bot, message)
+    result_text = await query_bc_text(command_args, on_progress=reply.update)
+    await reply.finish(result_text)
 
 
 # ==================== 插件注册 ====================
@@ -903,6 +1296,25 @@ async def register_handlers(bot, middleware, plugin_name):
 
     global bot_instance
     bot_instance = bot
+    middleware.register_cron_job(
+        plugin_name,
+        "ecb_refresh",
+        ECB_REFRESH_CRON,
+        ECB_REFRESH_TIMEZONE,
+        refresh_ecb_rates,
+        toggleable=False,
+    )
+    middleware.register_cron_job(
+        plugin_name,
+        "unionpay_prefetch",
+        UNIONPAY_PREFETCH_CRON,
+        UNIONPAY_PREFETCH_TIMEZONE,
+        prefetch_unionpay_rates,
+        toggleable=False,
+    )
+    # 启动时预热：有快照则直接可用，同时后台拉取最新数据
+    if _ecb_table is None:
+        _refresh_ecb_in_background()
     middleware.register_command_handler(
         commands=["bc"],
         callback=handle_bc_command,
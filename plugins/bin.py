@@ -11,6 +11,7 @@ from telebot import types
 from loguru import logger
 from utils.i18n import _t
 from utils.yaml import BotConfig
+from utils.http_client import BotHttp
 
 # ==================== 插件元数据 ====================
 __plugin_name__ = "bin"
@@ -73,7 +74,9 @@ async def _query_handyapi_bin(
 ) -> dict[str, Any]:
     headers = {"x-api-key": api_key}
     async with session.get(
-        HANDYAPI_BIN_URL.format(card_bin=card_bin), headers=headers
+        HANDYAPI_BIN_URL.format(card_bin=card_bin),
+        headers=headers,
+        timeout=REQUEST_TIMEOUT,
     ) as r:
         if r.status == 404:
             raise BinNotFoundError
@@ -92,7 +95,9 @@ async def _query_handyapi_bin(
 async def _query_binlist_bin(
     session: aiohttp.ClientSession, card_bin: str
 ) -> dict[str, Any]:
-    async with session.get(BINLIST_BIN_URL.format(card_bin=card_bin)) as r:
+    async with session.get(
+        BINLIST_BIN_URL.format(card_bin=card_bin), timeout=REQUEST_TIMEOUT
+    ) as r:
         if r.status == 404:
             raise BinNotFoundError
         if r.status == 429:
@@ -152,21 +157,19 @@ async def query_bin_text(card_bin: str) -> str:
         return _t("error.invalid_bin_parameter")
 
     try:
-        async with aiohttp.ClientSession(timeout=REQUEST_TIMEOUT) as session:
-            handyapi_key = _get_handyapi_api_key()
-            if handyapi_key:
-                try:
-                    bin_json = await _query_handyapi_bin(
-                        session, card_bin, handyapi_key
-                    )
-                    return _format_handyapi_bin(card_bin, bin_json)
-                except (aiohttp.ClientError, BinNotFoundError) as e:
-                    logger.warning(f"HandyAPI BIN lookup failed, fallback: {e}")
-                except (BinRateLimitError, BinRequestError, ValueError) as e:
-                    logger.warning(f"HandyAPI BIN lookup failed, fallback: {e}")
-
-            bin_json = await _query_binlist_bin(session, card_bin)
-            return _format_binlist_bin(card_bin, bin_json)
+        session = BotHttp.session()
+        handyapi_key = _get_handyapi_api_key()
+        if handyapi_key:
+            try:
+                bin_json = await _query_handyapi_bin(session, card_bin, handyapi_key)
+                return _format_handyapi_bin(card_bin, bin_json)
+            except (aiohttp.ClientError, BinNotFoundError) as e:
+                logger.warning(f"HandyAPI BIN lookup failed, fallback: {e}")
+            except (BinRateLimitError, BinRequestError, ValueError) as e:
+                logger.warning(f"HandyAPI BIN lookup failed, fallback: {e}")
+
+        bin_json = await _query_binlist_bin(session, card_bin)
+        return _format_binlist_bin(card_bin, bin_json)
     except BinNotFoundError:
         return _t("error.bin_not_found")
     except BinRateLimitError:
@@ -3,13 +3,14 @@
 # @Author  : KimmyXYC
 # @File    : icp.py
 # @Software: PyCharm
-import aiohttp
 from telebot import types
 from loguru import logger
 
 from app.utils import markdown_to_telegram_html, command_error_msg
 from utils.i18n import _t
 from utils.yaml import BotConfig
+from utils.http_client import BotHttp
+from utils.circuit_breaker import BotBreakers, CircuitOpenError
 
 # ==================== 插件元数据 ====================
 __plugin_name__ = "icp"
@@ -114,29 +115,41 @@ async def icp_record_check(domain, retries=5):
     params = {"search": domain}
     last_reason = _t("error.all_retries_failed")
 
+    breaker = BotBreakers.get("icp")
     for attempt in range(retries):
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(url, params=params, timeout=20) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data["code"] == 200:
-                            return True, data["params"]["list"]
-                        else:
-                            reason = data.get("message", str(data))
-                            error = data.get("error", "")
-                            logger.warning(
-                                f"Attempt {attempt + 1} got code {data['code']}: {reason}"
-                                + (f" | error: {error}" if error else "")
-                            )
-                            last_reason = reason
+        session = BotHttp.session()
+        try:
+            response = await breaker.call(
+                session.get,
+                url,
+                params=params,
+                timeout=20,
+                failure_if=lambda r: r.status >= 500 or r.status == 429,
+            )
+            async with response:
+                if response.status == 200:
+                    data = await response.json()
+                    if data["code"] == 200:
+                        return True, data["params"]["list"]
                     else:
-                        body = await response.text()
+                        reason = data.get("message", str(data))
+                        error = data.get("error", "")
                         logger.warning(
-                            f"Attempt {attempt + 1} failed with HTTP {response.status}: {body[:200]}"
+                            f"Attempt {attempt + 1} got code {data['code']}: {reason}"
+                            + (f" | error: {error}" if error else "")
                         )
-            except Exception as e:
-                logger.error(f"Attempt {attempt + 1} failed with exception: {e}")
+                        last_reason = reason
+                else:
+                    body = await response.text()
+                    logger.warning(
+                        f"Attempt {attempt + 1} failed with HTTP {response.status}: {body[:200]}"
+                    )
+        except CircuitOpenError as e:
+            # 上游持续失败时不再继续重试
+            logger.warning(f"ICP lookup skipped: {e}")
+            return False, _t("error.source_unavailable")
+        except Exception as e:
+            logger.error(f"Attempt {attempt + 1} failed with exception: {e}")
 
     return False, last_reason
 
@@ -5,11 +5,11 @@
 # @Software: PyCharm
 import re
 import idna
-import aiohttp
 from telebot import types
 from loguru import logger
 from app.utils import escape_md_v2_text, command_error_msg
 from utils.i18n import _t
+from utils.http_client import BotHttp
 
 # ==================== 插件元数据 ====================
 __plugin_name__ = "ip"
@@ -139,16 +139,16 @@ async def ipapi_ip(ip_addr):
     params = {
         "fields": "status,message,country,regionName,city,lat,lon,isp,org,as,mobile,proxy,hosting,query"
     }
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, params=params) as response:
-            if response.status == 200:
-                data = await response.json()
-                if data["status"] == "success":
-                    return True, data
-                else:
-                    return False, data
+    session = BotHttp.session()
+    async with session.get(url, params=params) as response:
+        if response.status == 200:
+            data = await response.json()
+            if data["status"] == "success":
+                return True, data
             else:
-                return False, f"Request failed with status {response.status}"
+                return False, data
+        else:
+            return False, f"Request failed with status {response.status}"
 
 
 def convert_to_punycode(domain):
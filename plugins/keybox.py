@@ -3,13 +3,14 @@
 # @Author  : KimmyXYC
 # @File    : keybox.py
 # @Software: PyCharm
-import aiohttp
+import asyncio
 import json
-import tempfile
 import time
 import os
 import re
 import xml.etree.ElementTree as ET
+from xml.parsers import expat
+from dataclasses import dataclass, field
 from telebot import types
 from loguru import logger
 from datetime import datetime, timezone
@@ -18,9 +19,10 @@ from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import padding, ec
 from app.utils import markdown_to_telegram_html
-from utils.elaradb import BotElara
+from utils.kvstore import BotKV
 from utils.yaml import BotConfig
 from utils.i18n import _t
+from utils.http_client import BotHttp
 
 # ==================== 插件元数据 ====================
 __plugin_name__ = "keybox"
@@ -35,6 +37,31 @@ __command_descriptions__ = {"check": "检查 keybox.xml 文件"}
 __command_help__ = {"check": "/check - 检查 keybox.xml 文件"}
 
 
+# ==================== 吊销列表缓存 ====================
+REVOCATION_LIST_URL = "https://android.googleapis.com/attestation/status"
+REVOCATION_REFRESH_CRON = "*/30 * * * *"
+REVOCATION_REFRESH_TIMEZONE = "UTC"
+# 超过该时长未能与 Google 确认时，检查结果中提示列表可能过期
+REVOCATION_MAX_AGE = 6 * 3600
+# 检查时发现列表过期会触发后台刷新，两次尝试至少间隔这么久（秒）
+REVOCATION_RETRY_INTERVAL = 60
+REVOCATION_SNAPSHOT_PATH = "res/cache/attestation_status.json"
+REVOCATION_BUNDLED_PATH = "res/json/status.json"
+
+
+# ==================== 已知根证书 ====================
+# 根证书公钥 PEM -> 检查结果中的说明，新增根证书只需在此追加
+KNOWN_ROOTS = (
+    ("res/pem/google.pem", "✅ Google hardware attestation root certificate"),
+    ("res/pem/aosp_ec.pem", "🟡 AOSP software attestation root certificate (EC)"),
+    ("res/pem/aosp_rsa.pem", "🟡 AOSP software attestation root certificate (RSA)"),
+    ("res/pem/knox.pem", "✅ Samsung Knox attestation root certificate"),
+)
+
+# SubjectPublicKeyInfo DER 的 SHA-256 -> 说明，插件加载时构建
+_root_fingerprints: dict[bytes, str] = {}
+
+
 # ==================== 核心功能 ====================
 async def handle_keybox_check(bot, message: types.Message, document: types.Document):
     """
@@ -52,109 +79,226 @@ async def handle_keybox_check(bot, message: types.Message, document: types.Docum
     await keybox_check(bot, message, document)
 
 
-async def load_from_url():
+class RevocationList:
     """
-    Load the latest keybox status from Google's API.
-    :return: JSON response containing the keybox status.
-    :raises Exception: If the request fails or returns an error status.
+    Google 证书吊销列表的内存索引：吊销序列号集合与吊销原因。
+    定时用 ETag / Last-Modified 条件请求刷新，最近一次成功结果原子写入磁盘快照。
     """
-    url = "https://android.googleapis.com/attestation/status"
 
-    headers = {
-        "Cache-Control": "max-age=0, no-cache, no-store, must-revalidate",
-        "Pragma": "no-cache",
-        "Expires": "0",
-    }
+    def __init__(self):
+        self.serials: frozenset[str] = frozenset()
+        self.reasons: dict[str, str] = {}
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+        # 最近一次与 Google 确认（200 或 304）的时间；内置列表为 None
+        self.fetched_at: float | None = None
+        self._load_task: asyncio.Task | None = None
+        self._refresh_task: asyncio.Task | None = None
+        self._refresh_started_at = 0.0
+
+    @property
+    def is_stale(self) -> bool:
+        return (
+            self.fetched_at is None
+            or time.time() - self.fetched_at > REVOCATION_MAX_AGE
+        )
 
-    params = {"ts": int(time.time())}
+    def reason(self, serial_number: str) -> str | None:
+        """序列号被吊销时返回原因，否则返回 None"""
+        if serial_number not in self.serials:
+            return None
+        return self.reasons.get(serial_number) or "REVOKED"
+
+    def _apply(self, entries: dict[str, dict]) -> None:
+        reasons = {
+            serial.lower(): entry.get("reason") or entry.get("status") or "REVOKED"
+            for serial, entry in entries.items()
+        }
+        self.reasons = reasons
+        self.serials = frozenset(reasons)
+
+    async def load_local(self) -> None:
+        """
+        加载磁盘快照，没有快照时使用内置的 res/json/status.json。
+        只加载一次，并发调用等待同一次加载完成，不会读到空列表。
+        """
+        if self._load_task is None:
+            self._load_task = asyncio.create_task(self._load_from_disk())
+        await asyncio.shield(self._load_task)
+
+    async def _load_from_disk(self) -> None:
+        snapshot = await asyncio.to_thread(_read_json, REVOCATION_SNAPSHOT_PATH)
+        if snapshot and snapshot.get("entries"):
+            self._apply(snapshot["entries"])
+            self.etag = snapshot.get("etag")
+            self.last_modified = snapshot.get("last_modified")
+            self.fetched_at = snapshot.get("fetched_at")
+            logger.info(f"🔐 从快照加载吊销列表，共 {len(self.serials)} 条")
+            return
+        bundled = await asyncio.to_thread(_read_json, REVOCATION_BUNDLED_PATH)
+        if bundled and bundled.get("entries"):
+            self._apply(bundled["entries"])
+            logger.info(f"🔐 使用内置吊销列表，共 {len(self.serials)} 条")
+
+    async def refresh(self) -> bool:
+        """条件请求 Google 吊销列表；失败时保留当前数据"""
+        headers = {"Cache-Control": "no-cache"}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        session = BotHttp.session()
+        try:
+            async with session.get(REVOCATION_LIST_URL, headers=headers) as response:
+                if response.status == 304:
+                    self.fetched_at = time.time()
+                    logger.debug("吊销列表未变化 (304)")
+                    return True
+                if response.status != 200:
+                    raise Exception(f"Error fetching data: {response.status}")
+                body = await response.read()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+            data = await asyncio.to_thread(json.loads, body)
+            entries = data["entries"]
+        except Exception as e:
+            logger.warning(f"吊销列表刷新失败，继续使用旧数据: {e}")
+            return False
+
+        self._apply(entries)
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.time()
+        await asyncio.to_thread(
+            _write_json_atomic,
+            REVOCATION_SNAPSHOT_PATH,
+            {
+                "etag": etag,
+                "last_modified": last_modified,
+                "fetched_at": self.fetched_at,
+                "entries": entries,
+            },
+        )
+        logger.debug(f"吊销列表已刷新，共 {len(self.serials)} 条")
+        return True
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers, params=params) as response:
-            if response.status != 200:
-                raise Exception(f"Error fetching data: {response.status}")
-            return await response.json()
+    def refresh_in_background(self) -> None:
+        """同一时刻只保留一个刷新任务，且不会在上游故障时反复重试"""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        if time.time() - self._refresh_started_at < REVOCATION_RETRY_INTERVAL:
+            return
+        self._refresh_started_at = time.time()
+        self._refresh_task = asyncio.create_task(self.refresh())
 
 
-def get_device_ids_and_algorithms(xml_file):
-    """
-    Parse the XML file to extract device IDs and algorithms from Keybox elements.
-    :param xml_file: Path to the XML file.
-    :return: A list of dictionaries containing DeviceID and Algorithm.
-    :raises Exception: If the XML file cannot be parsed or if Keybox elements are not found.
-    """
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
+def _read_json(path: str) -> dict | None:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"读取 {path} 失败: {e}")
+        return None
 
-    results = []
-    for keybox in root.findall("Keybox"):
-        device_id = keybox.get("DeviceID")
 
-        for key in keybox.findall("Key"):
-            algorithm = key.get("algorithm")
-            device_info = {
-                "DeviceID": device_id if device_id else "Unknown",
-                "Algorithm": algorithm if algorithm else "Unknown",
-            }
-            results.append(device_info)
-    return results
+def _write_json_atomic(path: str, data: dict) -> None:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"保存 {path} 失败: {e}")
 
 
-def parse_number_of_certificates(xml_file):
-    """
-    Parse the XML file to get the number of certificates.
-    :param xml_file: Path to the XML file.
-    :return: The number of certificates as an integer.
-    :raises Exception: If the XML file cannot be parsed or if NumberOfCertificates is not found.
-    """
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
+revocation_list = RevocationList()
 
-    number_of_certificates = root.find(".//NumberOfCertificates")
 
-    if number_of_certificates is not None:
-        count = int(number_of_certificates.text.strip())
-        return count
-    else:
-        raise Exception("No NumberOfCertificates found.")
+async def refresh_revocation_list(bot=None) -> bool:
+    """定时任务回调：刷新吊销列表"""
+    await revocation_list.load_local()
+    return await revocation_list.refresh()
 
 
-def parse_certificates(xml_file, pem_number):
-    """
-    Parse the XML file to extract PEM formatted certificates.
-    :param xml_file: Path to the XML file.
-    :param pem_number: The number of PEM certificates to extract.
-    :return: A list of PEM formatted certificate contents.
-    :raises Exception: If the XML file cannot be parsed or if no PEM certificates are found.
-    """
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
+@dataclass
+class Keybox:
+    """keybox.xml 中与检查相关的内容，解析一次后供各项检查复用。"""
 
-    pem_certificates = root.findall('.//Certificate[@format="pem"]')
+    number_of_certificates: int
+    # 按文件顺序排列的 PEM 证书（叶子证书在前）
+    certificates: list[str]
+    private_key: str
+    # 每个 Key 的 DeviceID 与算法
+    device_info: list[dict[str, str]] = field(default_factory=list)
 
-    if pem_certificates is not None:
-        pem_contents = [cert.text.strip() for cert in pem_certificates[:pem_number]]
-        return pem_contents
-    else:
-        raise Exception("No Certificate found.")
 
+def _forbid_dtd(*_):
+    raise ValueError("DTD and entity declarations are not allowed in keybox XML.")
 
-def parse_private_key(xml_file):
+
+def _parse_xml(data: bytes) -> ET.Element:
+    """
+    Parse untrusted XML bytes into an element tree, refusing DTDs and entities.
+    :param data: Raw XML content.
+    :return: The root element.
     """
-    Parse the XML file to extract the private key.
-    :param xml_file: Path to the XML file.
-    :return: The private key as a string.
-    :raises Exception: If the XML file cannot be parsed or if no PrivateKey is found.
+    builder = ET.TreeBuilder()
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    # keybox 不会包含 DTD，遇到即拒绝，避免实体扩展与外部实体攻击
+    parser.StartDoctypeDeclHandler = _forbid_dtd
+    parser.EntityDeclHandler = _forbid_dtd
+    parser.ExternalEntityRefHandler = _forbid_dtd
+    parser.StartElementHandler = builder.start
+    parser.EndElementHandler = builder.end
+    parser.CharacterDataHandler = builder.data
+    parser.Parse(data, True)
+    return builder.close()
+
+
+def parse_keybox(data: bytes) -> Keybox:
     """
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
+    Parse a keybox XML document in a single pass.
+    :param data: Raw content of keybox.xml.
+    :return: A Keybox holding the certificates, private key and device info.
+    :raises Exception: If the XML cannot be parsed or a required element is missing.
+    """
+    root = _parse_xml(data)
 
-    private_key = root.find(".//PrivateKey")
+    number_of_certificates = root.find(".//NumberOfCertificates")
+    if number_of_certificates is None:
+        raise Exception("No NumberOfCertificates found.")
+    pem_number = int(number_of_certificates.text.strip())
 
-    if private_key is not None:
-        return private_key.text.strip()
-    else:
+    private_key = root.find(".//PrivateKey")
+    if private_key is None:
         raise Exception("No PrivateKey found.")
 
+    pem_certificates = root.findall('.//Certificate[@format="pem"]')
+
+    device_info = []
+    for keybox in root.findall("Keybox"):
+        device_id = keybox.get("DeviceID")
+        for key in keybox.findall("Key"):
+            algorithm = key.get("algorithm")
+            device_info.append(
+                {
+                    "DeviceID": device_id if device_id else "Unknown",
+                    "Algorithm": algorithm if algorithm else "Unknown",
+                }
+            )
+
+    return Keybox(
+        number_of_certificates=pem_number,
+        certificates=[cert.text.strip() for cert in pem_certificates[:pem_number]],
+        private_key=private_key.text.strip(),
+        device_info=device_info,
+    )
+
 
 def load_public_key_from_file(file_path):
     """
@@ -169,6 +313,51 @@ def load_public_key_from_file(file_path):
     return public_key
 
 
+def public_key_fingerprint(public_key) -> bytes:
+    """
+    SHA-256 of the key's SubjectPublicKeyInfo DER encoding.
+    :param public_key: The public key object.
+    :return: The 32-byte digest.
+    """
+    digest = hashes.Hash(hashes.SHA256())
+    digest.update(
+        public_key.public_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+    )
+    return digest.finalize()
+
+
+def load_root_fingerprints() -> dict[bytes, str]:
+    """
+    Load every known root public key once and index it by fingerprint.
+    :return: Mapping of SPKI SHA-256 fingerprint to its description.
+    """
+    fingerprints = {}
+    for file_path, description in KNOWN_ROOTS:
+        try:
+            public_key = load_public_key_from_file(file_path)
+        except Exception as e:
+            logger.error(f"加载根证书公钥失败 {file_path}: {e}")
+            continue
+        fingerprints[public_key_fingerprint(public_key)] = description
+    _root_fingerprints.clear()
+    _root_fingerprints.update(fingerprints)
+    return _root_fingerprints
+
+
+def match_known_root(public_key) -> str | None:
+    """
+    Look up a chain root's public key among the known roots.
+    :param public_key: The root certificate's public key.
+    :return: The root's description, or None when it is unknown.
+    """
+    if not _root_fingerprints:
+        load_root_fingerprints()
+    return _root_fingerprints.get(public_key_fingerprint(public_key))
+
+
 def compare_keys(public_key1, public_key2):
     """
     Compare two public keys for equality.
@@ -176,13 +365,7 @@ def compare_keys(public_key1, public_key2):
     :param public_key2: The second public key to compare.
     :return: True if the keys are equal, False otherwise.
     """
-    return public_key1.public_bytes(
-        encoding=serialization.Encoding.PEM,
-        format=serialization.PublicFormat.SubjectPublicKeyInfo,
-    ) == public_key2.public_bytes(
-        encoding=serialization.Encoding.PEM,
-        format=serialization.PublicFormat.SubjectPublicKeyInfo,
-    )
+    return public_key_fingerprint(public_key1) == public_key_fingerprint(public_key2)
 
 
 async def keybox_check(bot, message, document):
@@ -197,40 +380,30 @@ async def keybox_check(bot, message, document):
     botapi_config = BotConfig.get("botapi", {})
     use_local_path = botapi_config.get("enable", False)
 
-    temp_path = None
-    delete_temp = False
-
     if use_local_path:
-        temp_path = file_info.file_path
-        if not temp_path or not os.path.isfile(temp_path):
+        local_path = file_info.file_path
+        if not local_path or not os.path.isfile(local_path):
             logger.error(
-                f"[Keybox Check][{message.chat.id}]: local file not found: {temp_path}"
+                f"[Keybox Check][{message.chat.id}]: local file not found: {local_path}"
             )
             await bot.reply_to(message, _t("error.local_botapi_path_inaccessible"))
             return
+        with open(local_path, "rb") as file:
+            keybox_data = file.read()
     else:
-        downloaded_file = await bot.download_file(file_info.file_path)
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            temp_file.write(downloaded_file)
-            temp_file.flush()
-            temp_path = temp_file.name
-            delete_temp = True
+        keybox_data = await bot.download_file(file_info.file_path)
 
     try:
-        pem_number = parse_number_of_certificates(temp_path)
-        pem_certificates = parse_certificates(temp_path, pem_number)
-        private_key = parse_private_key(temp_path)
-        keybox_info = get_device_ids_and_algorithms(temp_path)
+        keybox = parse_keybox(keybox_data)
     except Exception as e:
         logger.error(f"[Keybox Check][{message.chat.id}]: {e}")
         await bot.reply_to(message, e)
         return
-    finally:
-        if delete_temp and temp_path:
-            try:
-                os.remove(temp_path)
-            except Exception:
-                pass
+    pem_number = keybox.number_of_certificates
+    pem_certificates = keybox.certificates
+    private_key = keybox.private_key
+    keybox_info = keybox.device_info
+
     try:
         certificate = x509.load_pem_x509_certificate(
             pem_certificates[0].encode(), default_backend()
@@ -249,7 +422,7 @@ async def keybox_check(bot, message, document):
         return
 
     # Banned Keybox Check List
-    banned_sn = BotElara.get("banned_sn", [])
+    banned_sn = BotKV.get("banned_sn", [])
 
     # Keybox Information
     reply = f"📱 *Device ID:* `{keybox_info[0]['DeviceID']}`"
@@ -350,19 +523,9 @@ async def keybox_check(bot, message, document):
     root_certificate = x509.load_pem_x509_certificate(
         pem_certificates[-1].encode(), default_backend()
     )
-    root_public_key = root_certificate.public_key()
-    google_public_key = load_public_key_from_file("res/pem/google.pem")
-    aosp_ec_public_key = load_public_key_from_file("res/pem/aosp_ec.pem")
-    aosp_rsa_public_key = load_public_key_from_file("res/pem/aosp_rsa.pem")
-    knox_public_key = load_public_key_from_file("res/pem/knox.pem")
-    if compare_keys(root_public_key, google_public_key):
-        reply += "\n✅ Google hardware attestation root certificate"
-    elif compare_keys(root_public_key, aosp_ec_public_key):
-        reply += "\n🟡 AOSP software attestation root certificate (EC)"
-    elif compare_keys(root_public_key, aosp_rsa_public_key):
-        reply += "\n🟡 AOSP software attestation root certificate (RSA)"
-    elif compare_keys(root_public_key, knox_public_key):
-        reply += "\n✅ Samsung Knox attestation root certificate"
+    root_description = match_known_root(root_certificate.public_key())
+    if root_description:
+        reply += f"\n{root_description}"
     else:
         reply += "\n❌ Unknown root certificate"
 
@@ -371,13 +534,10 @@ async def keybox_check(bot, message, document):
         reply += "\n🟡 More than 3 certificates in the keychain"
 
     # Validation of certificate revocation
-    try:
-        status_json = await load_from_url()
-    except Exception:
-        logger.error("Failed to fetch Google's revoked keybox list")
-        with open("res/json/status.json", "r", encoding="utf-8") as file:
-            status_json = json.load(file)
-            reply += "\n⚠️ Using local revoked keybox list"
+    await revocation_list.load_local()
+    if revocation_list.is_stale:
+        revocation_list.refresh_in_background()
+        reply += "\n⚠️ Using local revoked keybox list"
 
     status = None
     for i in range(pem_number):
@@ -386,8 +546,8 @@ async def keybox_check(bot, message, document):
         )
         serial_number = certificate.serial_number
         serial_number_string = hex(serial_number)[2:].lower()
-        if status_json["entries"].get(serial_number_string, None):
-            status = status_json["entries"][serial_number_string]
+        status = revocation_list.reason(serial_number_string)
+        if status:
             break
         if banned_sn and serial_number_string in banned_sn:
             reply += "\n❌ Serial number found in banned keybox list"
@@ -395,7 +555,7 @@ async def keybox_check(bot, message, document):
     if not status:
         reply += "\n✅ Serial number not found in Google's revoked keybox list"
     else:
-        reply += f"\n❌ Serial number found in Google's revoked keybox list\n🔍 *Reason:* `{status['reason']}`"
+        reply += f"\n❌ Serial number found in Google's revoked keybox list\n🔍 *Reason:* `{status}`"
     reply += f"\n⏱ *Check Time (UTC):* {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
     reply = markdown_to_telegram_html(reply)
     await bot.reply_to(message, reply, parse_mode="HTML")
@@ -409,12 +569,12 @@ async def ban_keybox(bot, message, sn):
     :param sn: Serial number of the keybox to ban
     :return: None
     """
-    banned_sn = BotElara.get("banned_sn", [])
+    banned_sn = BotKV.get("banned_sn", [])
     if sn in banned_sn:
         await bot.reply_to(message, _t("keybox.ban.already_banned"))
     else:
         banned_sn.append(sn)
-        BotElara.set("banned_sn", banned_sn)
+        BotKV.set("banned_sn", banned_sn)
         await bot.reply_to(message, _t("keybox.ban.success"))
 
 
@@ -426,13 +586,13 @@ async def unban_keybox(bot, message, sn):
     :param sn: Serial number of the keybox to unban
     :return: None
     """
-    banned_sn = BotElara.get("banned_sn")
+    banned_sn = BotKV.get("banned_sn")
     if banned_sn is None:
         await bot.reply_to(message, _t("keybox.ban.empty"))
     else:
         if sn in banned_sn:
             banned_sn.remove(sn)
-            BotElara.set("banned_sn", banned_sn)
+            BotKV.set("banned_sn", banned_sn)
             await bot.reply_to(message, _t("keybox.unban.success"))
         else:
             await bot.reply_to(message, _t("keybox.ban.not_found"))
@@ -445,6 +605,19 @@ async def register_handlers(bot, middleware, plugin_name):
     global bot_instance
     bot_instance = bot
 
+    middleware.register_cron_job(
+        plugin_name,
+        "revocation_refresh",
+        REVOCATION_REFRESH_CRON,
+        REVOCATION_REFRESH_TIMEZONE,
+        refresh_revocation_list,
+        toggleable=False,
+    )
+    load_root_fingerprints()
+    # 启动时预热：先加载本地列表，同时后台向 Google 确认最新版本
+    await revocation_list.load_local()
+    revocation_list.refresh_in_background()
+
     # 命令处理器 - 需要回复一个文件
     async def check_command_handler(bot, message: types.Message):
         if not (message.reply_to_message and message.reply_to_message.document):
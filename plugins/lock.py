@@ -5,6 +5,7 @@
 # @Software: PyCharm
 import asyncio
 import re
+from typing import Dict, FrozenSet, List
 
 from telebot import types
 from loguru import logger
@@ -12,7 +13,8 @@ from app.utils import command_error_msg
 from app.security.permissions import has_group_admin_permission
 from utils.i18n import _t
 
-from utils.elaradb import BotElara
+from utils.kvstore import BotKV
+from utils.cache_bus import BotCacheBus
 from setting.telegrambot import BotSetting
 
 # ==================== 插件元数据 ====================
@@ -37,6 +39,9 @@ __command_help__ = {
 NON_LOCKABLE_COMMANDS = {"plugin_settings", "lock", "unlock", "list"}
 VALID_COMMAND_PATTERN = re.compile(r"^[a-z0-9_]+$")
 
+# chat_id -> 已清洗的锁定命令集合；首次访问时从存储加载，增删命令时同步更新
+_locked_commands: Dict[str, FrozenSet[str]] = {}
+
 
 # ==================== 核心功能 ====================
 async def check_permissions(bot, message: types.Message):
@@ -106,7 +111,7 @@ def _is_valid_command_name(command: str) -> bool:
 
 
 def _get_sanitized_locklist(chat_id, persist: bool = True):
-    locklist = BotElara.get(str(chat_id), []) or []
+    locklist = BotKV.get(str(chat_id), []) or []
     sanitized = []
     for command in locklist:
         normalized = _normalize_command_name(str(command))
@@ -120,10 +125,26 @@ def _get_sanitized_locklist(chat_id, persist: bool = True):
         sanitized.append(normalized)
 
     if persist and sanitized != locklist:
-        BotElara.set(str(chat_id), sanitized)
+        _save_locklist(chat_id, sanitized)
+    else:
+        _locked_commands[str(chat_id)] = frozenset(sanitized)
     return sanitized
 
 
+def _save_locklist(chat_id, locklist: List[str]):
+    BotKV.set(str(chat_id), locklist)
+    _locked_commands[str(chat_id)] = frozenset(locklist)
+
+
+def _get_locked_commands(chat_id) -> FrozenSet[str]:
+    """获取群组的锁定命令集合（内存索引，未命中时加载一次）"""
+    locked = _locked_commands.get(str(chat_id))
+    if locked is None:
+        _get_sanitized_locklist(chat_id)
+        locked = _locked_commands[str(chat_id)]
+    return locked
+
+
 def batch_add_to_locklist(chat_id, cmd):
     """
     批量添加命令到锁定列表
@@ -151,7 +172,7 @@ def batch_add_to_locklist(chat_id, cmd):
             added.append(normalized)
         else:
             already_exist.append(normalized)
-    BotElara.set(str(chat_id), locklist)
+    _save_locklist(chat_id, locklist)
     return {
         "added": added,
         "already_exist": already_exist,
@@ -183,7 +204,7 @@ def batch_remove_from_locklist(chat_id, cmd):
             removed.append(normalized)
         else:
             not_found.append(normalized)
-    BotElara.set(str(chat_id), locklist)
+    _save_locklist(chat_id, locklist)
     return {
         "removed": removed,
         "not_found": not_found,
@@ -284,6 +305,14 @@ async def register_handlers(bot, middleware, plugin_name):
     global bot_instance
     bot_instance = bot
 
+    # 其他进程修改锁定列表后，BotKV 先重新加载该键，再丢弃对应的内存索引
+    BotCacheBus.subscribe(
+        "kv",
+        plugin_name,
+        lambda key: _locked_commands.pop(key, None),
+        _locked_commands.clear,
+    )
+
     async def lock_handler(bot, message: types.Message):
         command_args = (message.text or "").split()
         if len(command_args) == 1:
@@ -310,15 +339,12 @@ async def register_handlers(bot, middleware, plugin_name):
         await handle_list_command(bot, message)
 
     async def lock_guard_handler(bot, message: types.Message):
-        command_name = _extract_command_name(message.text or "")
-        if not command_name:
-            return True
-
-        if command_name in NON_LOCKABLE_COMMANDS:
+        locked = _get_locked_commands(message.chat.id)
+        if not locked:
             return True
 
-        lock_list = _get_sanitized_locklist(message.chat.id)
-        if command_name not in lock_list:
+        # 集合中不含 NON_LOCKABLE_COMMANDS，单次成员判断即可
+        if _extract_command_name(message.text or "") not in locked:
             return True
 
         asyncio.create_task(
@@ -15,7 +15,6 @@ from typing import List, Tuple
 
 from loguru import logger
 from telebot import types
-from telebot.asyncio_helper import ApiTelegramException
 from PIL import Image
 from utils.telegram_send_queue import telegram_send_queue
 from utils.yaml import BotConfig
@@ -246,16 +245,14 @@ async def handle_document_image(bot, message: types.Message, document: types.Doc
                         caption = _t(
                             "label.slice_single", current=start_idx + 1, total=total
                         )
+                        # 429 由 LocalizedBot 的限速层等待 retry_after 后自动重试
                         await telegram_send_queue.enqueue(
                             message.chat.id,
-                            lambda: _send_with_retry(
-                                lambda: bot.send_photo(
-                                    chat_id=message.chat.id,
-                                    photo=bio,
-                                    caption=caption,
-                                    reply_to_message_id=message.message_id,
-                                ),
-                                seekables=[bio],
+                            lambda: bot.send_photo(
+                                chat_id=message.chat.id,
+                                photo=bio,
+                                caption=caption,
+                                reply_to_message_id=message.message_id,
                             ),
                             seekables=[bio],
                         )
@@ -286,13 +283,10 @@ async def handle_document_image(bot, message: types.Message, document: types.Doc
 
                     await telegram_send_queue.enqueue(
                         message.chat.id,
-                        lambda: _send_with_retry(
-                            lambda: bot.send_media_group(
-                                chat_id=message.chat.id,
-                                media=media,
-                                reply_to_message_id=message.message_id,
-                            ),
-                            seekables=bio_list,
+                        lambda: bot.send_media_group(
+                            chat_id=message.chat.id,
+                            media=media,
+                            reply_to_message_id=message.message_id,
                         ),
                         seekables=bio_list,
                     )
@@ -310,63 +304,6 @@ async def handle_document_image(bot, message: types.Message, document: types.Doc
             pass
 
 
-async def _send_with_retry(
-    send_coro_factory, max_retries: int = 3, seekables: list | None = None
-):
-    """
-    通用发送重试：当遇到 Telegram 429（Too Many Requests）错误时，读取 retry_after 秒等待后重试。
-    send_coro_factory: 一个无参可调用，返回一个 awaitable（即调用具体的 bot 发送方法）。
-    seekables: 发送时用到的 BytesIO 流列表，重试前会自动 seek(0) 以复用流。
-    """
-    from asyncio import sleep
-    from loguru import logger as _lg
-    import re
-
-    def _extract_retry_after(exc: Exception) -> int | None:
-        if isinstance(exc, ApiTelegramException):
-            params = getattr(exc, "result_json", {}).get("parameters", {})
-            retry_after = params.get("retry_after")
-            if retry_after is not None:
-                try:
-                    return int(retry_after)
-                except (TypeError, ValueError):
-                    pass
-
-            description = getattr(exc, "description", "") or str(exc)
-        else:
-            description = str(exc)
-
-        match = re.search(r"retry(?:\s|_)?after[:\s]+(\d+)", description, re.IGNORECASE)
-        return int(match.group(1)) if match else None
-
-    def _is_telegram_rate_limit(exc: Exception) -> bool:
-        if isinstance(exc, ApiTelegramException):
-            return getattr(exc, "error_code", None) == 429
-
-        text = str(exc)
-        return "Too Many Requests" in text or "429" in text
-
-    for attempt in range(1, max_retries + 1):
-        try:
-            return await send_coro_factory()
-        except Exception as e:
-            # 仅在 429 错误时重试，其余异常直接抛出
-            if _is_telegram_rate_limit(e) and attempt < max_retries:
-                retry_after = _extract_retry_after(e)
-                retry_sec = (retry_after if retry_after is not None else 5) + 1
-                _lg.warning(
-                    f"[Retry] Telegram 429; waiting {retry_sec}s and retrying (attempt {attempt}/{max_retries})"
-                )
-                await sleep(retry_sec)
-                # 复用 BytesIO 流：将所有流 seek 回开头
-                if seekables:
-                    for s in seekables:
-                        s.seek(0)
-                continue
-            # 非 429 错误，或已达最大重试次数，直接抛出
-            raise
-
-
 # ==================== 插件注册 ====================
 async def register_handlers(bot, middleware, plugin_name):
     """注册插件处理器"""
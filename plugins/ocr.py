@@ -14,6 +14,7 @@ from telebot import types
 
 from utils.i18n import _t
 from utils.yaml import BotConfig
+from utils.http_client import BotHttp
 
 # ==================== 插件元数据 ====================
 __plugin_name__ = "ocr"
@@ -176,13 +177,13 @@ async def _call_ocr_api(file_bytes: bytes, file_type: int, conf: dict) -> str:
     }
 
     timeout = aiohttp.ClientTimeout(total=conf["timeout"])
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        async with session.post(
-            conf["api_url"], headers=headers, json=payload
-        ) as response:
-            body = await response.text()
-            if response.status != 200:
-                raise RuntimeError(f"OCR API 请求失败 ({response.status}): {body[:500]}")
+    session = BotHttp.session()
+    async with session.post(
+        conf["api_url"], headers=headers, json=payload, timeout=timeout
+    ) as response:
+        body = await response.text()
+        if response.status != 200:
+            raise RuntimeError(f"OCR API 请求失败 ({response.status}): {body[:500]}")
 
     try:
         data = json.loads(body)
@@ -14,12 +14,12 @@
 """
 
 import re
-import aiohttp
 from typing import Optional, Tuple
 from telebot import types
 from loguru import logger
 
 from app.utils import escape_md_v2_text
+from utils.http_client import BotHttp
 
 # ==================== 插件元数据 ====================
 __plugin_name__ = "quote_reply"
@@ -57,11 +57,11 @@ async def _get_name_by_username(username: str) -> str:
     """
     url = _build_tme_link(username)
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=8) as resp:
-                if resp.status != 200:
-                    return ""
-                html = await resp.text()
+        session = BotHttp.session()
+        async with session.get(url, timeout=8) as resp:
+            if resp.status != 200:
+                return ""
+            html = await resp.text()
     except Exception:
         return ""
 
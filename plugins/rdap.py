@@ -11,6 +11,7 @@ from telebot import types
 from loguru import logger
 from app.utils import command_error_msg
 from utils.i18n import _t
+from utils.http_client import BotHttp
 
 # ==================== 插件元数据 ====================
 __plugin_name__ = "rdap"
@@ -315,19 +316,19 @@ async def rdap_query(data: str) -> tuple[bool, str]:
 
         # 发送HTTP请求
         timeout = aiohttp.ClientTimeout(total=10)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get(query_url) as response:
-                if response.status == 404:
-                    return False, _t("error.no_rdap_record")
-                elif response.status != 200:
-                    return False, _t("error.rdap_http_failed", status=response.status)
-
-                # 解析JSON响应
-                rdap_data = await response.json()
-
-                # 格式化输出
-                formatted_result = format_rdap_response(rdap_data)
-                return True, formatted_result
+        session = BotHttp.session()
+        async with session.get(query_url, timeout=timeout) as response:
+            if response.status == 404:
+                return False, _t("error.no_rdap_record")
+            elif response.status != 200:
+                return False, _t("error.rdap_http_failed", status=response.status)
+
+            # 解析JSON响应
+            rdap_data = await response.json()
+
+            # 格式化输出
+            formatted_result = format_rdap_response(rdap_data)
+            return True, formatted_result
 
     except aiohttp.ClientError as e:
         logger.error(f"RDAP查询网络错误: {e}")
@@ -3,9 +3,10 @@
 # @Author  : KimmyXYC
 # @File    : remake.py
 # @Software: PyCharm
-import numpy as np
+import csv
+import os
 import random
-import pandas as pd
+from typing import List, Optional, Sequence
 
 from loguru import logger
 from telebot import types
@@ -44,61 +45,98 @@ async def setup_database(conn_pool):
 
 
 # ==================== 核心功能 ====================
-def get_csv_data_list():
-    df = pd.read_csv("res/csv/data.csv", encoding="utf-8")
+CSV_PATH = "res/csv/data.csv"
+GENDERS = (
+    "男孩子",
+    "女孩子",
+    "MtF",
+    "FtM",
+    "MtC",
+    "萝莉",
+    "正太",
+    "武装直升机",
+    "沃尔玛购物袋",
+    "星巴克",
+    "太监",
+    "无性别",
+    "扶她",
+    "死胎",
+)
+
+
+class AliasSampler:
+    """Walker 别名法加权抽样：O(n) 预处理，每次抽样 O(1)。"""
+
+    def __init__(self, items: Sequence[str], weights: Sequence[float]):
+        if not items or len(items) != len(weights):
+            raise ValueError("items 与 weights 必须非空且长度一致")
+        total = float(sum(weights))
+        if total <= 0 or any(w < 0 for w in weights):
+            raise ValueError("weights 必须非负且总和大于 0")
+
+        n = len(items)
+        self.items = list(items)
+        self.prob: List[float] = [0.0] * n
+        self.alias: List[int] = list(range(n))
+
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, g = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = g
+            scaled[g] -= 1.0 - scaled[s]
+            (small if scaled[g] < 1.0 else large).append(g)
+        # 剩余项（含浮点误差残留）概率为 1
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self, rng: random.Random = random) -> str:
+        i = rng.randrange(len(self.items))
+        return (
+            self.items[i] if rng.random() < self.prob[i] else self.items[self.alias[i]]
+        )
+
 
-    country_list = df["Country"].tolist()
-    weight_list = df["Weight"].tolist()
+# (csv mtime, sampler)；CSV 修改后下次抽样时自动重建
+_country_sampler: Optional[tuple] = None
 
-    return country_list, weight_list
+
+def load_country_sampler(path: str = CSV_PATH) -> AliasSampler:
+    global _country_sampler
+    mtime = os.stat(path).st_mtime_ns
+    if _country_sampler is None or _country_sampler[0] != mtime:
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        sampler = AliasSampler(
+            [row["Country"] for row in rows], [float(row["Weight"]) for row in rows]
+        )
+        _country_sampler = (mtime, sampler)
+        logger.info(f"[Remake] 已加载 {len(rows)} 个国家/地区权重")
+    return _country_sampler[1]
 
 
 async def handle_remake_command(bot, message):
-    rd_data, rd_weights = get_csv_data_list()
-    country_choice = np.random.choice(rd_data, p=np.array(rd_weights) / sum(rd_weights))
-    sex_choice = random.choice(
-        [
-            "男孩子",
-            "女孩子",
-            "MtF",
-            "FtM",
-            "MtC",
-            "萝莉",
-            "正太",
-            "武装直升机",
-            "沃尔玛购物袋",
-            "星巴克",
-            "太监",
-            "无性别",
-            "扶她",
-            "死胎",
-        ]
-    )
+    country_choice = load_country_sampler().sample()
+    sex_choice = random.choice(GENDERS)
     await bot.reply_to(
         message,
         _t("result.remake_success", country=country_choice, gender=sex_choice),
     )
     conn = BotDatabase.conn
     try:
-        result = await conn.execute(
-            """UPDATE remake 
-                    SET count = count + 1,
-                        country = $2,
-                        gender = $3
-               WHERE user_id = $1""",
+        await conn.execute(
+            """INSERT INTO remake (user_id, count, country, gender)
+               VALUES ($1, 1, $2, $3)
+               ON CONFLICT (user_id) DO UPDATE
+                   SET count = remake.count + 1,
+                       country = EXCLUDED.country,
+                       gender = EXCLUDED.gender""",
             message.from_user.id,
             country_choice,
             sex_choice,
         )
-        if result == "UPDATE 0":
-            await conn.execute(
-                """INSERT INTO remake (user_id, count, country, gender)
-                   VALUES ($1, 1, $2, $3) 
-                   ON CONFLICT (user_id) DO NOTHING""",
-                message.from_user.id,
-                country_choice,
-                sex_choice,
-            )
     except Exception as e:
         logger.error(f"Database error: {e}")
 
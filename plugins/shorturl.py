@@ -12,6 +12,7 @@ from telebot import types
 
 from utils.yaml import BotConfig
 from utils.i18n import _t
+from utils.http_client import BotHttp
 from app.utils import command_error_msg
 
 # ==================== 插件元数据 ====================
@@ -56,27 +57,27 @@ async def handle_short_command(bot, message: types.Message, url):
         params = {"url": url}
         try:
             timeout = aiohttp.ClientTimeout(total=5)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(server, json=params) as response:
-                    if response.status != 200:
-                        logger.error(
-                            f"[Short URL][{message.chat.id}]: Can't Get Short URL: {response.status}"
-                        )
-                        await bot.edit_message_text(
-                            _t(
-                                "error.generate_failed_backend_invalid",
-                                reason=response.status,
-                            ),
-                            message.chat.id,
-                            reply.message_id,
-                            disable_web_page_preview=True,
-                            parse_mode="Markdown",
-                        )
-                        return
-                    if "application/json" in response.headers["content-type"]:
-                        json_data = await response.json()
-                    else:
-                        json_data = json.loads(await response.text())
+            session = BotHttp.session()
+            async with session.post(server, json=params, timeout=timeout) as response:
+                if response.status != 200:
+                    logger.error(
+                        f"[Short URL][{message.chat.id}]: Can't Get Short URL: {response.status}"
+                    )
+                    await bot.edit_message_text(
+                        _t(
+                            "error.generate_failed_backend_invalid",
+                            reason=response.status,
+                        ),
+                        message.chat.id,
+                        reply.message_id,
+                        disable_web_page_preview=True,
+                        parse_mode="Markdown",
+                    )
+                    return
+                if "application/json" in response.headers["content-type"]:
+                    json_data = await response.json()
+                else:
+                    json_data = json.loads(await response.text())
             if json_data["status"] == 200:
                 _url = server + json_data["key"]
                 await bot.edit_message_text(
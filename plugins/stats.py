@@ -4,15 +4,21 @@
 # @File    : stats.py
 # @Software: PyCharm
 import re
+import asyncio
 import datetime
+import itertools
 import pytz
 import asyncpg
 from loguru import logger
 from telebot import types
 
 from utils.postgres import BotDatabase
-from utils.i18n import _t
-from utils.i18n.runtime import make_localized_bot_for_chat
+from utils.cache_bus import BotCacheBus
+from utils.i18n import _t, normalize_language
+from utils.i18n.config import DEFAULT_LANGUAGE
+from utils.i18n.runtime import make_localized_bot
+from utils.telegram_send_queue import telegram_send_queue
+from app.scheduler import scheduler
 from app.security.permissions import has_group_admin_permission
 
 # ==================== 插件元数据 ====================
@@ -50,6 +56,135 @@ __scheduled_job_display_names__ = {
 }
 
 DAY_CUTOFF_HOUR = 4
+SCHEDULED_JOB_IDS = ("dragon_king", "daily_stats")
+# 定时结算后并发推送的最大群组数
+ANNOUNCE_CONCURRENCY = 16
+DAILY_STATS_TOP_N = 20
+# 重启/停机后仍补发 6 小时内错过的结算（结算按窗口计算，补发结果不变）
+MISFIRE_GRACE_SECONDS = 6 * 3600
+
+# 说明：
+# - due: 本次触发的群组（调度器按 scheduled_jobs 中每个群组的 cron/时区触发）
+# - windows: 每个群组在触发时刻之前最近一个完整统计日的区间（UTC 与本地两种表示）
+# - daily: 区间内每个用户的发言合计
+# 参数：$1 计划触发时间(UTC), $2 job_name, $3 默认分割时间, $4 默认语言, $5 群组 ID 列表
+_DUE_DAILY_TOTALS_CTE = """
+valid_tz AS (
+    SELECT name FROM pg_timezone_names
+),
+due AS (
+    SELECT sj.group_id,
+           COALESCE(s.language, $4) AS language,
+           COALESCE(v.name, 'Asia/Shanghai') AS timezone,
+           COALESCE(s.stats_cutoff_hour, $3) AS cutoff_hour
+    FROM scheduled_jobs sj
+    LEFT JOIN setting s ON s.group_id = sj.group_id
+    LEFT JOIN valid_tz v ON v.name = sj.timezone
+    WHERE sj.job_name = $2
+      AND sj.enabled = TRUE
+      AND sj.group_id = ANY($5::BIGINT[])
+),
+windows AS (
+    SELECT group_id,
+           language,
+           local_end - INTERVAL '1 day' AS local_start,
+           local_end,
+           (local_end - INTERVAL '1 day')::date AS stat_date,
+           (local_end AT TIME ZONE timezone) - INTERVAL '1 day' AS cycle_start,
+           local_end AT TIME ZONE timezone AS cycle_end
+    FROM (
+        SELECT group_id,
+               language,
+               timezone,
+               cycle_today - CASE
+                   WHEN cycle_today > local_now THEN INTERVAL '1 day'
+                   ELSE INTERVAL '0'
+               END AS local_end
+        FROM (
+            SELECT group_id,
+                   language,
+                   timezone,
+                   $1::timestamptz AT TIME ZONE timezone AS local_now,
+                   date_trunc('day', $1::timestamptz AT TIME ZONE timezone)
+                       + make_interval(hours => cutoff_hour) AS cycle_today
+            FROM due
+        ) n
+    ) d
+),
+daily AS (
+    SELECT w.group_id,
+           w.stat_date,
+           ss.user_id,
+           MAX(ss.display_name) AS display_name,
+           SUM(ss.count)::int AS total
+    FROM windows w
+    JOIN speech_stats ss
+      ON ss.group_id = w.group_id
+     AND ss.hour >= w.cycle_start
+     AND ss.hour < w.cycle_end
+    GROUP BY w.group_id, w.stat_date, ss.user_id
+)
+"""
+
+# 一次性结算所有到期群组的龙王（含连任天数）并批量写入 dragon_king_daily
+SETTLE_DRAGON_KING_SQL = f"""
+WITH {_DUE_DAILY_TOTALS_CTE},
+ranked AS (
+    SELECT group_id, stat_date, user_id, display_name, total,
+           ROW_NUMBER() OVER (
+               PARTITION BY group_id
+               ORDER BY total DESC, display_name ASC
+           ) AS rn
+    FROM daily
+),
+winners AS (
+    SELECT r.group_id, r.stat_date, r.user_id, r.display_name, r.total,
+           CASE
+               WHEN prev.user_id = r.user_id THEN COALESCE(prev.streak_days, 0) + 1
+               ELSE 1
+           END AS streak_days
+    FROM ranked r
+    LEFT JOIN dragon_king_daily prev
+      ON prev.group_id = r.group_id
+     AND prev.stat_date = r.stat_date - 1
+    WHERE r.rn = 1 AND r.total > 0
+),
+upserted AS (
+    INSERT INTO dragon_king_daily (group_id, stat_date, user_id, display_name, total, streak_days)
+    SELECT group_id, stat_date, user_id, display_name, total, streak_days
+    FROM winners
+    ON CONFLICT (group_id, stat_date)
+    DO UPDATE SET
+        user_id = EXCLUDED.user_id,
+        display_name = EXCLUDED.display_name,
+        total = EXCLUDED.total,
+        streak_days = EXCLUDED.streak_days
+    RETURNING group_id, display_name, streak_days
+)
+SELECT u.group_id, u.display_name, u.streak_days, w.language
+FROM upserted u
+JOIN windows w ON w.group_id = u.group_id
+"""
+
+# 一次性查询所有到期群组上一统计日的发言排行（每群前 $6 名及总数）
+DAILY_STATS_BATCH_SQL = f"""
+WITH {_DUE_DAILY_TOTALS_CTE},
+ranked AS (
+    SELECT group_id, display_name, total,
+           ROW_NUMBER() OVER (
+               PARTITION BY group_id
+               ORDER BY total DESC, display_name ASC
+           ) AS rank,
+           SUM(total) OVER (PARTITION BY group_id) AS group_total
+    FROM daily
+)
+SELECT r.group_id, r.rank, r.display_name, r.total, r.group_total,
+       w.language, w.local_start, w.local_end
+FROM ranked r
+JOIN windows w ON w.group_id = r.group_id
+WHERE r.rank <= $6
+ORDER BY r.group_id, r.rank
+"""
 
 
 # ==================== 数据库初始化 ====================
@@ -96,12 +231,39 @@ async def setup_database(conn_pool):
             ADD COLUMN IF NOT EXISTS stats_cutoff_hour INTEGER NOT NULL DEFAULT 4
         """)
 
+        # 定时任务按 scheduled_jobs.cron_expr 触发，同步为各群组的分割时间
+        await conn.execute(
+            """
+            UPDATE scheduled_jobs sj
+            SET cron_expr = '0 ' || s.stats_cutoff_hour || ' * * *'
+            FROM setting s
+            WHERE s.group_id = sj.group_id
+              AND sj.job_name = ANY($1::TEXT[])
+              AND sj.cron_expr <> '0 ' || s.stats_cutoff_hour || ' * * *'
+            """,
+            [f"{__plugin_name__}.{job_id}" for job_id in SCHEDULED_JOB_IDS],
+        )
+
     logger.info("[Stats] 数据库表和列初始化完成")
 
 
 # ==================== 分割时间数据库操作 ====================
+# group_id -> 分割时间；修改时经 BotCacheBus 通知其他进程失效
+_cutoff_hour_cache = {}
+
+
+async def _evict_cutoff_hour(group_id: str):
+    _cutoff_hour_cache.pop(int(group_id), None)
+    # 其他进程修改分割时间时同时改了 scheduled_jobs 的 cron_expr
+    for job_id in SCHEDULED_JOB_IDS:
+        await scheduler.refresh_group_entry(f"{__plugin_name__}.{job_id}", group_id)
+
+
 async def _get_cutoff_hour(group_id: int) -> int:
     """获取群组的统计日分割时间，默认 4"""
+    cached = _cutoff_hour_cache.get(int(group_id))
+    if cached is not None:
+        return cached
     conn = BotDatabase.conn
     try:
         await BotDatabase.ensure_group_row(group_id)
@@ -110,9 +272,9 @@ async def _get_cutoff_hour(group_id: int) -> int:
                 "SELECT stats_cutoff_hour FROM setting WHERE group_id = $1",
                 int(group_id),
             )
-            if val is None:
-                return DAY_CUTOFF_HOUR
-            return int(val)
+            hour = DAY_CUTOFF_HOUR if val is None else int(val)
+            _cutoff_hour_cache[int(group_id)] = hour
+            return hour
     except Exception as e:
         logger.error(f"[Stats] get cutoff hour error for group {group_id}: {e}")
         return DAY_CUTOFF_HOUR
@@ -123,8 +285,15 @@ async def _set_cutoff_hour(group_id: int, hour: int) -> bool:
     if not (0 <= hour <= 23):
         return False
     conn = BotDatabase.conn
+    new_cron = _cutoff_cron_expr(hour)
+    job_names = [f"{__plugin_name__}.{job_id}" for job_id in SCHEDULED_JOB_IDS]
     try:
         await BotDatabase.ensure_group_row(group_id)
+        # 先确保任务行存在，之后再开启任务时 cron_expr 已与分割时间一致
+        for job_name in job_names:
+            await BotDatabase.ensure_scheduled_job_row(
+                group_id, job_name, cron_expr=new_cron
+            )
         async with conn.acquire() as connection:
             await connection.execute(
                 "UPDATE setting SET stats_cutoff_hour = $1 WHERE group_id = $2",
@@ -132,15 +301,16 @@ async def _set_cutoff_hour(group_id: int, hour: int) -> bool:
                 int(group_id),
             )
             # 联动更新 scheduled_jobs 中相关 job 的 cron_expr
-            new_cron = f"0 {hour} * * *"
-            for job_id in ("dragon_king", "daily_stats"):
-                job_name = f"{__plugin_name__}.{job_id}"
-                await connection.execute(
-                    "UPDATE scheduled_jobs SET cron_expr = $1 WHERE group_id = $2 AND job_name = $3",
-                    new_cron,
-                    int(group_id),
-                    job_name,
-                )
+            await connection.execute(
+                "UPDATE scheduled_jobs SET cron_expr = $1 WHERE group_id = $2 AND job_name = ANY($3::TEXT[])",
+                new_cron,
+                int(group_id),
+                job_names,
+            )
+        _cutoff_hour_cache[int(group_id)] = int(hour)
+        await BotCacheBus.publish("stats_cutoff", group_id)
+        for job_name in job_names:
+            await scheduler.refresh_group_entry(job_name, group_id)
         logger.info(f"[Stats] Set cutoff hour={hour} for group {group_id}")
         return True
     except Exception as e:
@@ -148,6 +318,10 @@ async def _set_cutoff_hour(group_id: int, hour: int) -> bool:
         return False
 
 
+def _cutoff_cron_expr(hour: int) -> str:
+    return f"0 {int(hour)} * * *"
+
+
 def _get_tz():
     return pytz.timezone("Asia/Shanghai")
 
@@ -352,80 +526,39 @@ async def _query_stats(
         return [], 0
 
 
-async def _query_top_speaker(
-    group_id: int, start_time: datetime.datetime, end_time: datetime.datetime
-):
+async def _settle_due_dragon_kings(group_ids, scheduled_at: datetime.datetime):
+    """结算给定群组的龙王，返回 (group_id, display_name, streak_days, language)"""
     conn = BotDatabase.conn
     try:
-        row = await conn.fetchrow(
-            """
-            SELECT user_id,
-                   MAX(display_name) AS display_name,
-                   SUM(count) AS total
-            FROM speech_stats
-            WHERE group_id = $1 AND hour >= $2 AND hour < $3
-            GROUP BY user_id
-            ORDER BY total DESC, display_name ASC
-            LIMIT 1
-            """,
-            group_id,
-            start_time,
-            end_time,
+        return await conn.fetch(
+            SETTLE_DRAGON_KING_SQL,
+            scheduled_at,
+            f"{__plugin_name__}.dragon_king",
+            DAY_CUTOFF_HOUR,
+            DEFAULT_LANGUAGE,
+            [int(g) for g in group_ids],
         )
-        return row
     except asyncpg.PostgresError as e:
         logger.error(f"[Stats][Postgres Error]: {e}")
-        return None
+        return []
 
 
-async def _query_dragon_king_daily(group_id: int, stat_date: datetime.date):
+async def _query_due_daily_stats(group_ids, scheduled_at: datetime.datetime):
+    """查询给定群组上一统计日的排行，按 group_id, rank 排序"""
     conn = BotDatabase.conn
     try:
-        row = await conn.fetchrow(
-            """
-            SELECT user_id, display_name, total, streak_days
-            FROM dragon_king_daily
-            WHERE group_id = $1 AND stat_date = $2
-            """,
-            group_id,
-            stat_date,
-        )
-        return row
-    except asyncpg.PostgresError as e:
-        logger.error(f"[Stats][Postgres Error]: {e}")
-        return None
-
-
-async def _upsert_dragon_king_daily(
-    group_id: int,
-    stat_date: datetime.date,
-    user_id: int,
-    display_name: str,
-    total: int,
-    streak_days: int,
-):
-    conn = BotDatabase.conn
-    try:
-        await conn.execute(
-            """
-            INSERT INTO dragon_king_daily (group_id, stat_date, user_id, display_name, total, streak_days)
-            VALUES ($1, $2, $3, $4, $5, $6)
-            ON CONFLICT (group_id, stat_date)
-            DO UPDATE SET
-                user_id = EXCLUDED.user_id,
-                display_name = EXCLUDED.display_name,
-                total = EXCLUDED.total,
-                streak_days = EXCLUDED.streak_days
-            """,
-            group_id,
-            stat_date,
-            user_id,
-            display_name,
-            total,
-            streak_days,
+        return await conn.fetch(
+            DAILY_STATS_BATCH_SQL,
+            scheduled_at,
+            f"{__plugin_name__}.daily_stats",
+            DAY_CUTOFF_HOUR,
+            DEFAULT_LANGUAGE,
+            [int(g) for g in group_ids],
+            DAILY_STATS_TOP_N,
         )
     except asyncpg.PostgresError as e:
         logger.error(f"[Stats][Postgres Error]: {e}")
+        return []
 
 
 async def _query_dragon_king_leaderboard(group_id: int):
@@ -709,130 +842,103 @@ async def handle_stats_cutoff_close_callback(bot, call: types.CallbackQuery):
     await bot.answer_callback_query(call.id)
 
 
-# ==================== 龙王定时任务 ====================
-async def handle_dragon_king_schedule(bot):
-    """龙王定时任务（每小时触发，按群组分割时间过滤）"""
-    job_name = f"{__plugin_name__}.dragon_king"
-    rows = await BotDatabase.get_enabled_scheduled_groups(job_name)
-    if not rows:
-        return
+# ==================== 定时推送 ====================
+async def _fan_out_announcements(bot, announcements, label: str):
+    """通过发送队列并发推送结算消息，同时最多 ANNOUNCE_CONCURRENCY 个群组在途。
 
-    for row in rows:
-        group_id = row["group_id"]
-        tz_name = row.get("timezone") or "Asia/Shanghai"
-        try:
-            tz = pytz.timezone(tz_name)
-        except Exception:
-            tz = _get_tz()
-        now = datetime.datetime.now(tz)
-        current_hour = now.hour
-
-        # 读取该群组的分割时间
-        cutoff_hour = await _get_cutoff_hour(group_id)
-
-        # 仅在当前小时等于群组分割时间时执行结算
-        if current_hour != cutoff_hour:
-            continue
-
-        cycle_end = _get_cycle_start(now, cutoff_hour)
-        cycle_start = cycle_end - datetime.timedelta(days=1)
-        stat_date = cycle_start.date()
-
-        top_row = await _query_top_speaker(group_id, cycle_start, cycle_end)
-        if not top_row:
-            continue
-
-        display_name = top_row["display_name"]
-        user_id = int(top_row["user_id"])
-        total = int(top_row["total"] or 0)
-        if total <= 0:
-            continue
-
-        prev_row = await _query_dragon_king_daily(
-            group_id, stat_date - datetime.timedelta(days=1)
-        )
-        streak_days = 1
-        if prev_row and int(prev_row["user_id"]) == user_id:
-            streak_days = int(prev_row["streak_days"] or 0) + 1
+    announcements: (group_id, language, render) 列表，render 在对应语言上下文中生成文本。
+    """
+    pending = iter(announcements)
 
-        await _upsert_dragon_king_daily(
-            group_id,
-            stat_date,
-            user_id,
-            display_name,
-            total,
-            streak_days,
-        )
+    async def _worker():
+        for group_id, language, render in pending:
+            try:
+                lbot = make_localized_bot(
+                    bot, __plugin_name__, normalize_language(language)
+                )
+                text = render()
+                await telegram_send_queue.enqueue(
+                    group_id, lambda: lbot.send_message(group_id, text)
+                )
+            except Exception as e:
+                logger.error(f"[Stats] 发送{label}失败 group={group_id}: {e}")
 
-        try:
-            lbot = await make_localized_bot_for_chat(bot, __plugin_name__, group_id)
-            await lbot.send_message(
-                group_id,
-                _t(
-                    "result.dragon_congrats",
-                    display_name=display_name,
-                    streak_days=streak_days,
-                ),
-            )
-        except Exception as e:
-            logger.error(f"[Stats] 发送龙王消息失败 group={group_id}: {e}")
+    workers = min(ANNOUNCE_CONCURRENCY, len(announcements))
+    await asyncio.gather(*(_worker() for _ in range(workers)))
 
 
-# ==================== 每日统计自动发送 ====================
-async def handle_daily_stats_schedule(bot):
-    """每日统计定时任务（每小时触发，按群组分割时间过滤）"""
-    job_name = f"{__plugin_name__}.daily_stats"
-    rows = await BotDatabase.get_enabled_scheduled_groups(job_name)
+# ==================== 龙王定时任务 ====================
+async def handle_dragon_king_schedule(bot, group_ids, scheduled_at):
+    """龙王定时任务（按群组分割时间触发，同一时刻到期的群组一次性结算）"""
+    rows = await _settle_due_dragon_kings(group_ids, scheduled_at)
     if not rows:
         return
 
-    for row in rows:
-        group_id = row["group_id"]
-        tz_name = row.get("timezone") or "Asia/Shanghai"
-        try:
-            tz = pytz.timezone(tz_name)
-        except Exception:
-            tz = _get_tz()
-        now = datetime.datetime.now(tz)
-        current_hour = now.hour
-
-        # 读取该群组的分割时间
-        cutoff_hour = await _get_cutoff_hour(group_id)
+    def _render(row):
+        return lambda: _t(
+            "result.dragon_congrats",
+            display_name=row["display_name"],
+            streak_days=int(row["streak_days"]),
+        )
 
-        # 仅在当前小时等于群组分割时间时执行
-        if current_hour != cutoff_hour:
-            continue
+    await _fan_out_announcements(
+        bot,
+        [(int(row["group_id"]), row["language"], _render(row)) for row in rows],
+        "龙王消息",
+    )
 
-        # 计算前一天的统计区间
-        cycle_end = _get_cycle_start(now, cutoff_hour)
-        cycle_start = cycle_end - datetime.timedelta(days=1)
 
-        stats_rows, total = await _query_stats(group_id, cycle_start, cycle_end)
-        if not stats_rows:
-            continue
+# ==================== 每日统计自动发送 ====================
+async def handle_daily_stats_schedule(bot, group_ids, scheduled_at):
+    """每日统计定时任务（按群组分割时间触发，同一时刻到期的群组一次性查询）"""
+    rows = await _query_due_daily_stats(group_ids, scheduled_at)
+    if not rows:
+        return
 
-        try:
-            lbot = await make_localized_bot_for_chat(bot, __plugin_name__, group_id)
+    def _render(stats_rows):
+        def render():
+            first = stats_rows[0]
+            display_end = first["local_end"] - datetime.timedelta(hours=1)
+            range_text = (
+                f"{first['local_start']:%Y-%m-%d %H:%M} ~ {display_end:%Y-%m-%d %H:%M}"
+            )
+            lines = [
+                _t("title.yesterday_activity"),
+                _t("label.stats_range", range_text=range_text),
+                "",
+            ]
+            for sr in stats_rows:
+                lines.append(
+                    _t(
+                        "result.stats_row",
+                        rank=sr["rank"],
+                        name=sr["display_name"],
+                        count=sr["total"],
+                    )
+                )
+            lines.extend(
+                ["", _t("result.total_messages", total=int(first["group_total"]))]
+            )
+            return "\n".join(lines)
 
-            title = _t("title.yesterday_activity")
-            display_end = cycle_end - datetime.timedelta(hours=1)
-            range_text = f"{cycle_start:%Y-%m-%d %H:%M} ~ {display_end:%Y-%m-%d %H:%M}"
+        return render
 
-            lines = [title, _t("label.stats_range", range_text=range_text), ""]
-            for idx, sr in enumerate(stats_rows, start=1):
-                name = sr["display_name"]
-                count = sr["total"]
-                lines.append(_t("result.stats_row", rank=idx, name=name, count=count))
-            lines.extend(["", _t("result.total_messages", total=total)])
+    announcements = []
+    for group_id, group_rows in itertools.groupby(rows, key=lambda r: r["group_id"]):
+        stats_rows = list(group_rows)
+        announcements.append(
+            (int(group_id), stats_rows[0]["language"], _render(stats_rows))
+        )
 
-            await lbot.send_message(group_id, "\n".join(lines))
-        except Exception as e:
-            logger.error(f"[Stats] 发送每日统计失败 group={group_id}: {e}")
+    await _fan_out_announcements(bot, announcements, "每日统计")
 
 
 # ==================== 插件注册 ====================
 async def register_handlers(bot, middleware, plugin_name):
     """注册插件处理器"""
+    BotCacheBus.subscribe(
+        "stats_cutoff", plugin_name, _evict_cutoff_hour, _cutoff_hour_cache.clear
+    )
     middleware.register_message_handler(
         callback=handle_stats_message,
         plugin_name=plugin_name,
@@ -895,23 +1001,21 @@ async def register_handlers(bot, middleware, plugin_name):
         f"✅ {__plugin_name__} 插件已注册 - 支持命令: {', '.join(__commands__)}"
     )
 
-    # 龙王定时任务：每小时触发，按群组分割时间过滤
-    middleware.register_cron_job(
+    # 龙王定时任务：按 scheduled_jobs 中各群组的 cron（即分割时间）触发
+    middleware.register_group_cron_job(
         plugin_name=plugin_name,
         job_id="dragon_king",
-        cron_expr="0 * * * *",
-        timezone="Asia/Shanghai",
         callback=handle_dragon_king_schedule,
+        misfire_grace_seconds=MISFIRE_GRACE_SECONDS,
         display_name="job.dragon_king",
     )
 
-    # 每日统计自动发送：每小时触发，按群组分割时间过滤
-    middleware.register_cron_job(
+    # 每日统计自动发送：按 scheduled_jobs 中各群组的 cron（即分割时间）触发
+    middleware.register_group_cron_job(
         plugin_name=plugin_name,
         job_id="daily_stats",
-        cron_expr="0 * * * *",
-        timezone="Asia/Shanghai",
         callback=handle_daily_stats_schedule,
+        misfire_grace_seconds=MISFIRE_GRACE_SECONDS,
         display_name="job.daily_stats",
     )
 
@@ -14,6 +14,7 @@ import aiohttp
 from telebot import types
 from loguru import logger
 from app.security.permissions import is_bot_admin
+from utils.http_client import BotHttp
 
 # ==================== 插件元数据 ====================
 __plugin_name__ = "status"
@@ -59,16 +60,16 @@ async def _get_public_ip() -> str:
         "https://ifconfig.me/ip",
     ]
     try:
-        async with aiohttp.ClientSession() as session:
-            for url in sources:
-                try:
-                    async with session.get(
-                        url, timeout=aiohttp.ClientTimeout(total=5)
-                    ) as resp:
-                        if resp.status == 200:
-                            return (await resp.text()).strip()
-                except Exception:
-                    continue
+        session = BotHttp.session()
+        for url in sources:
+            try:
+                async with session.get(
+                    url, timeout=aiohttp.ClientTimeout(total=5)
+                ) as resp:
+                    if resp.status == 200:
+                        return (await resp.text()).strip()
+            except Exception:
+                continue
     except Exception:
         pass
     return "unknown"
@@ -4,7 +4,6 @@
 # @File    : weather.py
 # @Software: PyCharm
 import datetime
-import aiohttp
 import re
 import uuid
 from telebot import types
@@ -12,6 +11,8 @@ from loguru import logger
 from utils.yaml import BotConfig
 from app.utils import command_error_msg
 from utils.i18n import _t
+from utils.http_client import BotHttp
+from utils.circuit_breaker import BotBreakers, CircuitOpenError
 
 # ==================== 插件元数据 ====================
 __plugin_name__ = "weather"
@@ -105,17 +106,17 @@ async def translate_chinese_to_english(text):
 
         body = [{"text": text}]
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                constructed_url, params=params, headers=headers, json=body
-            ) as resp:
-                if resp.status == 200:
-                    response = await resp.json()
-                    # 提取翻译结果
-                    translated_text = response[0]["translations"][0]["text"]
-                    return translated_text
-                logger.error(f"微软翻译API返回错误状态码: {resp.status}")
-                return text  # 如果翻译失败，返回原始文本
+        session = BotHttp.session()
+        async with session.post(
+            constructed_url, params=params, headers=headers, json=body
+        ) as resp:
+            if resp.status == 200:
+                response = await resp.json()
+                # 提取翻译结果
+                translated_text = response[0]["translations"][0]["text"]
+                return translated_text
+            logger.error(f"微软翻译API返回错误状态码: {resp.status}")
+            return text  # 如果翻译失败，返回原始文本
     except Exception as e:
         logger.error(f"翻译过程中出错: {str(e)}")
         return text  # 出现异常时返回原始文本
@@ -137,20 +138,28 @@ async def handle_weather_command(bot, message: types.Message, city: str):
             "q": city,
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as resp:
-                if resp.status != 200:
-                    if resp.status == 404:
-                        error_msg = _t("error.city_not_found", city=city)
-                    else:
-                        error_msg = _t(
-                            "error.weather_api_failed", status_code=resp.status
-                        )
-                    await bot.edit_message_text(
-                        error_msg, message.chat.id, msg.message_id
-                    )
-                    return
-                data = await resp.json()
+        session = BotHttp.session()
+        try:
+            resp = await BotBreakers.get("openweathermap").call(
+                session.get,
+                url,
+                params=params,
+                failure_if=lambda r: r.status >= 500 or r.status == 429,
+            )
+        except CircuitOpenError:
+            await bot.edit_message_text(
+                _t("error.source_unavailable"), message.chat.id, msg.message_id
+            )
+            return
+        async with resp:
+            if resp.status != 200:
+                if resp.status == 404:
+                    error_msg = _t("error.city_not_found", city=city)
+                else:
+                    error_msg = _t("error.weather_api_failed", status_code=resp.status)
+                await bot.edit_message_text(error_msg, message.chat.id, msg.message_id)
+                return
+            data = await resp.json()
 
         cityName = f"{data['name']}, {data['sys']['country']}"
         timeZoneShift = data["timezone"]
@@ -4,6 +4,7 @@
 # @File    : xiatou.py
 # @Software: PyCharm
 import re
+import time
 import aiohttp
 import datetime
 import pytz
@@ -13,6 +14,7 @@ from telebot import types
 from utils.yaml import BotConfig
 from utils.postgres import BotDatabase
 from utils.i18n import _t
+from utils.http_client import BotHttp
 
 # ==================== 插件元数据 ====================
 __plugin_name__ = "xiatou"
@@ -46,62 +48,72 @@ def get_today_midnight_ts_utc8() -> int:
     return int(midnight.timestamp())
 
 
-async def _sum_xiatou_since_midnight(
-    start_midnight_ts_utc8: int, end_midnight_ts_utc8: int
-) -> int:
-    """统计 xiatou 表在 [start_midnight, end_midnight]（按 UTC+8 当天0点ts）范围内的 count 之和。"""
+# /inb 统计窗口（天），均以 UTC+8 当天 0 点为终点
+INB_WINDOWS = (1, 7, 30, 180, 365)
+# inline 查询会被频繁重复触发，短时间内复用同一份统计
+INB_CACHE_TTL_SECONDS = 10
+
+_INB_WINDOWS_SQL = (
+    "SELECT "
+    + ", ".join(
+        f"COALESCE(SUM(count) FILTER (WHERE time >= $1::BIGINT - {days - 1} * 86400), 0) "
+        f"AS sum_{days}"
+        for days in INB_WINDOWS
+    )
+    + f" FROM xiatou WHERE time BETWEEN $1::BIGINT - {max(INB_WINDOWS) - 1} * 86400 AND $1::BIGINT"
+)
+
+# (过期时间 monotonic, 当天0点ts, 文本)
+_inb_cache = None
+
+
+async def _sum_xiatou_windows(today_midnight_ts_utc8: int) -> dict | None:
+    """一次查询统计 INB_WINDOWS 中各窗口的 count 之和，返回 {天数: 次数}。
+
+    查询失败时返回 None，调用方据此跳过缓存。
+    """
     conn = BotDatabase.conn
     try:
-        val = await conn.fetchval(
-            "SELECT COALESCE(SUM(count), 0) FROM xiatou WHERE time BETWEEN $1 AND $2",
-            start_midnight_ts_utc8,
-            end_midnight_ts_utc8,
-        )
-        return int(val or 0)
+        row = await conn.fetchrow(_INB_WINDOWS_SQL, today_midnight_ts_utc8)
+        return {days: int(row[f"sum_{days}"] or 0) for days in INB_WINDOWS}
     except Exception as e:
         logger.error(f"[INB] 统计失败: {e}")
-        return 0
+        return None
 
 
 async def query_inb_text() -> str:
     """生成与 /inb 命令一致的输出文本，用于命令与 Inline 复用。"""
+    global _inb_cache
     today_midnight = get_today_midnight_ts_utc8()
-    day = 86400
-
-    sum_1 = await _sum_xiatou_since_midnight(today_midnight, today_midnight)
-    sum_7 = await _sum_xiatou_since_midnight(today_midnight - 6 * day, today_midnight)
-    sum_30 = await _sum_xiatou_since_midnight(today_midnight - 29 * day, today_midnight)
-    sum_180 = await _sum_xiatou_since_midnight(
-        today_midnight - 179 * day, today_midnight
-    )
-    sum_365 = await _sum_xiatou_since_midnight(
-        today_midnight - 364 * day, today_midnight
-    )
+    now = time.monotonic()
+    if _inb_cache and _inb_cache[0] > now and _inb_cache[1] == today_midnight:
+        return _inb_cache[2]
 
-    return (
-        f"inb 虾头次数统计\n"
-        f"近1天：{sum_1} 次\n"
-        f"近7天：{sum_7} 次\n"
-        f"近30天：{sum_30} 次\n"
-        f"近180天：{sum_180} 次\n"
-        f"近365天：{sum_365} 次"
+    sums = await _sum_xiatou_windows(today_midnight)
+    text = "inb 虾头次数统计\n" + "\n".join(
+        f"近{days}天：{sums[days] if sums else 0} 次" for days in INB_WINDOWS
     )
+    # 查询失败时的全 0 结果不缓存，下次查询重新统计
+    if sums is not None:
+        _inb_cache = (now + INB_CACHE_TTL_SECONDS, today_midnight, text)
+    return text
 
 
 async def increment_today_count_pg() -> int:
+    global _inb_cache
     ts = get_today_midnight_ts_utc8()
     conn = BotDatabase.conn
     try:
-        result = await conn.execute(
-            "UPDATE xiatou SET count = count + 1 WHERE time = $1", ts
+        count = await conn.fetchval(
+            """
+            INSERT INTO xiatou (time, count) VALUES ($1, 1)
+            ON CONFLICT (time) DO UPDATE SET count = xiatou.count + 1
+            RETURNING count
+            """,
+            ts,
         )
-        if result == "UPDATE 0":
-            await conn.execute(
-                "INSERT INTO xiatou (time, count) VALUES ($1, 1) ON CONFLICT (time) DO NOTHING",
-                ts,
-            )
-        row = await conn.fetchrow("SELECT count FROM xiatou WHERE time = $1", ts)
-        return row["count"] if row else 0
+        _inb_cache = None
+        return int(count or 0)
     except asyncpg.PostgresError as e:
         logger.error(f"[XiaTou][Postgres Error]: {e}")
         return 0
@@ -182,11 +194,14 @@ async def handle_xiatou(bot, message):
                 "temperature": 0.7,
                 "max_tokens": 10,
             }
-            async with aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=10)
-            ) as session:
-                async with session.post(url, headers=headers, json=data) as response:
-                    response_json = await response.json()
+            session = BotHttp.session()
+            async with session.post(
+                url,
+                headers=headers,
+                json=data,
+                timeout=aiohttp.ClientTimeout(total=10),
+            ) as response:
+                response_json = await response.json()
             if (
                 "choices" in response_json
                 and response_json["choices"][0]["message"]["content"].strip().lower()
@@ -0,0 +1,155 @@
+import asyncio
+
+from plugins import bc
+
+
+def _fake_fetch(delay):
+    async def fetch(amount, currency_from, currency_to):
+        await asyncio.sleep(delay)
+        return {
+            "success": True,
+            "rate": 2.0,
+            "converted_amount": amount * 2,
+            "error": None,
+        }
+
+    return fetch
+
+
+def test_card_deadline_starts_after_the_concurrency_slot(monkeypatch):
+    monkeypatch.setattr(bc, "FIAT_SOURCE_TIMEOUT", 0.3)
+    monkeypatch.setattr(bc, "fetch_unionpay_rate", _fake_fetch(0))
+    monkeypatch.setattr(bc, "fetch_mastercard_rate", _fake_fetch(0.1))
+    monkeypatch.setattr(bc, "fetch_visa_rate", _fake_fetch(0.1))
+    monkeypatch.setattr(
+        bc, "convert_eu_rates", lambda a, f, targets: [{}] * len(targets)
+    )
+    targets = [f"T{i}" for i in range(bc.MAX_BC_TARGETS)]
+
+    async def scenario():
+        monkeypatch.setattr(
+            bc, "_card_fetch_semaphore", asyncio.Semaphore(bc.CARD_FETCH_CONCURRENCY)
+        )
+        return await bc.fetch_fiat_rates(100, "USD", targets)
+
+    results = asyncio.run(scenario())
+
+    # 20 个卡组织请求按 4 个并发排队约 0.5 秒，仍然都不应超时
+    assert all(r["success"] for target in results for r in target[1:])
+
+
+def _rounding_upstream(rate, calls):
+    """按 rate 换算并像上游一样把金额四舍五入到 2 位小数"""
+
+    async def request(amount, currency_from, currency_to):
+        calls.append(amount)
+        return {
+            "success": True,
+            "rate": rate,
+            "converted_amount": round(amount * rate, 2),
+            "error": None,
+        }
+
+    return request
+
+
+def test_card_cache_keeps_the_rate_not_a_rounded_amount(monkeypatch):
+    monkeypatch.setattr(bc, "_card_rate_cache", {})
+    calls = []
+    request = _rounding_upstream(0.006712, calls)
+
+    async def scenario():
+        small = await bc._cached_card_rate("mastercard", 1, "JPY", "USD", request)
+        large = await bc._cached_card_rate("mastercard", 100000, "JPY", "USD", request)
+        return small, large
+
+    small, large = asyncio.run(scenario())
+
+    assert calls == [1]
+    assert small["converted_amount"] == 0.01
+    assert large["rate"] == 0.006712
+    assert round(large["converted_amount"], 2) == 671.20
+
+
+def test_visa_rate_is_oriented_from_source_to_target():
+    # 100 JPY -> 0.67 USD，无论 fxRateVisa 按哪个方向报价都换算成 JPY -> USD
+    assert bc._orient_visa_rate(0.006712, 100, 0.67) == 0.006712
+    assert abs(bc._orient_visa_rate(148.99, 100, 0.67) - 1 / 148.99) < 1e-12
+
+
+def _use_ecb_rates(monkeypatch, rates):
+    index, cross = bc._build_ecb_matrix(rates)
+    monkeypatch.setattr(bc, "_ecb_index", index)
+    monkeypatch.setattr(bc, "_ecb_cross", cross)
+
+
+def test_ecb_cross_matrix_converts_from_row_to_column():
+    index, cross = bc._build_ecb_matrix({"EUR": 1.0, "USD": 1.1, "JPY": 160.0})
+
+    assert cross[index["EUR"], index["USD"]] == 1.1
+    assert abs(cross[index["USD"], index["JPY"]] - 160.0 / 1.1) < 1e-9
+    assert abs(cross[index["JPY"], index["USD"]] - 1.1 / 160.0) < 1e-12
+    assert cross[index["USD"], index["USD"]] == 1.0
+
+
+def test_convert_eu_rates_reports_unknown_currencies(monkeypatch):
+    _use_ecb_rates(monkeypatch, {"EUR": 1.0, "USD": 1.1, "JPY": 160.0})
+
+    results = bc.convert_eu_rates(10, "USD", ["JPY", "XXX", "EUR"])
+
+    assert abs(results[0]["converted_amount"] - 10 * 160.0 / 1.1) < 1e-9
+    assert not results[1]["success"] and results[1]["rate"] is None
+    assert abs(results[2]["rate"] - 1 / 1.1) < 1e-12
+    assert not any(r["success"] for r in bc.convert_eu_rates(10, "XXX", ["USD"]))
+
+
+def test_parse_bc_targets_dedups_and_caps():
+    assert bc._parse_bc_targets("cny, jpy,CNY,,eur") == ["CNY", "JPY", "EUR"]
+    many = ",".join(f"T{i}" for i in range(bc.MAX_BC_TARGETS + 5))
+    assert len(bc._parse_bc_targets(many)) == bc.MAX_BC_TARGETS
+
+
+def test_unionpay_table_is_downloaded_once_per_day(monkeypatch):
+    monkeypatch.setattr(bc, "_unionpay_tables", {})
+    monkeypatch.setattr(bc, "_unionpay_loading", {})
+    downloads = []
+
+    async def download(date_str):
+        downloads.append(date_str)
+        await asyncio.sleep(0.01)
+        return {("USD", "CNY"): 7.1}
+
+    monkeypatch.setattr(bc, "_download_unionpay_table", download)
+    monkeypatch.setattr(bc, "get_exchange_rate_date", lambda: bc.datetime(2026, 1, 2))
+
+    async def scenario():
+        return await asyncio.gather(
+            bc.fetch_unionpay_rate(10, "USD", "CNY"),
+            bc.fetch_unionpay_rate(10, "USD", "CNY"),
+            bc.fetch_unionpay_rate(10, "USD", "JPY"),
+        )
+
+    first, second, missing = asyncio.run(scenario())
+
+    assert downloads == ["20260102"]
+    assert first["converted_amount"] == second["converted_amount"] == 71.0
+    assert not missing["success"]
+    assert list(bc._unionpay_tables) == ["20260102"]
+
+
+def test_unionpay_keeps_only_recent_days(monkeypatch):
+    monkeypatch.setattr(bc, "_unionpay_tables", {})
+    monkeypatch.setattr(bc, "_unionpay_loading", {})
+
+    async def download(date_str):
+        return {("USD", "CNY"): 7.1}
+
+    monkeypatch.setattr(bc, "_download_unionpay_table", download)
+
+    async def scenario():
+        for date_str in ("20260101", "20260102", "20260103"):
+            await bc.get_unionpay_table(date_str)
+
+    asyncio.run(scenario())
+
+    assert sorted(bc._unionpay_tables) == ["20260102", "20260103"]
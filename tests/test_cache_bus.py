@@ -0,0 +1,39 @@
+import asyncio
+import json
+
+from utils.cache_bus import MAX_PAYLOAD_BYTES, CacheInvalidationBus
+
+
+def test_notifications_evict_subscribers_in_order_and_skip_own_origin():
+    bus = CacheInvalidationBus()
+    calls = []
+
+    async def reload_key(key):
+        calls.append(("kv", key))
+
+    bus.subscribe("kv", "kvstore", reload_key, lambda: None)
+    bus.subscribe("kv", "lock", lambda key: calls.append(("lock", key)), lambda: None)
+
+    other = CacheInvalidationBus()
+    asyncio.run(bus._dispatch(other._encode("kv", ["-1001", "-1002"])))
+    asyncio.run(bus._dispatch(bus._encode("kv", ["-1003"])))
+
+    # 先注册的订阅者先处理全部键：BotKV 重新加载后锁定索引才失效
+    assert calls == [
+        ("kv", "-1001"),
+        ("kv", "-1002"),
+        ("lock", "-1001"),
+        ("lock", "-1002"),
+    ]
+
+
+def test_large_publishes_are_split_under_payload_limit():
+    bus = CacheInvalidationBus()
+    keys = [str(-1000000000000 - i) for i in range(2000)]
+
+    payloads = list(bus._build_payloads("group", keys))
+
+    assert len(payloads) > 1
+    assert all(len(p.encode("utf-8")) < 8000 for p in payloads)
+    assert [k for p in payloads for k in json.loads(p)["keys"]] == keys
+    assert MAX_PAYLOAD_BYTES < 8000
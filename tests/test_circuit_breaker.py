@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def _fail():
+    raise ConnectionError("boom")
+
+
+async def _ok():
+    return "ok"
+
+
+def test_opens_on_failure_rate_and_recovers_through_half_open_probe():
+    clock = _Clock()
+    breaker = CircuitBreaker(
+        "test", window=60, min_calls=4, failure_rate=0.5, cooldown=30, clock=clock
+    )
+
+    async def scenario():
+        await breaker.call(_ok)
+        await breaker.call(_ok)
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await breaker.call(_fail)
+        assert breaker.state == "open"
+
+        calls = []
+
+        async def tracked():
+            calls.append(1)
+            return "ok"
+
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(tracked)
+        assert calls == []
+
+        clock.now = 31
+        assert breaker.state == "half_open"
+        # 探测失败后重新打开并重新计时
+        with pytest.raises(ConnectionError):
+            await breaker.call(_fail)
+        assert breaker.state == "open"
+
+        clock.now = 62
+        assert await breaker.call(_ok) == "ok"
+        assert breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_failures_outside_window_and_failure_if_results():
+    clock = _Clock()
+    breaker = CircuitBreaker(
+        "test", window=10, min_calls=2, failure_rate=1.0, cooldown=30, clock=clock
+    )
+
+    async def scenario():
+        with pytest.raises(ConnectionError):
+            await breaker.call(_fail)
+        clock.now = 11
+        # 第一次失败已滑出窗口
+        with pytest.raises(ConnectionError):
+            await breaker.call(_fail)
+        assert breaker.state == "closed"
+
+        assert await breaker.call(_ok, failure_if=lambda r: r == "ok") == "ok"
+        assert breaker.state == "open"
+
+    asyncio.run(scenario())
+
+
+def test_half_open_allows_limited_probes():
+    clock = _Clock()
+    breaker = CircuitBreaker(
+        "test", min_calls=1, failure_rate=1.0, cooldown=5, clock=clock
+    )
+    breaker.record_failure()
+    clock.now = 5
+
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+
+
+def test_cancelled_calls_are_not_failures_and_release_the_probe():
+    clock = _Clock()
+    breaker = CircuitBreaker(
+        "test", min_calls=1, failure_rate=1.0, cooldown=5, clock=clock
+    )
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(breaker.call(hang), 0.01)
+        assert breaker.state == "closed"
+
+        breaker.record_failure()
+        clock.now = 5
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(breaker.call(hang), 0.01)
+        # 被取消的探测归还名额，下一次仍可探测
+        assert breaker.state == "half_open"
+        assert await breaker.call(_ok) == "ok"
+        assert breaker.state == "closed"
+
+    asyncio.run(scenario())
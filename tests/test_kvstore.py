@@ -0,0 +1,134 @@
+import asyncio
+import json
+
+import pytest
+
+from utils import kvstore
+from utils.kvstore import AsyncKVStore
+
+
+class _FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def execute(self, query, *args):
+        self.pool.check()
+        if query.lstrip().startswith("DELETE"):
+            for key in args[0]:
+                self.pool.rows.pop(key, None)
+
+    async def executemany(self, query, rows):
+        self.pool.check()
+        self.pool.batches.append(sorted(key for key, _ in rows))
+        self.pool.rows.update(rows)
+
+    async def fetch(self, query):
+        return [{"key": k, "value": v} for k, v in self.pool.rows.items()]
+
+    async def fetchval(self, query, key):
+        return self.pool.rows.get(key)
+
+    def transaction(self):
+        return self.pool._context(None)
+
+
+class _FakePool:
+    """kv_store 表的内存替身，记录每次 executemany 写入的键。"""
+
+    def __init__(self):
+        self.rows = {}
+        self.batches = []
+        self.fail = False
+
+    def check(self):
+        if self.fail:
+            raise ConnectionError("database unavailable")
+
+    def acquire(self):
+        return self._context(_FakeConnection(self))
+
+    @staticmethod
+    def _context(value):
+        class _Context:
+            async def __aenter__(self):
+                return value
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Context()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    fake = _FakePool()
+    monkeypatch.setattr(kvstore.BotDatabase, "conn", fake)
+    return fake
+
+
+def test_reads_see_writes_before_they_are_flushed(pool):
+    store = AsyncKVStore(flush_delay=60)
+
+    store.set("banned_sn", ["abc"])
+
+    assert store.get("banned_sn") == ["abc"]
+    assert store.exists("banned_sn")
+    assert pool.rows == {}
+    store.rem("banned_sn")
+    assert store.get("banned_sn", []) == []
+
+
+def test_dirty_keys_are_flushed_in_one_batch(pool):
+    store = AsyncKVStore(flush_delay=60)
+
+    async def scenario():
+        store.set("a", 1)
+        store.set("b", {"x": 2})
+        store.set("a", 3)
+        await store.close()
+
+    asyncio.run(scenario())
+
+    assert pool.batches == [["a", "b"]]
+    assert json.loads(pool.rows["a"]) == 3
+    assert json.loads(pool.rows["b"]) == {"x": 2}
+
+
+def test_keys_stay_dirty_after_a_failed_flush(pool):
+    store = AsyncKVStore(flush_delay=60)
+    pool.rows["gone"] = json.dumps(1)
+
+    async def scenario():
+        store.set("a", 1)
+        store.rem("gone")
+        pool.fail = True
+        await store.flush()
+        assert store._dirty == {"a"} and store._deleted == {"gone"}
+        pool.fail = False
+        await store.flush()
+
+    asyncio.run(scenario())
+
+    assert json.loads(pool.rows["a"]) == 1
+    assert "gone" not in pool.rows
+    assert not store._dirty and not store._deleted
+
+
+def test_elara_import_runs_only_once(pool, monkeypatch):
+    imports = []
+
+    def read_elara_file(path):
+        imports.append(path)
+        return {"banned_sn": ["abc"], "lock": {"-1001": True}}
+
+    monkeypatch.setattr(kvstore, "read_elara_file", read_elara_file)
+
+    first = AsyncKVStore(elara_path="db.db")
+    asyncio.run(first.load())
+    second = AsyncKVStore(elara_path="db.db")
+    asyncio.run(second.load())
+
+    assert imports == ["db.db"]
+    assert second.get("banned_sn") == ["abc"]
+    assert second.get("lock") == {"-1001": True}
+    assert pool.batches == [["banned_sn", "lock"]]
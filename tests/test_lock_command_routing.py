@@ -67,3 +67,34 @@ def test_foreign_bot_command_only_runs_wildcard_guard(monkeypatch):
 
     assert executed == 0
     assert calls == ["guard"]
+
+
+def test_lock_index_is_updated_without_storage_reads(monkeypatch):
+    from plugins import lock as lock_module
+
+    class _Store:
+        def __init__(self):
+            self.data = {"-100123": ["/Ping@NachonekoBot", "lock", "ping"]}
+            self.reads = 0
+
+        def get(self, key, default=None):
+            self.reads += 1
+            return self.data.get(key, default)
+
+        def set(self, key, value):
+            self.data[key] = value
+
+    store = _Store()
+    monkeypatch.setattr(lock_module, "BotKV", store)
+    monkeypatch.setattr(lock_module, "_locked_commands", {})
+
+    assert lock_module._get_locked_commands(-100123) == frozenset({"ping"})
+    # 清洗结果写回存储
+    assert store.data["-100123"] == ["ping"]
+
+    lock_module.batch_add_to_locklist(-100123, ["/echo", "lock"])
+    lock_module.batch_remove_from_locklist(-100123, ["ping"])
+    reads = store.reads
+
+    assert lock_module._get_locked_commands(-100123) == frozenset({"echo"})
+    assert store.reads == reads
@@ -0,0 +1,14 @@
+from utils.postgres import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used_key():
+    cache = LRUCache(2)
+    cache[1] = "en"
+    cache[2] = "ja"
+
+    assert cache.get(1) == "en"
+    cache[3] = "zh-CN"
+
+    assert list(cache) == [1, 3]
+    assert cache.get(2) is None
+    assert cache.get(2, "default") == "default"
@@ -0,0 +1,47 @@
+import os
+import random
+
+import pytest
+
+from plugins.remake import AliasSampler, load_country_sampler
+
+
+def _implied_probabilities(sampler):
+    n = len(sampler.items)
+    probs = [0.0] * n
+    for i in range(n):
+        probs[i] += sampler.prob[i] / n
+        probs[sampler.alias[i]] += (1.0 - sampler.prob[i]) / n
+    return probs
+
+
+def test_alias_table_reproduces_weights():
+    rng = random.Random(35)
+    weights = [rng.choice([0, 1, 3, 1257446, 584]) + rng.random() for _ in range(200)]
+    sampler = AliasSampler([str(i) for i in range(200)], weights)
+
+    total = sum(weights)
+    for got, w in zip(_implied_probabilities(sampler), weights):
+        assert got == pytest.approx(w / total, abs=1e-12)
+
+
+def test_zero_weight_items_are_never_sampled():
+    sampler = AliasSampler(["a", "b", "c"], [0, 1, 3])
+    rng = random.Random(0)
+    assert {sampler.sample(rng) for _ in range(2000)} == {"b", "c"}
+
+
+def test_country_sampler_is_reused_until_csv_changes(tmp_path):
+    csv_path = tmp_path / "data.csv"
+    csv_path.write_text(
+        "Country,Birthrate,Population,Weight\n甲,1,1,1\n", encoding="utf-8"
+    )
+    first = load_country_sampler(str(csv_path))
+    assert load_country_sampler(str(csv_path)) is first
+
+    csv_path.write_text(
+        "Country,Birthrate,Population,Weight\n乙,1,1,1\n", encoding="utf-8"
+    )
+    stat = csv_path.stat()
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert load_country_sampler(str(csv_path)).sample() == "乙"
@@ -0,0 +1,313 @@
+import asyncio
+import datetime
+import random
+import time
+
+import pytest
+import pytz
+
+from app import scheduler as scheduler_module
+from app.scheduler import CronSchedule, CronScheduler
+
+
+async def _noop(bot, group_ids, scheduled_at):
+    return None
+
+
+def _make_scheduler():
+    scheduler = CronScheduler()
+    scheduler.register_group_job("stats", "dragon_king", _noop)
+    scheduler._pending_loads.clear()
+    return scheduler
+
+
+def test_group_entries_due_at_same_time_are_batched():
+    scheduler = _make_scheduler()
+    scheduler.set_group_entry("stats.dragon_king", -1001, "0 4 * * *", "Asia/Shanghai")
+    scheduler.set_group_entry("stats.dragon_king", -1002, "0 4 * * *", "Asia/Shanghai")
+    scheduler.set_group_entry("stats.dragon_king", -1003, "0 4 * * *", "Europe/London")
+
+    first = scheduler._peek_group_heap()
+    assert first is not None
+
+    batches = scheduler._pop_due_groups(first)
+    assert batches == {("stats.dragon_king", first): [-1001, -1002]}
+    # 已触发的条目重新入堆到下一次运行时间
+    assert scheduler._group_entries[("stats.dragon_king", -1001)].next_run_utc > first
+
+
+def test_removed_or_updated_entries_are_not_fired():
+    scheduler = _make_scheduler()
+    scheduler.set_group_entry("stats.dragon_king", -1001, "0 4 * * *", "Asia/Shanghai")
+    scheduler.set_group_entry("stats.dragon_king", -1002, "0 4 * * *", "Asia/Shanghai")
+    scheduler.remove_group_entry("stats.dragon_king", -1001)
+    scheduler.set_group_entry("stats.dragon_king", -1002, "0 6 * * *", "Asia/Shanghai")
+
+    far_future = datetime.datetime.now(tz=pytz.utc) + datetime.timedelta(days=1)
+    batches = scheduler._pop_due_groups(far_future)
+
+    fired = [
+        (job, at.astimezone(pytz.timezone("Asia/Shanghai")).hour, groups)
+        for (job, at), groups in batches.items()
+    ]
+    assert fired == [("stats.dragon_king", 6, [-1002])]
+
+
+def test_invalid_group_entry_is_dropped():
+    scheduler = _make_scheduler()
+    assert not scheduler.set_group_entry(
+        "stats.dragon_king", -1001, "not a cron", "Asia/Shanghai"
+    )
+    assert scheduler._peek_group_heap() is None
+
+
+def test_missed_group_run_within_grace_is_caught_up(monkeypatch):
+    now = datetime.datetime(2026, 1, 1, 4, 30, 15, tzinfo=pytz.utc)
+    monkeypatch.setattr(scheduler_module, "_utc_now", lambda: now)
+    scheduler = _make_scheduler()
+    scheduler.set_group_entry(
+        "stats.dragon_king",
+        -1001,
+        "0 * * * *",
+        "UTC",
+        last_run_utc=now - datetime.timedelta(hours=3),
+    )
+    scheduler.set_group_entry(
+        "stats.dragon_king",
+        -1002,
+        "0 * * * *",
+        "UTC",
+        last_run_utc=now - datetime.timedelta(minutes=5),
+    )
+
+    due = scheduler._group_entries[("stats.dragon_king", -1001)].next_run_utc
+    # 只补跑宽限窗口（默认 1 小时）内最近的一次
+    assert due <= now
+    assert due == now.replace(minute=0, second=0, microsecond=0)
+    assert scheduler._group_entries[("stats.dragon_king", -1002)].next_run_utc > now
+
+
+def test_running_groups_are_not_started_twice():
+    release = asyncio.Event()
+    calls = []
+
+    async def slow(bot, group_ids, scheduled_at):
+        calls.append(list(group_ids))
+        await release.wait()
+
+    async def scenario():
+        scheduler = CronScheduler()
+        scheduler.attach_bot(object())
+        scheduler.register_group_job("stats", "daily_stats", slow)
+        job = scheduler._group_jobs["stats.daily_stats"]
+        at = datetime.datetime.now(tz=pytz.utc)
+
+        scheduler._start_group_job(job, [-1001, -1002], at)
+        await asyncio.sleep(0)
+        scheduler._start_group_job(job, [-1002, -1003], at)
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*scheduler._run_tasks)
+        return scheduler.get_job_metrics()["stats.daily_stats"]
+
+    metrics = asyncio.run(scenario())
+    assert calls == [[-1001, -1002], [-1003]]
+    assert metrics.runs == 2
+    assert metrics.skipped == 1
+    assert metrics.running == 0
+
+
+def test_earlier_reschedule_wakes_the_sleeping_loop(monkeypatch):
+    # 时钟从 03:59:59.5 UTC 起按真实时间前进
+    base = datetime.datetime(2026, 1, 1, 3, 59, 59, 500000, tzinfo=pytz.utc)
+    started = time.monotonic()
+    monkeypatch.setattr(
+        scheduler_module,
+        "_utc_now",
+        lambda: base + datetime.timedelta(seconds=time.monotonic() - started),
+    )
+    fired = []
+
+    async def record(bot, group_ids, scheduled_at):
+        fired.append((list(group_ids), scheduled_at))
+
+    async def scenario():
+        scheduler = CronScheduler()
+        scheduler.attach_bot(object())
+        scheduler.register_group_job("stats", "dragon_king", record)
+        scheduler._pending_loads.clear()
+        scheduler.set_group_entry("stats.dragon_king", -1001, "0 5 * * *", "UTC")
+        scheduler.start()
+        await asyncio.sleep(0.2)
+        # 循环正在按 05:00 睡眠约一小时；改到 04:00 后应在约 1 秒内触发
+        scheduler.set_group_entry("stats.dragon_king", -1001, "0 4 * * *", "UTC")
+        for _ in range(30):
+            if fired:
+                break
+            await asyncio.sleep(0.1)
+        await scheduler.stop()
+        await asyncio.gather(*scheduler._run_tasks)
+
+    asyncio.run(scenario())
+    assert fired == [([-1001], base.replace(hour=4, minute=0, second=0, microsecond=0))]
+
+
+# ==================== CronSchedule ====================
+_REFERENCE_WINDOW = datetime.timedelta(days=3)
+_TIMEZONES = (
+    "Asia/Shanghai",
+    "UTC",
+    "America/New_York",
+    "Europe/London",
+    "Australia/Lord_Howe",
+    "America/Santiago",
+)
+# 覆盖各时区夏令时切换前后的起点
+_DST_STARTS = (
+    datetime.datetime(2026, 3, 8, 5, 30, tzinfo=pytz.utc),
+    datetime.datetime(2026, 3, 29, 0, 30, tzinfo=pytz.utc),
+    datetime.datetime(2026, 4, 4, 14, 0, tzinfo=pytz.utc),
+    datetime.datetime(2026, 10, 3, 15, 0, tzinfo=pytz.utc),
+    datetime.datetime(2026, 10, 25, 0, 30, tzinfo=pytz.utc),
+    datetime.datetime(2026, 11, 1, 5, 30, tzinfo=pytz.utc),
+)
+
+
+def _reference_next_run(schedule, from_utc, until_utc):
+    """逐分钟遍历 UTC 时间的朴素实现，作为 next_run_utc 的对照。"""
+    candidate = from_utc.replace(second=0, microsecond=0) + datetime.timedelta(
+        minutes=1
+    )
+    while candidate <= until_utc:
+        local = candidate.astimezone(schedule.tz)
+        cron_weekday = (local.weekday() + 1) % 7
+        day_match = local.day in schedule.days
+        weekday_match = cron_weekday in schedule.weekdays
+        if schedule._day_star or schedule._weekday_star:
+            date_match = day_match and weekday_match
+        else:
+            date_match = day_match or weekday_match
+        if (
+            local.minute in schedule.minutes
+            and local.hour in schedule.hours
+            and date_match
+            and local.month in schedule.months
+        ):
+            naive = local.replace(tzinfo=None)
+            first_occurrence = min(
+                schedule.tz.localize(naive, is_dst=True),
+                schedule.tz.localize(naive, is_dst=False),
+            )
+            if first_occurrence == candidate:
+                return candidate
+        candidate += datetime.timedelta(minutes=1)
+    return None
+
+
+def _random_field(rng, low, high, names=None, star_weight=0.5):
+    if rng.random() < star_weight:
+        return "*"
+
+    def value():
+        val = rng.randint(low, high)
+        if names and rng.random() < 0.3:
+            return names[val % len(names)]
+        return str(val)
+
+    kind = rng.choice(("value", "range", "step", "range_step", "list"))
+    if kind == "value":
+        return value()
+    if kind == "step":
+        return f"*/{rng.randint(1, max(1, (high - low) // 2))}"
+    if kind in ("range", "range_step"):
+        start = rng.randint(low, high)
+        end = rng.randint(start, high)
+        field = f"{start}-{end}"
+        if kind == "range_step":
+            field += f"/{rng.randint(1, 5)}"
+        return field
+    return ",".join(value() for _ in range(rng.randint(2, 4)))
+
+
+def test_next_run_matches_brute_force_reference():
+    rng = random.Random(20260213)
+    months = ["jan", "feb", "mar", "apr", "may", "jun"]
+    months += ["jul", "aug", "sep", "oct", "nov", "dec"]
+    weekdays = ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]
+
+    for _ in range(300):
+        expr = " ".join(
+            (
+                _random_field(rng, 0, 59, star_weight=0.2),
+                _random_field(rng, 0, 23, star_weight=0.3),
+                _random_field(rng, 1, 31, star_weight=0.8),
+                _random_field(rng, 1, 12, months[-1:] + months, star_weight=0.8),
+                _random_field(rng, 0, 7, weekdays + weekdays[:1], star_weight=0.7),
+            )
+        )
+        try:
+            schedule = CronSchedule(expr, rng.choice(_TIMEZONES))
+        except ValueError:
+            continue
+
+        from_utc = rng.choice(_DST_STARTS) + datetime.timedelta(
+            minutes=rng.randint(-180, 180), seconds=rng.randint(0, 59)
+        )
+        until_utc = from_utc + _REFERENCE_WINDOW
+        expected = _reference_next_run(schedule, from_utc, until_utc)
+        actual = schedule.next_run_utc(from_utc)
+
+        if expected is None:
+            assert actual > until_utc, (expr, schedule.tz, from_utc, actual)
+        else:
+            assert actual == expected, (expr, schedule.tz, from_utc)
+
+
+def test_next_run_supports_date_fields():
+    shanghai = pytz.timezone("Asia/Shanghai")
+    from_utc = shanghai.localize(datetime.datetime(2026, 2, 13, 12, 0)).astimezone(
+        pytz.utc
+    )
+
+    def local_next(expr):
+        return (
+            CronSchedule(expr, "Asia/Shanghai")
+            .next_run_utc(from_utc)
+            .astimezone(shanghai)
+        )
+
+    assert local_next("0 0 29 feb *").date() == datetime.date(2028, 2, 29)
+    assert local_next("30 9 * * mon-fri") == shanghai.localize(
+        datetime.datetime(2026, 2, 16, 9, 30)
+    )
+    # 日与周同时限制时取并集：3 月 1 日或任意周五
+    assert local_next("0 8 1 * 5").date() == datetime.date(2026, 2, 20)
+    assert local_next("0 0 * 3/4 sun").date() == datetime.date(2026, 3, 1)
+
+
+def test_next_run_handles_dst_gaps_and_overlaps():
+    new_york = pytz.timezone("America/New_York")
+    schedule = CronSchedule("30 1,2 * * *", "America/New_York")
+
+    # 2026-03-08 02:30 不存在：当天只在 01:30 触发
+    spring = new_york.localize(datetime.datetime(2026, 3, 8, 1, 40))
+    assert schedule.next_run_utc(spring.astimezone(pytz.utc)).astimezone(
+        new_york
+    ) == new_york.localize(datetime.datetime(2026, 3, 9, 1, 30))
+
+    # 2026-11-01 01:30 出现两次：只在第一次触发
+    fall = new_york.localize(datetime.datetime(2026, 11, 1, 1, 0), is_dst=True)
+    first = schedule.next_run_utc(fall.astimezone(pytz.utc))
+    second = schedule.next_run_utc(first)
+    assert first == new_york.localize(
+        datetime.datetime(2026, 11, 1, 1, 30), is_dst=True
+    ).astimezone(pytz.utc)
+    assert second.astimezone(new_york).replace(tzinfo=None) == datetime.datetime(
+        2026, 11, 1, 2, 30
+    )
+
+
+def test_invalid_cron_expressions_are_rejected():
+    for expr in ("0 4 * *", "60 * * * *", "0 0 31 feb *", "0 0 * * fooday"):
+        with pytest.raises(ValueError):
+            CronSchedule(expr, "Asia/Shanghai")
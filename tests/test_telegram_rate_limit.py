@@ -0,0 +1,77 @@
+import asyncio
+import io
+import time
+
+from telebot.asyncio_helper import ApiTelegramException
+
+from utils.i18n.runtime import LocalizedBot
+from utils.telegram_rate_limit import RateLimitedBot, TelegramRateLimiter
+
+
+def _too_many_requests(retry_after):
+    return ApiTelegramException(
+        "sendPhoto",
+        None,
+        {
+            "error_code": 429,
+            "description": f"Too Many Requests: retry after {retry_after}",
+            "parameters": {"retry_after": retry_after},
+        },
+    )
+
+
+class _FakeBot:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = []
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        self.calls.append((time.monotonic(), photo.read()))
+        if self.failures:
+            self.failures -= 1
+            raise _too_many_requests(0)
+        return "sent"
+
+    async def get_me(self):
+        self.calls.append((time.monotonic(), None))
+        return "me"
+
+
+def test_429_pauses_bucket_and_retries_with_rewound_stream():
+    bot = RateLimitedBot(_FakeBot(failures=2), TelegramRateLimiter())
+    photo = io.BytesIO(b"png")
+
+    assert asyncio.run(bot.send_photo(-1001, photo, caption="x")) == "sent"
+    assert [data for _, data in bot._bot.calls] == [b"png", b"png", b"png"]
+
+
+def test_chat_bucket_spaces_bulk_sends():
+    limiter = TelegramRateLimiter(
+        global_limit=(1000.0, 1000.0), group_chat_limit=(20.0, 2.0)
+    )
+    fake = _FakeBot()
+    bot = RateLimitedBot(fake, limiter)
+
+    async def scenario():
+        for _ in range(4):
+            await bot.send_photo(-1001, io.BytesIO(b"x"))
+        # 其他 chat 与不计限额的方法不受该群的桶影响
+        await bot.send_photo(-1002, io.BytesIO(b"y"))
+        await bot.get_me()
+
+    started = time.monotonic()
+    asyncio.run(scenario())
+    times = [t - started for t, _ in fake.calls]
+
+    # 容量 2：前两条立即发送，之后按 20 条/秒补充
+    assert times[1] < 0.04
+    assert times[3] >= 0.09
+    assert times[4] - times[3] < 0.04
+    assert times[5] - times[4] < 0.04
+
+
+def test_localized_bot_wraps_the_raw_bot_only_once():
+    fake = _FakeBot()
+    outer = LocalizedBot(LocalizedBot(fake, "p", "en"), "p", "en")
+
+    assert outer._bot._bot is fake
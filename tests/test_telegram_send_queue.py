@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+from utils.telegram_send_queue import TelegramSendQueue
+
+
+def test_pending_edits_are_coalesced_to_latest():
+    async def scenario():
+        queue = TelegramSendQueue()
+        release = asyncio.Event()
+        sent = []
+
+        def edit(text):
+            async def send():
+                if not sent:
+                    await release.wait()
+                sent.append(text)
+                return text
+
+            return send
+
+        first = asyncio.create_task(queue.enqueue_edit((1, 10), edit("1/3")))
+        await asyncio.sleep(0)
+        # 第一条编辑发送中，后两条排队，第二条被第三条替换
+        second = asyncio.create_task(queue.enqueue_edit((1, 10), edit("2/3")))
+        third = asyncio.create_task(queue.enqueue_edit((1, 10), edit("3/3")))
+        other = asyncio.create_task(queue.enqueue_edit((1, 11), edit("other")))
+        await asyncio.sleep(0)
+        release.set()
+
+        results = await asyncio.gather(first, second, third, other)
+        return sent, results, queue
+
+    sent, results, queue = asyncio.run(scenario())
+
+    assert [text for text in sent if text != "other"] == ["1/3", "3/3"]
+    assert results == ["1/3", "3/3", "3/3", "other"]
+    assert queue.coalesced_edits == 1
+    assert not queue._edit_workers and not queue._pending_edits
+
+
+def test_send_queue_keeps_fifo_and_interval_per_chat():
+    async def scenario():
+        queue = TelegramSendQueue(send_interval=0.05)
+        sent = []
+
+        def send(chat_id, index):
+            async def run():
+                sent.append((chat_id, index, time.monotonic()))
+                return index
+
+            return run
+
+        results = await asyncio.gather(
+            *(
+                queue.enqueue(chat_id, send(chat_id, index))
+                for index in range(3)
+                for chat_id in (1, 2)
+            )
+        )
+        # 冷却结束后 chat 状态与调度协程都会释放
+        await asyncio.sleep(0.1)
+        return sent, results, queue
+
+    sent, results, queue = asyncio.run(scenario())
+
+    assert results == [0, 0, 1, 1, 2, 2]
+    for chat_id in (1, 2):
+        chat_sent = [item for item in sent if item[0] == chat_id]
+        assert [index for _, index, _ in chat_sent] == [0, 1, 2]
+        gaps = [b[2] - a[2] for a, b in zip(chat_sent, chat_sent[1:])]
+        assert all(gap >= 0.045 for gap in gaps)
+    # 不同 chat 并发发送，不会互相等待间隔
+    assert abs(sent[0][2] - sent[1][2]) < 0.04
+    assert not queue._lanes and not queue._heap
+    assert queue._dispatcher.done()
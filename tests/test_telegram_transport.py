@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+from telebot.asyncio_helper import ApiTelegramException
+
+from utils.telegram_transport import TelegramTransport
+
+
+def test_request_timeout_by_method_class():
+    transport = TelegramTransport()
+
+    assert transport.request_timeout("getUpdates", {"timeout": 20}, None) == 35
+    assert transport.request_timeout("sendMessage", {"chat_id": 1}, None) == 30
+    assert transport.request_timeout("sendPhoto", {}, {"photo": b""}) == 120
+    assert transport.request_timeout("getChat", {}, None) == 30
+    # 调用方在 params 中自带 timeout 时交给 pyTelegramBotAPI 处理
+    assert transport.request_timeout("sendMessage", {"timeout": 5}, None) is None
+
+
+def test_process_request_records_metrics_and_timeouts():
+    transport = TelegramTransport()
+    calls = []
+
+    async def fake_process_request(token, url, method="get", params=None, **kwargs):
+        calls.append((url, kwargs.get("request_timeout")))
+        if url == "sendMessage":
+            raise ApiTelegramException(
+                url, None, {"error_code": 400, "description": "Bad Request"}
+            )
+        return {"ok": True}
+
+    transport._process_request = fake_process_request
+
+    async def scenario():
+        await transport.process_request("t", "getMe")
+        await transport.process_request("t", "getMe")
+        with pytest.raises(ApiTelegramException):
+            await transport.process_request("t", "sendMessage", params={})
+
+    asyncio.run(scenario())
+
+    assert calls == [("getMe", 30), ("getMe", 30), ("sendMessage", 30)]
+    metrics = transport.get_metrics()
+    assert metrics["getMe"].calls == 2 and metrics["getMe"].errors == 0
+    assert metrics["sendMessage"].errors == 1
+    assert metrics["sendMessage"].last_error == "Bad Request"
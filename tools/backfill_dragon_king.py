@@ -1,10 +1,15 @@
 # -*- coding: utf-8 -*-
 # backfill dragon_king_daily from speech_stats (04:00 cycle)
+# 按群组流式处理，可并行、可断点续跑，适合与运行中的 bot 同时执行
 
 import argparse
 import asyncio
 import datetime as dt
-from typing import List, Optional, Sequence, Tuple
+import json
+import os
+import time
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Set, Tuple
 
 import asyncpg
 
@@ -31,50 +36,71 @@ ON dragon_king_daily (group_id, user_id, stat_date DESC)
 
 # 说明：
 # - stat_date 定义：把消息 hour 先按群时区转本地，再减 4 小时后取 date
-# - 每个 (group_id, stat_date) 取 total 最大者为龙王；并列时 display_name 升序
+# - 每个 stat_date 取 total 最大者为龙王；并列时 display_name 升序
+# - 按单个群组查询，speech_stats 先用 (group_id, hour) 索引按日期粗筛（前后各留 2 天余量）
+# - 群组列表沿 (group_id, hour) 索引逐个跳到下一个群组，不扫描全表；
+#   $2 为进度文件中已完成的群组，续跑时直接排除
+GROUP_IDS_SQL = """
+WITH RECURSIVE groups AS (
+    (SELECT group_id FROM speech_stats ORDER BY group_id LIMIT 1)
+    UNION ALL
+    SELECT (
+        SELECT ss.group_id
+        FROM speech_stats ss
+        WHERE ss.group_id > g.group_id
+        ORDER BY ss.group_id
+        LIMIT 1
+    )
+    FROM groups g
+    WHERE g.group_id IS NOT NULL
+)
+SELECT group_id
+FROM groups
+WHERE group_id IS NOT NULL
+  AND ($1::BIGINT[] IS NULL OR group_id = ANY($1))
+  AND NOT (group_id = ANY($2::BIGINT[]))
+ORDER BY group_id
+"""
+
 WINNERS_SQL = """
-WITH tz_map AS (
-    SELECT g.group_id,
-           COALESCE(sj.timezone, 'Asia/Shanghai') AS timezone
-    FROM (
-        SELECT DISTINCT group_id
-        FROM speech_stats
-        WHERE ($1::BIGINT[] IS NULL OR group_id = ANY($1))
-    ) g
-    LEFT JOIN scheduled_jobs sj
-      ON sj.group_id = g.group_id
-     AND sj.job_name = 'stats.dragon_king'
+WITH tz AS (
+    SELECT COALESCE(
+        (
+            SELECT timezone
+            FROM scheduled_jobs
+            WHERE group_id = $1 AND job_name = 'stats.dragon_king'
+        ),
+        'Asia/Shanghai'
+    ) AS timezone
 ),
 daily AS (
     SELECT
-        ss.group_id,
-        ((ss.hour AT TIME ZONE tz_map.timezone) - INTERVAL '4 hour')::date AS stat_date,
+        ((ss.hour AT TIME ZONE tz.timezone) - INTERVAL '4 hour')::date AS stat_date,
         ss.user_id,
         MAX(ss.display_name) AS display_name,
         SUM(ss.count)::int AS total
     FROM speech_stats ss
-    JOIN tz_map ON tz_map.group_id = ss.group_id
-    WHERE ($1::BIGINT[] IS NULL OR ss.group_id = ANY($1))
-    GROUP BY
-        ss.group_id,
-        ((ss.hour AT TIME ZONE tz_map.timezone) - INTERVAL '4 hour')::date,
-        ss.user_id
+    CROSS JOIN tz
+    WHERE ss.group_id = $1
+      AND ($2::DATE IS NULL OR ss.hour >= ($2::DATE - 2)::TIMESTAMP AT TIME ZONE 'UTC')
+      AND ($3::DATE IS NULL OR ss.hour < ($3::DATE + 3)::TIMESTAMP AT TIME ZONE 'UTC')
+    GROUP BY 1, ss.user_id
 ),
 ranked AS (
     SELECT
-        group_id, stat_date, user_id, display_name, total,
+        stat_date, user_id, display_name, total,
         ROW_NUMBER() OVER (
-            PARTITION BY group_id, stat_date
+            PARTITION BY stat_date
             ORDER BY total DESC, display_name ASC
         ) AS rn
     FROM daily
     WHERE ($2::DATE IS NULL OR stat_date >= $2)
       AND ($3::DATE IS NULL OR stat_date <= $3)
 )
-SELECT group_id, stat_date, user_id, display_name, total
+SELECT $1::BIGINT AS group_id, stat_date, user_id, display_name, total
 FROM ranked
 WHERE rn = 1 AND total > 0
-ORDER BY group_id, stat_date
+ORDER BY stat_date
 """
 
 UPSERT_SQL = """
@@ -96,6 +122,9 @@ DO NOTHING
 """
 
 
+DEFAULT_CHECKPOINT = "backfill_dragon_king.checkpoint.json"
+
+
 def parse_date(date_str: Optional[str]) -> Optional[dt.date]:
     if not date_str:
         return None
@@ -135,43 +164,157 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="只计算不落库",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="同时处理的群组数（连接池大小），默认 4",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="游标每次预取及每批写入的行数，默认 1000",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default=DEFAULT_CHECKPOINT,
+        help=f"进度文件路径，中断后重跑会跳过已完成群组，默认 {DEFAULT_CHECKPOINT}",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="忽略已有进度文件，从头开始",
+    )
     return parser.parse_args()
 
 
-def build_rows_with_streak(
-    winners: Sequence[asyncpg.Record],
-) -> List[Tuple[int, dt.date, int, str, int, int]]:
-    result: List[Tuple[int, dt.date, int, str, int, int]] = []
-
-    last_group_id: Optional[int] = None
-    last_date: Optional[dt.date] = None
-    last_user_id: Optional[int] = None
+def _next_streak(
+    streak: int,
+    last: Optional[Tuple[int, dt.date, int]],
+    group_id: int,
+    stat_date: dt.date,
+    user_id: int,
+) -> int:
+    if (
+        last is not None
+        and last[0] == group_id
+        and stat_date == last[1] + dt.timedelta(days=1)
+        and last[2] == user_id
+    ):
+        return streak + 1
+    return 1
+
+
+async def stream_rows_with_streak(
+    winners: AsyncIterator[asyncpg.Record], batch_size: int
+) -> AsyncIterator[List[Tuple[int, dt.date, int, str, int, int]]]:
+    """逐行消费游标计算连胜天数，按 batch_size 分批产出。"""
+    batch: List[Tuple[int, dt.date, int, str, int, int]] = []
+    last: Optional[Tuple[int, dt.date, int]] = None
     streak = 0
 
-    for row in winners:
+    async for row in winners:
         group_id = int(row["group_id"])
         stat_date = row["stat_date"]
         user_id = int(row["user_id"])
-        display_name = str(row["display_name"])
-        total = int(row["total"])
-
-        if (
-            last_group_id == group_id
-            and last_date is not None
-            and stat_date == last_date + dt.timedelta(days=1)
-            and last_user_id == user_id
-        ):
-            streak += 1
-        else:
-            streak = 1
-
-        result.append((group_id, stat_date, user_id, display_name, total, streak))
-
-        last_group_id = group_id
-        last_date = stat_date
-        last_user_id = user_id
-
-    return result
+        streak = _next_streak(streak, last, group_id, stat_date, user_id)
+        batch.append(
+            (
+                group_id,
+                stat_date,
+                user_id,
+                str(row["display_name"]),
+                int(row["total"]),
+                streak,
+            )
+        )
+        last = (group_id, stat_date, user_id)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+class Checkpoint:
+    """记录已完成的群组，参数不同的进度文件视为无效。"""
+
+    def __init__(self, path: Path, signature: dict, restart: bool):
+        self.path = path
+        self.signature = signature
+        self.done: Set[int] = set()
+        if restart or not path.exists():
+            return
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("signature") != signature:
+            raise ValueError(
+                f"进度文件 {path} 与当前参数不一致，请使用 --restart 或更换 --checkpoint"
+            )
+        self.done = {int(gid) for gid in data.get("done", [])}
+
+    def mark_done(self, group_id: int) -> None:
+        self.done.add(group_id)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(
+            json.dumps(
+                {"signature": self.signature, "done": sorted(self.done)},
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+class Progress:
+    def __init__(self, total_groups: int):
+        self.total_groups = total_groups
+        self.groups = 0
+        self.rows = 0
+        self.started = time.monotonic()
+
+    def add(self, group_id: int, rows: int) -> None:
+        self.groups += 1
+        self.rows += rows
+        print(
+            f"[INFO] group {group_id}: rows={rows} "
+            f"({self.groups}/{self.total_groups}, {self.rows_per_second:.0f} rows/s)"
+        )
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / max(self.elapsed, 1e-9)
+
+
+async def backfill_group(
+    pool: asyncpg.Pool,
+    group_id: int,
+    from_date: Optional[dt.date],
+    to_date: Optional[dt.date],
+    write_sql: Optional[str],
+    batch_size: int,
+) -> int:
+    """单个群组在一个事务内流式计算并分批写入；write_sql 为 None 时只统计行数。"""
+    rows = 0
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            winners = conn.cursor(
+                WINNERS_SQL, group_id, from_date, to_date, prefetch=batch_size
+            )
+            async for batch in stream_rows_with_streak(winners, batch_size):
+                if write_sql:
+                    await conn.executemany(write_sql, batch)
+                rows += len(batch)
+    return rows
 
 
 async def main() -> None:
@@ -181,42 +324,89 @@ async def main() -> None:
 
     if from_date and to_date and from_date > to_date:
         raise ValueError("--from-date 不能晚于 --to-date")
+    if args.concurrency < 1 or args.batch_size < 1:
+        raise ValueError("--concurrency 与 --batch-size 必须为正整数")
 
     group_ids = args.group_ids if args.group_ids else None
-
-    conn = await asyncpg.connect(
+    write_sql = None
+    if not args.dry_run:
+        write_sql = INSERT_MISSING_SQL if args.missing_only else UPSERT_SQL
+
+    checkpoint = None
+    if not args.dry_run:
+        checkpoint = Checkpoint(
+            Path(args.checkpoint),
+            {
+                "group_ids": sorted(group_ids) if group_ids else None,
+                "from_date": args.from_date,
+                "to_date": args.to_date,
+                "missing_only": args.missing_only,
+            },
+            args.restart,
+        )
+
+    pool = await asyncpg.create_pool(
         host=BotConfig["database"]["host"],
         port=BotConfig["database"]["port"],
         user=BotConfig["database"]["user"],
         password=BotConfig["database"]["password"],
         database=BotConfig["database"]["dbname"],
+        min_size=1,
+        max_size=args.concurrency,
     )
 
     try:
-        await conn.execute(CREATE_DRAGON_TABLE_SQL)
-        await conn.execute(CREATE_DRAGON_INDEX_SQL)
-
-        winners = await conn.fetch(WINNERS_SQL, group_ids, from_date, to_date)
-        rows = build_rows_with_streak(winners)
-
-        group_count = len({int(r[0]) for r in rows})
-        print(f"[INFO] winners rows: {len(rows)}, groups: {group_count}")
+        async with pool.acquire() as conn:
+            await conn.execute(CREATE_DRAGON_TABLE_SQL)
+            await conn.execute(CREATE_DRAGON_INDEX_SQL)
+            done = sorted(checkpoint.done) if checkpoint else []
+            if done:
+                print(f"[INFO] resume: skipping {len(done)} completed groups")
+            pending = [
+                int(r["group_id"])
+                for r in await conn.fetch(GROUP_IDS_SQL, group_ids, done)
+            ]
+
+        print(f"[INFO] groups to process: {len(pending)}")
+        progress = Progress(len(pending))
+        queue: asyncio.Queue = asyncio.Queue()
+        for gid in pending:
+            queue.put_nowait(gid)
+
+        async def worker():
+            while True:
+                try:
+                    group_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                rows = await backfill_group(
+                    pool, group_id, from_date, to_date, write_sql, args.batch_size
+                )
+                if checkpoint:
+                    checkpoint.mark_done(group_id)
+                progress.add(group_id, rows)
+
+        await asyncio.gather(
+            *(worker() for _ in range(min(args.concurrency, len(pending)) or 1))
+        )
 
         if args.dry_run:
-            print("[DRY-RUN] 不写入数据库。")
+            print(
+                f"[DRY-RUN] 不写入数据库。winners rows: {progress.rows}, "
+                f"groups: {progress.groups}"
+            )
             return
 
-        sql = INSERT_MISSING_SQL if args.missing_only else UPSERT_SQL
-
-        # 建议放事务，保证批处理一致性
-        async with conn.transaction():
-            await conn.executemany(sql, rows)
-
+        checkpoint.remove()
         mode = "missing-only" if args.missing_only else "upsert"
-        print(f"[OK] backfill completed, mode={mode}, rows={len(rows)}")
+        print(
+            f"[OK] backfill completed, mode={mode}, rows={progress.rows}, "
+            f"groups={progress.groups}, elapsed={progress.elapsed:.1f}s, "
+            f"{progress.rows_per_second:.0f} rows/s"
+        )
 
     finally:
-        await conn.close()
+        await pool.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# benchmark CronSchedule.next_run_utc for many keyed (job, group) entries
+
+import argparse
+import datetime as dt
+import random
+import sys
+import time
+from pathlib import Path
+
+import pytz
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.scheduler import CronSchedule  # noqa: E402
+
+
+TIMEZONES = (
+    "Asia/Shanghai",
+    "Asia/Tokyo",
+    "Europe/London",
+    "America/New_York",
+    "Australia/Sydney",
+)
+
+EXPRESSIONS = (
+    "0 {hour} * * *",
+    "{minute} {hour} * * *",
+    "*/15 * * * *",
+    "0 {hour} * * mon-fri",
+    "30 {hour} 1,15 * *",
+    "0 {hour} 1 jan,jul *",
+    "0 0 29 feb *",
+)
+
+
+def legacy_next_run_utc(schedule: CronSchedule, from_utc: dt.datetime) -> dt.datetime:
+    """旧实现：逐分钟试探（仅支持分/时字段），用于对比。"""
+    local = from_utc.astimezone(schedule.tz).replace(second=0, microsecond=0)
+    local += dt.timedelta(minutes=1)
+    for _ in range(60 * 24 * 366):
+        if local.minute in schedule.minutes and local.hour in schedule.hours:
+            return local.astimezone(pytz.utc)
+        local += dt.timedelta(minutes=1)
+    raise RuntimeError("Failed to compute next run time for cron schedule")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark CronSchedule.next_run_utc for keyed entries."
+    )
+    parser.add_argument(
+        "--entries",
+        type=int,
+        default=10000,
+        help="模拟的 (job, group) 条目数",
+    )
+    parser.add_argument(
+        "--legacy",
+        action="store_true",
+        help="同时测量旧的逐分钟实现（仅分/时字段表达式）",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def build_schedules(count: int, rng: random.Random):
+    schedules = []
+    for _ in range(count):
+        expr = rng.choice(EXPRESSIONS).format(
+            minute=rng.randint(0, 59), hour=rng.randint(0, 23)
+        )
+        schedules.append(CronSchedule(expr, rng.choice(TIMEZONES)))
+    return schedules
+
+
+def measure(label: str, func, schedules, from_utc: dt.datetime) -> None:
+    started = time.perf_counter()
+    for schedule in schedules:
+        func(schedule, from_utc)
+    elapsed = time.perf_counter() - started
+    per_entry_us = elapsed / max(1, len(schedules)) * 1e6
+    print(
+        f"[{label}] entries={len(schedules)} total={elapsed:.3f}s "
+        f"per_entry={per_entry_us:.1f}us"
+    )
+
+
+def main() -> None:
+    args = parse_args()
+    rng = random.Random(args.seed)
+    from_utc = dt.datetime.now(tz=pytz.utc)
+
+    schedules = build_schedules(args.entries, rng)
+    measure("field-wise", CronSchedule.next_run_utc, schedules, from_utc)
+
+    if args.legacy:
+        hourly = [
+            s
+            for s in schedules
+            if len(s.days) == 31 and len(s.months) == 12 and len(s.weekdays) == 7
+        ]
+        measure("legacy", legacy_next_run_utc, hourly, from_utc)
+
+
+if __name__ == "__main__":
+    main()
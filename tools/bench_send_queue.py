@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+# benchmark TelegramSendQueue fan-out to many chats (e.g. daily stats pushes)
+
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils.telegram_send_queue import TelegramSendQueue  # noqa: E402
+
+
+class LegacySendQueue:
+    """旧实现：每个 chat 一个 asyncio.Queue + 常驻 worker，用于对比。"""
+
+    def __init__(self, send_interval: float = 1.0, idle_timeout: float = 300.0):
+        self.send_interval = send_interval
+        self.idle_timeout = idle_timeout
+        self._queues: dict[Any, asyncio.Queue] = {}
+        self._workers: dict[Any, asyncio.Task] = {}
+
+    async def enqueue(self, chat_id, send_coro_factory, seekables=None):
+        loop = asyncio.get_running_loop()
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = asyncio.Queue()
+        worker = self._workers.get(chat_id)
+        if worker is None or worker.done():
+            self._workers[chat_id] = loop.create_task(self._worker(chat_id, queue))
+        future = loop.create_future()
+        await queue.put((send_coro_factory, future))
+        return await future
+
+    async def _worker(self, chat_id, queue):
+        last_finished_at = None
+        while True:
+            try:
+                factory, future = await asyncio.wait_for(
+                    queue.get(), timeout=self.idle_timeout
+                )
+            except asyncio.TimeoutError:
+                self._workers.pop(chat_id, None)
+                self._queues.pop(chat_id, None)
+                return
+            try:
+                if last_finished_at is not None:
+                    wait_seconds = self.send_interval - (
+                        time.monotonic() - last_finished_at
+                    )
+                    if wait_seconds > 0:
+                        await asyncio.sleep(wait_seconds)
+                future.set_result(await factory())
+            finally:
+                last_finished_at = time.monotonic()
+
+    async def close(self):
+        for worker in self._workers.values():
+            worker.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark TelegramSendQueue fan-out to many chats."
+    )
+    parser.add_argument(
+        "--chats",
+        type=int,
+        nargs="+",
+        default=[10000, 100000],
+        help="触达的 chat 数，可给多个",
+    )
+    parser.add_argument(
+        "--per-chat", type=int, default=2, help="每个 chat 发送的消息数"
+    )
+    parser.add_argument(
+        "--interval", type=float, default=0.01, help="同 chat 发送间隔（秒）"
+    )
+    parser.add_argument(
+        "--legacy",
+        action="store_true",
+        help="同时测量旧的每 chat 一个 worker 的实现",
+    )
+    return parser.parse_args()
+
+
+async def run_fanout(queue, chats: int, per_chat: int) -> dict:
+    sent = 0
+
+    async def send():
+        nonlocal sent
+        sent += 1
+        return True
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            queue.enqueue(chat_id, send)
+            for _ in range(per_chat)
+            for chat_id in range(-chats, 0)
+        )
+    )
+    elapsed = time.perf_counter() - started
+    tasks_after = len(asyncio.all_tasks()) - 1
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if hasattr(queue, "close"):
+        await queue.close()
+    return {
+        "sent": sent,
+        "elapsed": elapsed,
+        "peak_mb": peak / 1024 / 1024,
+        "tasks_after": tasks_after,
+    }
+
+
+def report(label: str, chats: int, stats: dict) -> None:
+    print(
+        f"[{label}] chats={chats} sent={stats['sent']} "
+        f"total={stats['elapsed']:.3f}s "
+        f"per_msg={stats['elapsed'] / max(1, stats['sent']) * 1e6:.1f}us "
+        f"peak_mem={stats['peak_mb']:.1f}MB "
+        f"tasks_left={stats['tasks_after']}"
+    )
+
+
+def main() -> None:
+    args = parse_args()
+    for chats in args.chats:
+        stats = asyncio.run(
+            run_fanout(TelegramSendQueue(args.interval), chats, args.per_chat)
+        )
+        report("heap", chats, stats)
+        if args.legacy:
+            stats = asyncio.run(
+                run_fanout(LegacySendQueue(args.interval), chats, args.per_chat)
+            )
+            report("legacy", chats, stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+# @File    : cache_bus.py
+# @Software: PyCharm
+import asyncio
+import inspect
+import json
+import os
+import uuid
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from loguru import logger
+
+CHANNEL = "nachoneko_cache_invalidation"
+# 单条 NOTIFY 负载上限为 8000 字节，留出余量
+MAX_PAYLOAD_BYTES = 7000
+HEALTH_CHECK_INTERVAL = 30
+MAX_RECONNECT_DELAY = 30
+
+
+class CacheInvalidationBus:
+    """
+    Cross-process cache invalidation over PostgreSQL LISTEN/NOTIFY.
+
+    Writers call `publish(namespace, *keys)` after changing data they cache.
+    Every other process evicts those keys through the handlers registered with
+    `subscribe`. Whenever the listening connection is lost, notifications may
+    have been missed, so all subscribers are fully flushed after reconnecting.
+    """
+
+    def __init__(self):
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._pool = None
+        self._subscribers: Dict[str, Dict[str, Tuple[Callable, Callable]]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._dispatch_tasks: Set[asyncio.Task] = set()
+        self._stop_event = asyncio.Event()
+        self._needs_flush = False
+
+    def subscribe(
+        self,
+        namespace: str,
+        name: str,
+        on_evict: Callable[[str], object],
+        on_flush: Callable[[], object],
+    ):
+        """
+        Register eviction handlers. Handlers may be sync or async and run in
+        registration order; registering the same name again replaces it.
+
+        :param namespace: Namespace the keys belong to, e.g. "group".
+        :param name: Subscriber name, unique within the namespace.
+        :param on_evict: Called with each invalidated key.
+        :param on_flush: Called when the whole cache must be dropped.
+        """
+        self._subscribers.setdefault(namespace, {})[name] = (on_evict, on_flush)
+
+    def start(self, pool):
+        """Start listening on a connection taken from the given asyncpg pool."""
+        if self._task and not self._task.done():
+            return
+        self._pool = pool
+        self._stop_event.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stop_event.set()
+        if self._task:
+            await self._task
+            self._task = None
+
+    async def publish(self, namespace: str, *keys) -> bool:
+        """Notify other processes that the given keys of a namespace changed."""
+        if self._pool is None or not keys:
+            return False
+        try:
+            async with self._pool.acquire() as connection:
+                for payload in self._build_payloads(namespace, [str(k) for k in keys]):
+                    await connection.execute(
+                        "SELECT pg_notify($1, $2)", CHANNEL, payload
+                    )
+            return True
+        except Exception as e:
+            logger.error(f"Error publishing cache invalidation for '{namespace}': {e}")
+            return False
+
+    def _build_payloads(self, namespace: str, keys: Iterable[str]):
+        batch = []
+        size = 0
+        for key in keys:
+            key_size = len(key.encode("utf-8")) + 4
+            if batch and size + key_size > MAX_PAYLOAD_BYTES:
+                yield self._encode(namespace, batch)
+                batch, size = [], 0
+            batch.append(key)
+            size += key_size
+        if batch:
+            yield self._encode(namespace, batch)
+
+    def _encode(self, namespace: str, keys) -> str:
+        return json.dumps(
+            {"origin": self.origin, "ns": namespace, "keys": keys},
+            ensure_ascii=False,
+        )
+
+    async def _run(self):
+        delay = 1
+        while not self._stop_event.is_set():
+            connection = None
+            try:
+                connection = await self._pool.acquire()
+                await connection.add_listener(CHANNEL, self._on_notify)
+                logger.info(f"📡 缓存失效总线已监听 {CHANNEL}")
+                if self._needs_flush:
+                    await self._flush_all()
+                delay = 1
+                while not self._stop_event.is_set():
+                    try:
+                        await asyncio.wait_for(
+                            self._stop_event.wait(), timeout=HEALTH_CHECK_INTERVAL
+                        )
+                    except asyncio.TimeoutError:
+                        await connection.fetchval("SELECT 1", timeout=10)
+            except Exception as e:
+                logger.warning(f"📡 缓存失效总线连接中断: {e}")
+            finally:
+                if connection is not None:
+                    try:
+                        await connection.remove_listener(CHANNEL, self._on_notify)
+                    except Exception:
+                        pass
+                    try:
+                        await self._pool.release(connection)
+                    except Exception:
+                        pass
+
+            if self._stop_event.is_set():
+                break
+            # 断线期间的通知已丢失，重连后整体清空缓存
+            self._needs_flush = True
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        task = asyncio.create_task(self._dispatch(payload))
+        self._dispatch_tasks.add(task)
+        task.add_done_callback(self._dispatch_tasks.discard)
+
+    async def _dispatch(self, payload: str):
+        try:
+            message = json.loads(payload)
+        except Exception:
+            logger.warning(f"📡 无法解析缓存失效消息: {payload[:200]}")
+            return
+        if message.get("origin") == self.origin:
+            return
+        for on_evict, _ in list(self._subscribers.get(message.get("ns"), {}).values()):
+            for key in message.get("keys", []):
+                await _call(on_evict, key)
+
+    async def _flush_all(self):
+        logger.info("📡 缓存失效总线重连，清空全部缓存")
+        for subscribers in list(self._subscribers.values()):
+            for _, on_flush in list(subscribers.values()):
+                await _call(on_flush)
+        self._needs_flush = False
+
+
+async def _call(func, *args):
+    try:
+        result = func(*args)
+        if inspect.isawaitable(result):
+            await result
+    except Exception as e:
+        logger.error(f"📡 缓存失效处理失败 {getattr(func, '__qualname__', func)}: {e}")
+
+
+BotCacheBus = CacheInvalidationBus()
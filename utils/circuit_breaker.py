@@ -0,0 +1,206 @@
+"""外部服务熔断器。
+
+上游持续失败（超时、5xx、被 CDN 拦截）时，每次查询都要等满超时才失败。
+``CircuitBreaker`` 在滑动窗口内统计失败率：
+
+- closed：正常放行，窗口内调用数达到 ``min_calls`` 且失败率超过阈值时打开。
+- open：直接抛出 ``CircuitOpenError``，不再请求上游，持续 ``cooldown`` 秒。
+- half_open：冷却结束后放行少量探测请求，成功则关闭，失败则重新打开。
+
+默认参数读取 config.yaml 的 ``circuit_breaker`` 段，``BotBreakers.get`` 可按
+服务覆盖。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+from loguru import logger
+
+
+DEFAULT_OPTIONS: dict[str, Any] = {
+    # 统计失败率的滑动窗口（秒）
+    "window": 60.0,
+    # 窗口内至少有这么多次调用才判断失败率
+    "min_calls": 4,
+    "failure_rate": 0.5,
+    # 打开后多久进入半开状态（秒）
+    "cooldown": 60.0,
+    # 半开状态同时放行的探测请求数
+    "half_open_probes": 1,
+}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，本次调用未发出。"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"circuit {name} is open, retry in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def _load_options() -> dict[str, Any]:
+    from utils.yaml import BotConfig
+
+    options = dict(DEFAULT_OPTIONS)
+    options.update((BotConfig or {}).get("circuit_breaker") or {})
+    return options
+
+
+class CircuitBreaker:
+    """单个上游服务的熔断器，按调用结果在 closed / open / half_open 间切换。"""
+
+    def __init__(
+        self,
+        name: str,
+        window: float = DEFAULT_OPTIONS["window"],
+        min_calls: int = DEFAULT_OPTIONS["min_calls"],
+        failure_rate: float = DEFAULT_OPTIONS["failure_rate"],
+        cooldown: float = DEFAULT_OPTIONS["cooldown"],
+        half_open_probes: int = DEFAULT_OPTIONS["half_open_probes"],
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        # (时间, 是否失败)
+        self._calls: deque[tuple[float, bool]] = deque()
+        self._opened_at: float | None = None
+        self._probes = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return CLOSED
+        if self._clock() - self._opened_at < self.cooldown:
+            return OPEN
+        return HALF_OPEN
+
+    @property
+    def retry_in(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.cooldown - (self._clock() - self._opened_at))
+
+    def allow(self) -> bool:
+        """是否放行一次调用；半开状态下放行会占用一个探测名额。"""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and self._probes < self.half_open_probes:
+            self._probes += 1
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            if self.state == HALF_OPEN:
+                logger.info(f"🟢 熔断器 {self.name} 探测成功，恢复放行")
+                self._opened_at = None
+                self._probes = 0
+                self._calls.clear()
+            return
+        self._append(False)
+
+    def record_failure(self) -> None:
+        if self._opened_at is not None:
+            # 半开探测失败：重新打开并重新计时；打开前已发出的调用不影响状态
+            if self.state == HALF_OPEN:
+                self._open()
+            return
+        self._append(True)
+        failures = sum(1 for _, failed in self._calls if failed)
+        if (
+            len(self._calls) >= self.min_calls
+            and failures / len(self._calls) >= self.failure_rate
+        ):
+            self._open()
+
+    async def call(
+        self,
+        func: Callable[..., Awaitable[Any]],
+        *args,
+        failure_if: Callable[[Any], bool] | None = None,
+        **kwargs,
+    ) -> Any:
+        """
+        经熔断器调用 ``func``。异常（包括请求自身的超时）以及 ``failure_if(result)``
+        为真的结果计为失败；打开时抛出 ``CircuitOpenError``。
+
+        被取消（调用方的截止时间到了或调用方退出）不反映上游状态，不计入统计，
+        只归还占用的半开探测名额。
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_in)
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            self._release_probe()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        if failure_if is not None and failure_if(result):
+            self.record_failure()
+        else:
+            self.record_success()
+        return result
+
+    def _release_probe(self) -> None:
+        if self.state == HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def _append(self, failed: bool) -> None:
+        now = self._clock()
+        self._calls.append((now, failed))
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+
+    def _open(self) -> None:
+        if self._opened_at is None:
+            logger.warning(
+                f"🔴 熔断器 {self.name} 已打开，{self.cooldown:.0f}s 内不再请求上游"
+            )
+        self._opened_at = self._clock()
+        self._probes = 0
+        self._calls.clear()
+
+
+class CircuitBreakerRegistry:
+    """按服务名共享的熔断器，同一上游在所有调用方之间共用状态。"""
+
+    def __init__(self):
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._options: dict[str, Any] | None = None
+
+    @property
+    def options(self) -> dict[str, Any]:
+        if self._options is None:
+            self._options = _load_options()
+        return self._options
+
+    def get(self, name: str, **overrides) -> CircuitBreaker:
+        """获取 ``name`` 对应的熔断器；``overrides`` 仅在首次创建时生效。"""
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, **{**self.options, **overrides})
+            self._breakers[name] = breaker
+        return breaker
+
+    def states(self) -> dict[str, str]:
+        return {name: breaker.state for name, breaker in self._breakers.items()}
+
+
+BotBreakers = CircuitBreakerRegistry()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+# @File    : http_client.py
+# @Software: PyCharm
+from typing import Any, Dict, Optional
+
+import aiohttp
+from loguru import logger
+
+try:
+    from curl_cffi.requests import AsyncSession as CurlAsyncSession
+except ImportError:
+    CurlAsyncSession = None
+
+DEFAULT_OPTIONS: Dict[str, Any] = {
+    # 整个请求的默认超时（秒），单次请求可传 timeout= 覆盖
+    "timeout": 30,
+    "connect_timeout": 10,
+    "limit": 100,
+    "limit_per_host": 10,
+    "dns_cache_ttl": 300,
+    "keepalive_timeout": 30,
+    # 例如 http://127.0.0.1:7890；为空时仍会读取 HTTP(S)_PROXY 环境变量
+    "proxy": None,
+}
+
+
+def _load_options() -> Dict[str, Any]:
+    from utils.yaml import BotConfig
+
+    options = dict(DEFAULT_OPTIONS)
+    options.update((BotConfig or {}).get("http") or {})
+    return options
+
+
+class HttpClientRegistry:
+    """
+    Long-lived outbound HTTP sessions shared by every plugin.
+
+    Sessions are created lazily on first use and reused afterwards, so repeated
+    lookups keep their TCP/TLS connections and DNS cache. Defaults come from the
+    optional `http` section of config.yaml. Do not close the returned sessions
+    yourself; `close()` is called once on shutdown.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._curl_sessions: Dict[str, Any] = {}
+        self._options: Optional[Dict[str, Any]] = None
+
+    @property
+    def options(self) -> Dict[str, Any]:
+        if self._options is None:
+            self._options = _load_options()
+        return self._options
+
+    def session(self, name: str = "default", **session_kwargs) -> aiohttp.ClientSession:
+        """
+        Get the shared aiohttp session registered under `name`.
+
+        :param name: Separate names get separate connection pools, e.g. for
+            clients that need their own default headers.
+        :param session_kwargs: Extra `aiohttp.ClientSession` arguments, only
+            applied when the session is first created.
+        """
+        session = self._sessions.get(name)
+        if session is None or session.closed:
+            options = self.options
+            connector = aiohttp.TCPConnector(
+                limit=options["limit"],
+                limit_per_host=options["limit_per_host"],
+                ttl_dns_cache=options["dns_cache_ttl"],
+                keepalive_timeout=options["keepalive_timeout"],
+            )
+            session_kwargs.setdefault(
+                "timeout",
+                aiohttp.ClientTimeout(
+                    total=options["timeout"], connect=options["connect_timeout"]
+                ),
+            )
+            if options["proxy"]:
+                session_kwargs.setdefault("proxy", options["proxy"])
+            session = aiohttp.ClientSession(
+                connector=connector, trust_env=True, **session_kwargs
+            )
+            self._sessions[name] = session
+        return session
+
+    def curl_session(self, name: str = "default"):
+        """
+        Get the shared curl_cffi `AsyncSession` registered under `name`, or
+        None when curl_cffi is not installed.
+        """
+        if CurlAsyncSession is None:
+            return None
+        session = self._curl_sessions.get(name)
+        if session is None:
+            options = self.options
+            session = CurlAsyncSession(
+                timeout=options["timeout"],
+                max_clients=options["limit_per_host"],
+                proxy=options["proxy"] or None,
+            )
+            self._curl_sessions[name] = session
+        return session
+
+    async def close(self):
+        """Close every session. Safe to call more than once."""
+        for session in self._sessions.values():
+            try:
+                await session.close()
+            except Exception as e:
+                logger.warning(f"Error closing HTTP session: {e}")
+        for session in self._curl_sessions.values():
+            try:
+                await session.close()
+            except Exception as e:
+                logger.warning(f"Error closing curl session: {e}")
+        self._sessions.clear()
+        self._curl_sessions.clear()
+
+
+BotHttp = HttpClientRegistry()
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 
 from utils.i18n.service import plugin_t, t as framework_t, normalize_language
+from utils.telegram_rate_limit import rate_limited
+from utils.telegram_send_queue import telegram_send_queue
 from utils.telegram_guest import (
     answer_guest_document,
     answer_guest_photo,
@@ -16,11 +18,16 @@ class LocalizedBot:
     携带 i18n 上下文的 bot 包装器。
 
     不做任何隐式翻译 — 所有翻译必须通过 _t() / _ft() 或 bot.t() / bot.ft() 显式调用。
-    bot 的所有方法（reply_to, send_message 等）直接透传到底层 bot 实例。
+    bot 的所有方法（reply_to, send_message 等）透传到底层 bot 实例，
+    并经过 ``utils.telegram_rate_limit`` 的令牌桶限速与 429 自动重试。
+    ``edit_message_text`` 额外走发送队列的编辑合并通道，同一条消息
+    积压的中间态编辑只会发出最新的一次。
     """
 
     def __init__(self, bot, plugin_name: str, lang: str):
-        self._bot = bot
+        if isinstance(bot, LocalizedBot):
+            bot = bot._bot
+        self._bot = rate_limited(bot)
         self.plugin_name = plugin_name
         self.lang = lang
 
@@ -32,10 +39,30 @@ class LocalizedBot:
         """Framework 级别翻译 — 从 framework.json 查找 key"""
         return framework_t(key, self.lang, **kwargs)
 
+    async def edit_message_text(self, *args, **kwargs):
+        edit_key = _edit_key(args, kwargs)
+        if edit_key is None:
+            return await self._bot.edit_message_text(*args, **kwargs)
+        return await telegram_send_queue.enqueue_edit(
+            edit_key, lambda: self._bot.edit_message_text(*args, **kwargs)
+        )
+
     def __getattr__(self, item):
         return getattr(self._bot, item)
 
 
+def _edit_key(args: tuple, kwargs: dict):
+    """编辑合并键：``inline_message_id`` 或 ``(chat_id, message_id)``。"""
+    inline_message_id = kwargs.get("inline_message_id")
+    if inline_message_id:
+        return ("inline", inline_message_id)
+    chat_id = kwargs.get("chat_id", args[1] if len(args) > 1 else None)
+    message_id = kwargs.get("message_id", args[2] if len(args) > 2 else None)
+    if chat_id is None or message_id is None:
+        return None
+    return (chat_id, message_id)
+
+
 class GuestLocalizedBot(LocalizedBot):
     """Guest Mode 专用 bot 包装器。
 
@@ -152,13 +179,13 @@ class GuestLocalizedBot(LocalizedBot):
             text = truncate_guest_text(text)
             self._last_text = text
             kwargs = {key: value for key, value in kwargs.items() if value is not None}
-            return await self._bot.edit_message_text(text, *remaining_args, **kwargs)
+            return await super().edit_message_text(text, *remaining_args, **kwargs)
 
         if chat_id is not None:
             kwargs["chat_id"] = chat_id
         if message_id is not None:
             kwargs["message_id"] = message_id
-        return await self._bot.edit_message_text(text, *remaining_args, **kwargs)
+        return await super().edit_message_text(text, *remaining_args, **kwargs)
 
     async def _answer_or_edit_guest(
         self,
@@ -185,7 +212,7 @@ class GuestLocalizedBot(LocalizedBot):
                 edit_kwargs["parse_mode"] = parse_mode
             if disable_web_page_preview is not None:
                 edit_kwargs["disable_web_page_preview"] = disable_web_page_preview
-            await self._bot.edit_message_text(next_text, **edit_kwargs)
+            await super().edit_message_text(next_text, **edit_kwargs)
             return make_guest_message_like(
                 chat_id, self._fake_message_seq, self._inline_message_id
             )
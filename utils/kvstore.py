@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+# @File    : kvstore.py
+# @Software: PyCharm
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+from loguru import logger
+
+from utils.cache_bus import BotCacheBus
+from utils.postgres import BotDatabase
+
+
+class AsyncKVStore:
+    """
+    Key-value store kept fully in memory and persisted to the `kv_store` table.
+
+    Reads never touch the database. Writes update the in-memory cache first and
+    are flushed to PostgreSQL in batches by a background task (write-behind).
+    Values must be JSON-serializable. Values returned by `get` are the cached
+    objects: call `set` after mutating them so the change is persisted.
+    """
+
+    def __init__(self, elara_path: str = None, flush_delay: float = 1.0):
+        self.elara_path = elara_path
+        self.flush_delay = flush_delay
+        self._cache: Dict[str, Any] = {}
+        self._dirty: Set[str] = set()
+        self._deleted: Set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.loaded = False
+        BotCacheBus.subscribe("kv", "kvstore", self._reload_key, self._reload_all)
+
+    async def load(self):
+        """
+        Ensure the table exists, import the legacy elara file on first use and
+        load every key into memory. Call once after `BotDatabase.connect()`.
+        """
+        async with BotDatabase.conn.acquire() as connection:
+            await connection.execute("""
+                CREATE TABLE IF NOT EXISTS kv_store (
+                    key TEXT PRIMARY KEY,
+                    value JSONB NOT NULL,
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                )
+            """)
+            rows = await connection.fetch("SELECT key, value FROM kv_store")
+
+        if not rows and self.elara_path:
+            imported = read_elara_file(self.elara_path)
+            if imported:
+                self._cache.update(imported)
+                self._dirty.update(imported)
+                await self.flush()
+                logger.success(
+                    f"Imported {len(imported)} keys from elara file {self.elara_path}"
+                )
+
+        for row in rows:
+            self._cache[row["key"]] = json.loads(row["value"])
+        self.loaded = True
+        logger.success(f"Key-value store loaded ({len(self._cache)} keys)")
+
+    def get(self, key: str, default=None):
+        """
+        Get the value associated with the key from memory.
+
+        :param key: The key to retrieve the value for.
+        :param default: The default value to return if the key is not found.
+        :return: The value associated with the key, or default if not found.
+        """
+        value = self._cache.get(key)
+        return value if value is not None else default
+
+    def set(self, key: str, value):
+        """
+        Set the value for the specified key and schedule persistence.
+
+        :param key: The key to set the value for.
+        :param value: The value to set for the key.
+        """
+        self._cache[key] = value
+        self._deleted.discard(key)
+        self._dirty.add(key)
+        self._schedule_flush()
+
+    def rem(self, key: str):
+        """
+        Remove the specified key and schedule persistence.
+
+        :param key: The key to remove.
+        """
+        self._cache.pop(key, None)
+        self._dirty.discard(key)
+        self._deleted.add(key)
+        self._schedule_flush()
+
+    def exists(self, key: str) -> bool:
+        """
+        Check if the specified key exists.
+
+        :param key: The key to check for existence.
+        :return: True if the key exists, False otherwise.
+        """
+        return key in self._cache
+
+    async def flush(self):
+        """Write all pending changes to PostgreSQL in one transaction."""
+        async with self._flush_lock:
+            if not self._dirty and not self._deleted:
+                return
+            dirty, self._dirty = self._dirty, set()
+            deleted, self._deleted = self._deleted, set()
+            upserts = [
+                (key, json.dumps(self._cache[key], ensure_ascii=False))
+                for key in dirty
+                if key in self._cache
+            ]
+            try:
+                async with BotDatabase.conn.acquire() as connection:
+                    async with connection.transaction():
+                        if upserts:
+                            await connection.executemany(
+                                """
+                                INSERT INTO kv_store (key, value, updated_at)
+                                VALUES ($1, $2::JSONB, NOW())
+                                ON CONFLICT (key) DO UPDATE SET
+                                    value = EXCLUDED.value,
+                                    updated_at = EXCLUDED.updated_at
+                                """,
+                                upserts,
+                            )
+                        if deleted:
+                            await connection.execute(
+                                "DELETE FROM kv_store WHERE key = ANY($1::TEXT[])",
+                                list(deleted),
+                            )
+                await BotCacheBus.publish("kv", *dirty, *deleted)
+            except BaseException as e:
+                # 失败（或被取消）的键放回待写集合，等待下一次刷新重试
+                self._dirty |= {key for key in dirty if key in self._cache}
+                self._deleted |= {key for key in deleted if key not in self._cache}
+                if not isinstance(e, Exception):
+                    raise
+                logger.error(f"Error flushing key-value store: {e}")
+
+    async def close(self):
+        """Flush pending changes. Should be called when the application is shutting down."""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+
+    def _schedule_flush(self):
+        if self._flush_task and not self._flush_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 无事件循环时仅保留待写集合，由下一次 flush/close 写入
+            return
+        self._flush_task = loop.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        while self._dirty or self._deleted:
+            await asyncio.sleep(self.flush_delay)
+            await self.flush()
+
+    async def _reload_key(self, key: str):
+        """Reload a key changed by another process; pending local writes win."""
+        if key in self._dirty or key in self._deleted:
+            return
+        async with BotDatabase.conn.acquire() as connection:
+            value = await connection.fetchval(
+                "SELECT value FROM kv_store WHERE key = $1", key
+            )
+        if key in self._dirty or key in self._deleted:
+            return
+        if value is None:
+            self._cache.pop(key, None)
+        else:
+            self._cache[key] = json.loads(value)
+
+    async def _reload_all(self):
+        async with BotDatabase.conn.acquire() as connection:
+            rows = await connection.fetch("SELECT key, value FROM kv_store")
+        fresh = {row["key"]: json.loads(row["value"]) for row in rows}
+        pending = self._dirty | self._deleted
+        for key in list(self._cache):
+            if key not in fresh and key not in pending:
+                self._cache.pop(key, None)
+        for key, value in fresh.items():
+            if key not in pending:
+                self._cache[key] = value
+
+
+def read_elara_file(path: str) -> Dict[str, Any]:
+    """Read all keys of a legacy elara database file, or an empty dict if it is missing."""
+    if not Path(path).exists():
+        return {}
+    try:
+        import elara
+
+        return dict(elara.exe(path=path).retdb() or {})
+    except Exception as e:
+        logger.error(f"Error reading elara file {path}: {e}")
+        return {}
+
+
+BotKV = AsyncKVStore(elara_path=f"{str(Path.cwd())}/conf_dir/db.db")
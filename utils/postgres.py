@@ -7,9 +7,37 @@
 import asyncpg
 from loguru import logger
 import re
+from collections import OrderedDict
 
 from utils.yaml import BotConfig
 from utils.i18n.config import DEFAULT_LANGUAGE
+from utils.cache_bus import BotCacheBus
+
+
+# 设置缓存的容量上限，超出后淘汰最久未访问的条目
+GROUP_LANGUAGE_CACHE_SIZE = 5000
+USER_LANGUAGE_CACHE_SIZE = 10000
+PLUGIN_ENABLED_CACHE_SIZE = 20000
+
+
+class LRUCache(OrderedDict):
+    """容量有限的字典：``get`` 命中时刷新顺序，写入超出容量时淘汰最久未访问的键。"""
+
+    def __init__(self, maxsize: int):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        self.move_to_end(key)
+        return self[key]
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.maxsize:
+            self.popitem(last=False)
 
 
 class AsyncPostgresDB:
@@ -20,6 +48,16 @@ class AsyncPostgresDB:
         self.user = BotConfig["database"]["user"]
         self.password = BotConfig["database"]["password"]
         self.conn = None
+        # 读多写少的设置缓存，写入时通过 BotCacheBus 通知其他进程失效
+        self._group_language_cache = LRUCache(GROUP_LANGUAGE_CACHE_SIZE)
+        self._user_language_cache = LRUCache(USER_LANGUAGE_CACHE_SIZE)
+        self._plugin_enabled_cache = LRUCache(PLUGIN_ENABLED_CACHE_SIZE)
+        BotCacheBus.subscribe(
+            "group", "postgres", self._evict_group_cache, self._clear_group_cache
+        )
+        BotCacheBus.subscribe(
+            "user", "postgres", self._evict_user_cache, self._user_language_cache.clear
+        )
 
     async def connect(self):
         """
@@ -34,7 +72,8 @@ class AsyncPostgresDB:
                 password=self.password,
                 database=self.dbname,
                 min_size=1,
-                max_size=5,
+                # 其中一个连接由 BotCacheBus 长期占用用于 LISTEN
+                max_size=6,
             )
             logger.success(
                 f"Successfully connected to PostgreSQL database at {self.host}:{self.port}/{self.dbname}"
@@ -47,6 +86,10 @@ class AsyncPostgresDB:
             await self.ensure_user_settings_table()
             # Ensure scheduled jobs table exists
             await self.ensure_scheduled_jobs_table()
+            # Ensure scheduler run bookkeeping table exists
+            await self.ensure_scheduler_runs_table()
+            # Listen for cache invalidations from other bot processes
+            BotCacheBus.start(self.conn)
         except Exception as e:
             logger.error(f"Failed to connect to PostgreSQL database: {str(e)}")
             raise
@@ -59,6 +102,7 @@ class AsyncPostgresDB:
         :return: None
         """
         try:
+            await BotCacheBus.stop()
             await self.conn.close()
             logger.info("PostgreSQL database connection closed successfully")
         except Exception as e:
@@ -150,6 +194,38 @@ class AsyncPostgresDB:
             logger.error(f"Error ensuring scheduled jobs table: {e}")
             raise
 
+    async def ensure_scheduler_runs_table(self):
+        """Ensure the `scheduler_runs` table exists for last-run bookkeeping (group_id 0 = global job)."""
+        try:
+            async with self.conn.acquire() as connection:
+                await connection.execute("""
+                    CREATE TABLE IF NOT EXISTS scheduler_runs (
+                        job_name TEXT NOT NULL,
+                        group_id BIGINT NOT NULL DEFAULT 0,
+                        last_scheduled_at TIMESTAMPTZ NOT NULL,
+                        last_finished_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                        last_status TEXT NOT NULL,
+                        PRIMARY KEY (job_name, group_id)
+                    )
+                """)
+            logger.success("Scheduler runs table ensured (scheduler_runs)")
+        except Exception as e:
+            logger.error(f"Error ensuring scheduler runs table: {e}")
+            raise
+
+    def _evict_group_cache(self, group_id: str):
+        gid = int(group_id)
+        self._group_language_cache.pop(gid, None)
+        for key in [k for k in self._plugin_enabled_cache if k[0] == gid]:
+            self._plugin_enabled_cache.pop(key, None)
+
+    def _clear_group_cache(self):
+        self._group_language_cache.clear()
+        self._plugin_enabled_cache.clear()
+
+    def _evict_user_cache(self, user_id: str):
+        self._user_language_cache.pop(int(user_id), None)
+
     def _sanitize_plugin_column(self, plugin_name: str) -> str:
         """Sanitize plugin name to be used as a SQL identifier (lowercase, alnum + underscore)."""
         col = plugin_name.strip().lower()
@@ -206,6 +282,9 @@ class AsyncPostgresDB:
 
     async def get_group_language(self, group_id: int) -> str:
         """Get language of a group. Defaults to DEFAULT_LANGUAGE."""
+        cached = self._group_language_cache.get(int(group_id))
+        if cached is not None:
+            return cached
         try:
             await self.ensure_group_row(group_id)
             async with self.conn.acquire() as connection:
@@ -213,9 +292,9 @@ class AsyncPostgresDB:
                     "SELECT language FROM setting WHERE group_id = $1",
                     int(group_id),
                 )
-                if not val:
-                    return DEFAULT_LANGUAGE
-                return str(val)
+                language = str(val) if val else DEFAULT_LANGUAGE
+                self._group_language_cache[int(group_id)] = language
+                return language
         except Exception as e:
             logger.error(f"Error getting group language for group {group_id}: {e}")
             return DEFAULT_LANGUAGE
@@ -230,6 +309,8 @@ class AsyncPostgresDB:
                     str(language),
                     int(group_id),
                 )
+            self._group_language_cache[int(group_id)] = str(language)
+            await BotCacheBus.publish("group", group_id)
             logger.info(f"Set group {group_id} language={language}")
             return True
         except Exception as e:
@@ -244,6 +325,9 @@ class AsyncPostgresDB:
         If ``initial_language`` is provided and no row exists yet for this user,
         the row will be initialised with that language (auto-detect on first use).
         """
+        cached = self._user_language_cache.get(int(user_id))
+        if cached is not None:
+            return cached
         try:
             await self.ensure_user_row(user_id, initial_language)
             async with self.conn.acquire() as connection:
@@ -251,9 +335,9 @@ class AsyncPostgresDB:
                     "SELECT language FROM user_setting WHERE user_id = $1",
                     int(user_id),
                 )
-                if not val:
-                    return DEFAULT_LANGUAGE
-                return str(val)
+                language = str(val) if val else DEFAULT_LANGUAGE
+                self._user_language_cache[int(user_id)] = language
+                return language
         except Exception as e:
             logger.error(f"Error getting user language for user {user_id}: {e}")
             return DEFAULT_LANGUAGE
@@ -268,6 +352,8 @@ class AsyncPostgresDB:
                     str(language),
                     int(user_id),
                 )
+            self._user_language_cache[int(user_id)] = str(language)
+            await BotCacheBus.publish("user", user_id)
             logger.info(f"Set user {user_id} language={language}")
             return True
         except Exception as e:
@@ -313,6 +399,9 @@ class AsyncPostgresDB:
         Also ensures the group row exists.
         """
         column = self._sanitize_plugin_column(plugin_name)
+        cached = self._plugin_enabled_cache.get((int(group_id), column))
+        if cached is not None:
+            return cached
         try:
             await self.ensure_group_row(group_id)
             async with self.conn.acquire() as connection:
@@ -334,10 +423,10 @@ class AsyncPostgresDB:
                 val = await connection.fetchval(
                     f'SELECT "{column}" FROM setting WHERE group_id = $1', int(group_id)
                 )
-                if val is None:
-                    # Row exists but column is NULL? Treat as default True.
-                    return True
-                return bool(val)
+                # Row exists but column is NULL? Treat as default True.
+                enabled = True if val is None else bool(val)
+                self._plugin_enabled_cache[(int(group_id), column)] = enabled
+                return enabled
         except Exception as e:
             logger.error(
                 f"Error getting plugin enabled state for group {group_id}, plugin '{plugin_name}': {e}"
@@ -372,6 +461,8 @@ class AsyncPostgresDB:
                     bool(enabled),
                     int(group_id),
                 )
+            self._plugin_enabled_cache[(int(group_id), column)] = bool(enabled)
+            await BotCacheBus.publish("group", group_id)
             logger.info(
                 f"Set plugin '{plugin_name}' ({column}) enabled={enabled} for group {group_id}"
             )
@@ -483,6 +574,25 @@ class AsyncPostgresDB:
             )
             return False
 
+    async def get_scheduled_job(self, group_id: int, job_name: str):
+        """Get the scheduled job row for a group, or None if missing."""
+        try:
+            async with self.conn.acquire() as connection:
+                return await connection.fetchrow(
+                    """
+                    SELECT group_id, enabled, timezone, cron_expr, payload
+                    FROM scheduled_jobs
+                    WHERE group_id = $1 AND job_name = $2
+                    """,
+                    int(group_id),
+                    job_name,
+                )
+        except Exception as e:
+            logger.error(
+                f"Error getting scheduled job for group {group_id}, job '{job_name}': {e}"
+            )
+            return None
+
     async def get_enabled_scheduled_groups(self, job_name: str):
         """Get all groups with the scheduled job enabled."""
         try:
@@ -502,5 +612,51 @@ class AsyncPostgresDB:
             )
             return []
 
+    async def get_scheduler_last_runs(self, job_name: str) -> dict:
+        """Get the last scheduled run time of a job, keyed by group_id (0 for global jobs)."""
+        try:
+            async with self.conn.acquire() as connection:
+                rows = await connection.fetch(
+                    """
+                    SELECT group_id, last_scheduled_at
+                    FROM scheduler_runs
+                    WHERE job_name = $1
+                    """,
+                    job_name,
+                )
+                return {int(r["group_id"]): r["last_scheduled_at"] for r in rows}
+        except Exception as e:
+            logger.error(f"Error getting last runs for job '{job_name}': {e}")
+            return {}
+
+    async def record_scheduler_runs(
+        self, job_name: str, group_ids, scheduled_at, status: str
+    ) -> bool:
+        """Record a finished run of a job for the given groups (0 for global jobs)."""
+        try:
+            async with self.conn.acquire() as connection:
+                await connection.execute(
+                    """
+                    INSERT INTO scheduler_runs
+                        (job_name, group_id, last_scheduled_at, last_finished_at, last_status)
+                    SELECT $1, gid, $3, NOW(), $4
+                    FROM unnest($2::BIGINT[]) AS gid
+                    ON CONFLICT (job_name, group_id) DO UPDATE SET
+                        last_scheduled_at = GREATEST(
+                            scheduler_runs.last_scheduled_at, EXCLUDED.last_scheduled_at
+                        ),
+                        last_finished_at = EXCLUDED.last_finished_at,
+                        last_status = EXCLUDED.last_status
+                    """,
+                    job_name,
+                    [int(gid) for gid in group_ids],
+                    scheduled_at,
+                    status,
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Error recording runs for job '{job_name}': {e}")
+            return False
+
 
 BotDatabase = AsyncPostgresDB()
@@ -0,0 +1,291 @@
+"""Telegram Bot API 令牌桶限速。
+
+所有经 ``LocalizedBot`` 发出的 Bot API 调用都会经过 ``RateLimitedBot``：
+
+- 发消息/编辑类方法依次占用全局桶（约 30 条/秒）、按 chat 的桶（群组约
+  20 条/分钟，私聊约 1 条/秒）以及可选的按方法桶。
+- 遇到 429 时读取 ``retry_after``，暂停对应的桶并透明重试；重试前把本次
+  调用中用到的文件流恢复到首次发送前的位置。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import re
+import time
+from typing import Any, Awaitable, Callable
+
+from loguru import logger
+from telebot.asyncio_helper import ApiTelegramException
+
+
+GLOBAL_LIMIT = (30.0, 30.0)
+GROUP_CHAT_LIMIT = (20.0 / 60.0, 10.0)
+PRIVATE_CHAT_LIMIT = (1.0, 3.0)
+# 按方法的额外限制：(每秒令牌数, 桶容量)
+DEFAULT_METHOD_LIMITS: dict[str, tuple[float, float]] = {
+    "send_media_group": (1.0, 3.0),
+    "answer_inline_query": (30.0, 30.0),
+    "answer_callback_query": (30.0, 30.0),
+}
+
+# 计入发消息限额的方法 -> chat_id 所在的位置参数下标
+MESSAGE_METHODS: dict[str, int] = {
+    "send_message": 0,
+    "reply_to": 0,
+    "send_photo": 0,
+    "send_document": 0,
+    "send_video": 0,
+    "send_animation": 0,
+    "send_audio": 0,
+    "send_voice": 0,
+    "send_video_note": 0,
+    "send_sticker": 0,
+    "send_media_group": 0,
+    "send_location": 0,
+    "send_contact": 0,
+    "send_poll": 0,
+    "send_dice": 0,
+    "copy_message": 0,
+    "forward_message": 0,
+    "edit_message_text": 1,
+    "edit_message_caption": 1,
+    "edit_message_media": 1,
+    "edit_message_reply_markup": 0,
+}
+
+_RETRY_AFTER_PATTERN = re.compile(r"retry(?:\s|_)?after[:\s]+(\d+)", re.IGNORECASE)
+
+
+class TokenBucket:
+    """令牌桶：``rate`` 个/秒补充，最多 ``capacity`` 个；可整体暂停一段时间。"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at", "paused_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated_at:
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+
+    def delay(self, cost: float, now: float) -> float:
+        """距离可以取走 ``cost`` 个令牌还需等待的秒数，0 表示立即可取。"""
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        cost = min(cost, self.capacity)
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def take(self, cost: float) -> None:
+        self.tokens -= min(cost, self.capacity)
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.paused_until
+
+
+class TelegramRateLimiter:
+    """全局 / 按 chat / 按方法三级令牌桶，并在 429 时暂停对应桶后重试。"""
+
+    def __init__(
+        self,
+        global_limit: tuple[float, float] = GLOBAL_LIMIT,
+        group_chat_limit: tuple[float, float] = GROUP_CHAT_LIMIT,
+        private_chat_limit: tuple[float, float] = PRIVATE_CHAT_LIMIT,
+        method_limits: dict[str, tuple[float, float]] | None = None,
+        max_retries: int = 3,
+        prune_threshold: int = 10000,
+    ):
+        self.global_bucket = TokenBucket(*global_limit)
+        self.group_chat_limit = group_chat_limit
+        self.private_chat_limit = private_chat_limit
+        self.max_retries = max_retries
+        self.prune_threshold = prune_threshold
+        self._chat_buckets: dict[Any, TokenBucket] = {}
+        self._method_buckets = {
+            name: TokenBucket(*limit)
+            for name, limit in (
+                DEFAULT_METHOD_LIMITS if method_limits is None else method_limits
+            ).items()
+        }
+
+    def chat_bucket(self, chat_id: Any) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self.prune_threshold:
+                self._prune()
+            is_private = isinstance(chat_id, int) and chat_id > 0
+            limit = self.private_chat_limit if is_private else self.group_chat_limit
+            bucket = self._chat_buckets[chat_id] = TokenBucket(*limit)
+        return bucket
+
+    async def acquire(self, buckets: list[TokenBucket], cost: float = 1.0) -> None:
+        """等待直到所有桶都能取出 ``cost`` 个令牌，然后一并取走。"""
+        while True:
+            now = time.monotonic()
+            wait = max(bucket.delay(cost, now) for bucket in buckets)
+            if wait <= 0:
+                for bucket in buckets:
+                    bucket.take(cost)
+                return
+            await asyncio.sleep(wait)
+
+    async def call(
+        self,
+        method: str,
+        func: Callable[..., Awaitable[Any]],
+        args: tuple,
+        kwargs: dict,
+    ) -> Any:
+        chat_id = _extract_chat_id(method, args, kwargs)
+        buckets: list[TokenBucket] = []
+        if method in MESSAGE_METHODS:
+            buckets.append(self.global_bucket)
+            if chat_id is not None:
+                buckets.append(self.chat_bucket(chat_id))
+        method_bucket = self._method_buckets.get(method)
+        if method_bucket is not None:
+            buckets.append(method_bucket)
+        cost = _message_cost(method, args, kwargs)
+        streams = _collect_streams((args, kwargs))
+
+        for attempt in range(1, self.max_retries + 1):
+            if buckets:
+                await self.acquire(buckets, cost)
+            try:
+                return await func(*args, **kwargs)
+            except ApiTelegramException as e:
+                retry_after = _retry_after(e)
+                if retry_after is None or attempt >= self.max_retries:
+                    raise
+                # 暂停最具体的桶：chat > 方法 > 全局；不计限额的方法直接等待
+                target = buckets[-1] if buckets else None
+                if chat_id is not None and method in MESSAGE_METHODS:
+                    target = self.chat_bucket(chat_id)
+                logger.warning(
+                    f"[RateLimit] {method} chat={chat_id} 触发 429，"
+                    f"{retry_after}s 后重试 ({attempt}/{self.max_retries})"
+                )
+                if target is not None:
+                    target.pause(retry_after)
+                else:
+                    await asyncio.sleep(retry_after)
+                for stream, position in streams:
+                    stream.seek(position)
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for chat_id in [k for k, b in self._chat_buckets.items() if b.is_idle(now)]:
+            self._chat_buckets.pop(chat_id, None)
+
+
+class RateLimitedBot:
+    """bot 代理：协程方法经 ``TelegramRateLimiter`` 调用，其余属性直接透传。"""
+
+    def __init__(self, bot, limiter: TelegramRateLimiter):
+        self._bot = bot
+        self._limiter = limiter
+        self._wrapped: dict[str, Callable[..., Awaitable[Any]]] = {}
+
+    def __getattr__(self, item):
+        wrapped = self._wrapped.get(item)
+        if wrapped is not None:
+            return wrapped
+        attr = getattr(self._bot, item)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await self._limiter.call(item, attr, args, kwargs)
+
+        self._wrapped[item] = call
+        return call
+
+
+def rate_limited(bot) -> RateLimitedBot:
+    """获取 bot 的限速代理（同一 bot 复用同一个代理）。"""
+    if isinstance(bot, RateLimitedBot):
+        return bot
+    proxy = _proxies.get(id(bot))
+    if proxy is None or proxy._bot is not bot:
+        proxy = _proxies[id(bot)] = RateLimitedBot(bot, telegram_rate_limiter)
+    return proxy
+
+
+def _extract_chat_id(method: str, args: tuple, kwargs: dict) -> Any:
+    if kwargs.get("inline_message_id"):
+        return None
+    if method == "reply_to":
+        message = args[0] if args else kwargs.get("message")
+        chat = getattr(message, "chat", None)
+        return getattr(chat, "id", None)
+    if "chat_id" in kwargs:
+        return kwargs["chat_id"]
+    position = MESSAGE_METHODS.get(method)
+    if position is not None and len(args) > position:
+        return args[position]
+    return None
+
+
+def _message_cost(method: str, args: tuple, kwargs: dict) -> float:
+    # 媒体组中每一项都按一条消息计
+    if method == "send_media_group":
+        media = kwargs.get("media", args[1] if len(args) > 1 else None)
+        if isinstance(media, (list, tuple)):
+            return float(max(1, len(media)))
+    return 1.0
+
+
+def _retry_after(exc: ApiTelegramException) -> int | None:
+    if getattr(exc, "error_code", None) != 429:
+        return None
+    params = (getattr(exc, "result_json", None) or {}).get("parameters") or {}
+    try:
+        return int(params["retry_after"])
+    except (KeyError, TypeError, ValueError):
+        pass
+    match = _RETRY_AFTER_PATTERN.search(getattr(exc, "description", "") or str(exc))
+    return int(match.group(1)) if match else 5
+
+
+def _collect_streams(value: Any, depth: int = 0) -> list[tuple[Any, int]]:
+    """找出参数中的可 seek 文件流（含 InputFile / InputMedia 内部的流）及当前位置。"""
+    if depth > 3 or value is None or isinstance(value, (str, bytes, int, float)):
+        return []
+    if hasattr(value, "seek") and hasattr(value, "tell"):
+        try:
+            return [(value, value.tell())]
+        except Exception:
+            return []
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple, set)):
+        streams: list[tuple[Any, int]] = []
+        for item in value:
+            streams.extend(_collect_streams(item, depth + 1))
+        return streams
+    for attr in ("media", "file", "_file"):
+        inner = getattr(value, attr, None)
+        if inner is not None and not isinstance(inner, str):
+            return _collect_streams(inner, depth + 1)
+    return []
+
+
+_proxies: dict[int, RateLimitedBot] = {}
+telegram_rate_limiter = TelegramRateLimiter()
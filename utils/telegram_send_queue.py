@@ -1,13 +1,19 @@
 """Telegram 发送限速队列。
 
-按 chat_id 维护独立 FIFO worker：同一 chat 串行发送，不同 chat 可并发发送。
+按 chat_id 维护独立 FIFO 队列：同一 chat 串行发送，不同 chat 可并发发送。
+所有 chat 共用一个调度协程，按"下次可发送时间"小顶堆取出就绪的 chat，
+内存与调度开销只随待发送消息数增长，而不随触达过的 chat 数增长。
+消息编辑走独立的合并通道：同一条消息尚未发出的旧编辑会被新编辑替换。
 """
 
 from __future__ import annotations
 
 import asyncio
+import heapq
+import itertools
 import time
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
 from typing import Any, Awaitable, Callable, Iterable
 
 
@@ -21,19 +27,43 @@ class _QueuedSendTask:
     future: asyncio.Future[Any]
 
 
+@dataclass(slots=True)
+class _ChatLane:
+    tasks: deque[_QueuedSendTask] = field(default_factory=deque)
+    # 上一次发送完成后 + send_interval，即下一条最早可发送的时间
+    ready_at: float = 0.0
+    busy: bool = False
+    scheduled: bool = False
+
+
+@dataclass(slots=True)
+class _PendingEdit:
+    send_coro_factory: SendCoroFactory
+    futures: list[asyncio.Future[Any]]
+
+
 class TelegramSendQueue:
     """轻量 Telegram 发送队列。
 
-    - 每个 chat_id 使用一个 FIFO worker。
+    - 每个 chat_id 一个 FIFO 队列（deque），由单个调度协程按就绪时间堆派发。
     - 同 chat 的任务串行执行，并在两次发送任务之间等待 ``send_interval`` 秒。
-    - worker 空闲超过 ``idle_timeout`` 秒后自动清理。
+    - chat 队列清空且冷却时间过去后即释放；没有待发送任务时调度协程退出。
+    - 编辑合并通道：每条消息同时最多一个编辑在发送、一个在等待，
+      等待中的编辑被更新的编辑替换，只发送最新内容。
     """
 
-    def __init__(self, send_interval: float = 1.0, idle_timeout: float = 300.0):
+    def __init__(self, send_interval: float = 1.0):
         self.send_interval = send_interval
-        self.idle_timeout = idle_timeout
-        self._queues: dict[Any, asyncio.Queue[_QueuedSendTask]] = {}
-        self._workers: dict[Any, asyncio.Task[None]] = {}
+        self._lanes: dict[Any, _ChatLane] = {}
+        # (ready_at, seq, chat_id)；每个 lane 在堆中至多一项
+        self._heap: list[tuple[float, int, Any]] = []
+        self._seq = itertools.count()
+        self._wakeup: asyncio.Event | None = None
+        self._dispatcher: asyncio.Task[None] | None = None
+        self._sending: set[asyncio.Task[None]] = set()
+        self._pending_edits: dict[Any, _PendingEdit] = {}
+        self._edit_workers: dict[Any, asyncio.Task[None]] = {}
+        self.coalesced_edits = 0
 
     async def enqueue(
         self,
@@ -56,61 +86,144 @@ class TelegramSendQueue:
         """
 
         loop = asyncio.get_running_loop()
-        queue = self._queues.get(chat_id)
-        if queue is None:
-            queue = asyncio.Queue()
-            self._queues[chat_id] = queue
-
-        worker = self._workers.get(chat_id)
-        if worker is None or worker.done():
-            self._workers[chat_id] = loop.create_task(self._worker(chat_id, queue))
-
         future: asyncio.Future[Any] = loop.create_future()
-        await queue.put(
+        lane = self._lanes.get(chat_id)
+        if lane is None:
+            lane = self._lanes[chat_id] = _ChatLane()
+        lane.tasks.append(
             _QueuedSendTask(
                 send_coro_factory=send_coro_factory,
                 seekables=tuple(seekables or ()),
                 future=future,
             )
         )
+        if not lane.busy and not lane.scheduled:
+            self._schedule(chat_id, lane, lane.ready_at)
         return await future
 
-    async def _worker(
-        self, chat_id: Any, queue: asyncio.Queue[_QueuedSendTask]
-    ) -> None:
-        last_finished_at: float | None = None
-
-        while True:
-            try:
-                task = await asyncio.wait_for(queue.get(), timeout=self.idle_timeout)
-            except asyncio.TimeoutError:
-                if queue.empty() and self._workers.get(chat_id) is asyncio.current_task():
-                    self._workers.pop(chat_id, None)
-                    self._queues.pop(chat_id, None)
+    @property
+    def pending(self) -> int:
+        """尚未开始发送的任务数。"""
+        return sum(len(lane.tasks) for lane in self._lanes.values())
+
+    async def enqueue_edit(
+        self, edit_key: Any, send_coro_factory: SendCoroFactory
+    ) -> Any:
+        """加入消息编辑任务并等待结果。
+
+        Args:
+            edit_key: ``(chat_id, message_id)`` 或 ``inline_message_id``。
+            send_coro_factory: 无参 callable，返回实际编辑用 awaitable。
+
+        Returns:
+            实际发出的（最新一次）编辑的结果；被替换的编辑同样返回该结果。
+
+        Raises:
+            透传实际发出的编辑抛出的异常。
+        """
+
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[Any] = loop.create_future()
+        pending = self._pending_edits.get(edit_key)
+        if pending is None:
+            self._pending_edits[edit_key] = _PendingEdit(send_coro_factory, [future])
+        else:
+            pending.send_coro_factory = send_coro_factory
+            pending.futures.append(future)
+            self.coalesced_edits += 1
+
+        worker = self._edit_workers.get(edit_key)
+        if worker is None or worker.done():
+            self._edit_workers[edit_key] = loop.create_task(self._edit_worker(edit_key))
+        return await future
+
+    async def _edit_worker(self, edit_key: Any) -> None:
+        try:
+            while True:
+                pending = self._pending_edits.pop(edit_key, None)
+                if pending is None:
                     return
+                futures = [f for f in pending.futures if not f.cancelled()]
+                if not futures:
+                    continue
+
+                try:
+                    result = await pending.send_coro_factory()
+                except Exception as exc:
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(exc)
+                else:
+                    for future in futures:
+                        if not future.done():
+                            future.set_result(result)
+        finally:
+            if self._edit_workers.get(edit_key) is asyncio.current_task():
+                self._edit_workers.pop(edit_key, None)
+
+    def _schedule(self, chat_id: Any, lane: _ChatLane, ready_at: float) -> None:
+        lane.scheduled = True
+        heapq.heappush(self._heap, (ready_at, next(self._seq), chat_id))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+        elif self._heap[0][2] == chat_id and self._wakeup is not None:
+            # 新任务比调度协程正在等待的更早就绪
+            self._wakeup.set()
+
+    async def _dispatch(self) -> None:
+        wakeup = self._wakeup
+        while self._heap:
+            ready_at, _, chat_id = self._heap[0]
+            delay = ready_at - time.monotonic()
+            if delay > 0:
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
                 continue
 
-            try:
-                if task.future.cancelled():
-                    continue
+            heapq.heappop(self._heap)
+            lane = self._lanes.get(chat_id)
+            if lane is None:
+                continue
+            lane.scheduled = False
+
+            task = None
+            while lane.tasks:
+                candidate = lane.tasks.popleft()
+                if not candidate.future.cancelled():
+                    task = candidate
+                    break
+            if task is None:
+                # 队列已空且冷却结束，释放该 chat
+                if not lane.busy:
+                    self._lanes.pop(chat_id, None)
+                continue
 
-                if last_finished_at is not None and self.send_interval > 0:
-                    elapsed = time.monotonic() - last_finished_at
-                    wait_seconds = self.send_interval - elapsed
-                    if wait_seconds > 0:
-                        await asyncio.sleep(wait_seconds)
-
-                self._rewind_seekables(task.seekables)
-                result = await task.send_coro_factory()
-            except Exception as exc:
-                if not task.future.done():
-                    task.future.set_exception(exc)
-            else:
-                if not task.future.done():
-                    task.future.set_result(result)
-            finally:
-                last_finished_at = time.monotonic()
-                queue.task_done()
+            lane.busy = True
+            sending = asyncio.get_running_loop().create_task(
+                self._send(chat_id, lane, task)
+            )
+            self._sending.add(sending)
+            sending.add_done_callback(self._sending.discard)
+
+    async def _send(self, chat_id: Any, lane: _ChatLane, task: _QueuedSendTask) -> None:
+        try:
+            self._rewind_seekables(task.seekables)
+            result = await task.send_coro_factory()
+        except Exception as exc:
+            if not task.future.done():
+                task.future.set_exception(exc)
+        else:
+            if not task.future.done():
+                task.future.set_result(result)
+        finally:
+            lane.busy = False
+            lane.ready_at = time.monotonic() + self.send_interval
+            # 即使队列已空也保留到冷却结束，保证同 chat 的发送间隔
+            self._schedule(chat_id, lane, lane.ready_at)
 
     @staticmethod
     def _rewind_seekables(seekables: Iterable[Any]) -> None:
@@ -0,0 +1,176 @@
+"""Bot API 传输层。
+
+替换 pyTelegramBotAPI ``asyncio_helper`` 的默认会话与请求函数：
+
+- 可配置连接池大小、每主机连接数、keep-alive 与 DNS 缓存，向本地 Bot API
+  服务器大量发送时复用连接，避免反复建连。
+- 按方法类别（getUpdates / 发送 / 上传 / 文件下载 / 其它）设置请求超时。
+- 记录每个 Bot API 方法的调用次数、耗时与错误。
+
+配置读取 config.yaml 的 ``botapi`` 段，所有键均可省略。
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import aiohttp
+from loguru import logger
+from telebot import asyncio_helper
+
+
+DEFAULT_OPTIONS: dict[str, Any] = {
+    "pool_size": 100,
+    # 0 表示不限制单个主机的连接数
+    "limit_per_host": 0,
+    "keepalive_timeout": 60,
+    "dns_cache_ttl": 300,
+}
+
+# 各方法类别的请求超时（秒）；getUpdates 为长轮询 timeout 之外再多等的秒数
+DEFAULT_TIMEOUTS: dict[str, float] = {
+    "updates": 15,
+    "send": 30,
+    "upload": 120,
+    "file": 120,
+    "default": 30,
+}
+
+SEND_PREFIXES = ("send", "edit", "copy", "forward", "answer")
+
+
+@dataclass
+class MethodMetrics:
+    calls: int = 0
+    errors: int = 0
+    total_duration: float = 0.0
+    max_duration: float = 0.0
+    last_error: str | None = None
+
+    @property
+    def avg_duration(self) -> float | None:
+        return self.total_duration / self.calls if self.calls else None
+
+
+class TunedSessionManager(asyncio_helper.SessionManager):
+    """按传输层配置创建 aiohttp 会话的 SessionManager。"""
+
+    def __init__(self, options: dict[str, Any], file_timeout: float):
+        super().__init__()
+        self.options = options
+        self.file_timeout = file_timeout
+
+    async def create_session(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self.options["pool_size"],
+                limit_per_host=self.options["limit_per_host"],
+                keepalive_timeout=self.options["keepalive_timeout"],
+                ttl_dns_cache=self.options["dns_cache_ttl"],
+                ssl=self.ssl_context,
+            ),
+            # 单次请求会显式传入超时；会话默认值只作用于文件下载
+            timeout=aiohttp.ClientTimeout(total=self.file_timeout),
+        )
+        return self.session
+
+
+class TelegramTransport:
+    """安装到 ``asyncio_helper`` 上的 Bot API 传输层，并收集按方法的指标。"""
+
+    def __init__(self):
+        self.options = dict(DEFAULT_OPTIONS)
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        self._metrics: dict[str, MethodMetrics] = {}
+        self._process_request = None
+        self._download_file = None
+
+    def install(self, config: dict[str, Any] | None = None) -> None:
+        """按配置替换 ``asyncio_helper`` 的会话管理器与请求函数，可重复调用。"""
+        config = config or {}
+        self.options = {**DEFAULT_OPTIONS, **config.get("transport", {})}
+        self.timeouts = {**DEFAULT_TIMEOUTS, **config.get("timeouts", {})}
+        asyncio_helper.session_manager = TunedSessionManager(
+            self.options, self.timeouts["file"]
+        )
+        if self._process_request is None:
+            self._process_request = asyncio_helper._process_request
+            self._download_file = asyncio_helper.download_file
+            asyncio_helper._process_request = self.process_request
+            asyncio_helper.download_file = self.download_file
+        logger.info(
+            f"🌐 Bot API 传输层: 连接池 {self.options['pool_size']}, "
+            f"keep-alive {self.options['keepalive_timeout']}s, "
+            f"DNS 缓存 {self.options['dns_cache_ttl']}s"
+        )
+
+    def request_timeout(
+        self, url: str, params: dict | None, files: dict | None
+    ) -> float | None:
+        """方法对应的请求超时；调用方在 params 中自带 timeout 时返回 None。"""
+        if url == "getUpdates":
+            poll_timeout = (params or {}).get("timeout") or 0
+            return float(poll_timeout) + self.timeouts["updates"]
+        if params and params.get("timeout") is not None:
+            return None
+        if files:
+            return self.timeouts["upload"]
+        if url.startswith(SEND_PREFIXES):
+            return self.timeouts["send"]
+        return self.timeouts["default"]
+
+    async def process_request(
+        self, token, url, method="get", params=None, files=None, **kwargs
+    ):
+        if kwargs.get("request_timeout") is None:
+            request_timeout = self.request_timeout(url, params, files)
+            if request_timeout is not None:
+                kwargs["request_timeout"] = request_timeout
+            else:
+                kwargs.pop("request_timeout", None)
+        started = time.perf_counter()
+        try:
+            result = await self._process_request(
+                token, url, method=method, params=params, files=files, **kwargs
+            )
+        except Exception as e:
+            self._record(url, time.perf_counter() - started, e)
+            raise
+        self._record(url, time.perf_counter() - started)
+        return result
+
+    async def download_file(self, token, file_path):
+        started = time.perf_counter()
+        try:
+            result = await self._download_file(token, file_path)
+        except Exception as e:
+            self._record("downloadFile", time.perf_counter() - started, e)
+            raise
+        self._record("downloadFile", time.perf_counter() - started)
+        return result
+
+    def _record(self, name: str, duration: float, error: Exception | None = None):
+        metrics = self._metrics.get(name)
+        if metrics is None:
+            metrics = self._metrics[name] = MethodMetrics()
+        metrics.calls += 1
+        metrics.total_duration += duration
+        metrics.max_duration = max(metrics.max_duration, duration)
+        if error is not None:
+            metrics.errors += 1
+            metrics.last_error = (
+                getattr(error, "description", None) or type(error).__name__
+            )
+
+    def get_metrics(self) -> dict[str, MethodMetrics]:
+        return dict(self._metrics)
+
+    async def close(self) -> None:
+        session = asyncio_helper.session_manager.session
+        if session is not None and not session.closed:
+            await session.close()
+
+
+telegram_transport = TelegramTransport()